@@ -0,0 +1,358 @@
+"""
+Metadata catalog for a folder of datasets (.sas7bdat, .xpt, .rds/.RData)
+Reads metadata for every dataset in a process pool and keeps a persistent
+catalog that is refreshed incrementally using file size and mtime, plus an
+inverted index over variable names and labels for find_variable
+"""
+
+import sys
+import os
+import re
+import json
+import bisect
+import difflib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from json_output import dumps
+
+CATALOG_VERSION = 1
+
+# Catalog file written inside the catalogued folder unless another path is given
+DEFAULT_CATALOG_NAME = '.dataset_catalog.json'
+
+DATASET_EXTENSIONS = ('.sas7bdat', '.xpt', '.rds', '.rdata', '.rda')
+
+# Variable attributes kept in the catalog
+VARIABLE_FIELDS = ('name', 'label', 'format', 'type', 'length')
+
+INDEX_VERSION = 1
+
+FIND_MODES = ('exact', 'prefix', 'substring', 'fuzzy')
+
+FIND_FIELDS = ('name', 'label', 'both')
+
+# Minimum similarity (difflib ratio) for fuzzy matches
+FUZZY_CUTOFF = 0.75
+
+LABEL_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def find_datasets(folder: str) -> List[str]:
+    """All dataset files below folder, as sorted paths relative to it"""
+    found = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in files:
+            if Path(name).suffix.lower() in DATASET_EXTENSIONS:
+                found.append(os.path.relpath(os.path.join(root, name), folder))
+    return sorted(found)
+
+
+def read_file_metadata(file_path: str) -> Dict[str, Any]:
+    """Metadata for one dataset, using metadata-only reads where the format allows
+
+    R files have no metadata-only mode in pyreadr, so they are read fully.
+    Runs in a worker process.
+    """
+    ext = Path(file_path).suffix.lower()
+
+    try:
+        if ext == '.sas7bdat':
+            from sas_reader import SASReader
+            reader = SASReader(file_path)
+            load_result = reader.load_header()
+            if load_result is not True:
+                return {'error': load_result}
+            metadata = reader.get_header_metadata()
+        elif ext == '.xpt':
+            from xpt_reader import get_metadata
+            result = get_metadata(file_path)
+            if 'error' in result:
+                return result
+            metadata = result['metadata']
+        else:
+            from r_reader import RDataReader
+            reader = RDataReader(file_path)
+            load_result = reader.load_file()
+            if load_result is not True:
+                return {'error': load_result}
+            metadata = reader.get_metadata()
+    except Exception as e:
+        return {'error': f'Failed to read metadata: {str(e)}'}
+
+    return {
+        'dataset_label': metadata.get('dataset_label'),
+        'total_rows': metadata.get('total_rows'),
+        'total_variables': metadata.get('total_variables'),
+        'variables': [{field: var.get(field) for field in VARIABLE_FIELDS}
+                      for var in metadata.get('variables', [])]
+    }
+
+
+def load_catalog(catalog_path: str) -> Dict[str, Any]:
+    """Load an existing catalog, or an empty one if missing or from another version"""
+    try:
+        with open(catalog_path, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+        if catalog.get('version') == CATALOG_VERSION:
+            return catalog
+    except (OSError, ValueError):
+        pass
+    return {'version': CATALOG_VERSION, 'datasets': {}}
+
+
+def save_catalog(catalog: Dict[str, Any], catalog_path: str) -> None:
+    """Write the catalog atomically so readers never see a partial file"""
+    temp_path = catalog_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f)
+    os.replace(temp_path, catalog_path)
+
+
+def index_path_for(catalog_path: str) -> str:
+    """Index file kept next to the catalog (.dataset_catalog.json -> .dataset_catalog.index.json)"""
+    base, ext = os.path.splitext(catalog_path)
+    return base + '.index' + ext
+
+
+class VariableIndex:
+    """Inverted index over variable names and label words across a catalog
+
+    Names are indexed uppercase and label words lowercase; both key lists are
+    kept sorted so prefix lookups are a binary search.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.generated = data.get('generated')
+        self.variables = data['variables']
+        self.names = data['names']
+        self.terms = data['terms']
+        self.sorted_names = sorted(self.names)
+        self.sorted_terms = sorted(self.terms)
+
+    @classmethod
+    def from_catalog(cls, catalog: Dict[str, Any]) -> 'VariableIndex':
+        variables = []
+        names = {}
+        terms = {}
+        for rel_path, entry in sorted(catalog['datasets'].items()):
+            for var in entry.get('variables', []):
+                posting = len(variables)
+                name = var.get('name') or ''
+                label = var.get('label') or ''
+                variables.append([rel_path, name, label])
+                names.setdefault(name.upper(), []).append(posting)
+                for term in set(LABEL_TOKEN.findall(label.lower())):
+                    terms.setdefault(term, []).append(posting)
+
+        return cls({'generated': catalog.get('generated'), 'variables': variables,
+                    'names': names, 'terms': terms})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': INDEX_VERSION,
+            'generated': self.generated,
+            'variables': self.variables,
+            'names': self.names,
+            'terms': self.terms
+        }
+
+    @staticmethod
+    def _matching_keys(keys: List[str], needle: str, mode: str) -> List[str]:
+        """Keys of a sorted key list matching needle in the given mode"""
+        if mode == 'exact':
+            i = bisect.bisect_left(keys, needle)
+            return [needle] if i < len(keys) and keys[i] == needle else []
+        if mode == 'prefix':
+            start = bisect.bisect_left(keys, needle)
+            end = bisect.bisect_left(keys, needle + '\uffff')
+            return keys[start:end]
+        if mode == 'substring':
+            return [key for key in keys if needle in key]
+        return difflib.get_close_matches(needle, keys, n=len(keys), cutoff=FUZZY_CUTOFF)
+
+    def _postings(self, index: Dict[str, List[int]], keys: List[str], needle: str, mode: str) -> set:
+        postings = set()
+        for key in self._matching_keys(keys, needle, mode):
+            postings.update(index[key])
+        return postings
+
+    def find(self, query: str, mode: str = 'substring', field: str = 'both') -> Dict[str, Any]:
+        """Find variables whose name and/or label matches the query
+
+        A name matches when the whole query matches the variable name. A label
+        matches when every word of the query matches some word of the label.
+        """
+        if mode not in FIND_MODES:
+            return {'error': f"Unknown mode '{mode}'. Use one of: {', '.join(FIND_MODES)}"}
+        if field not in FIND_FIELDS:
+            return {'error': f"Unknown field '{field}'. Use one of: {', '.join(FIND_FIELDS)}"}
+
+        matched = {}
+        if field in ('name', 'both'):
+            for posting in self._postings(self.names, self.sorted_names, query.strip().upper(), mode):
+                matched.setdefault(posting, []).append('name')
+
+        if field in ('label', 'both'):
+            words = LABEL_TOKEN.findall(query.lower())
+            label_hits = None
+            for word in words:
+                hits = self._postings(self.terms, self.sorted_terms, word, mode)
+                label_hits = hits if label_hits is None else label_hits & hits
+            for posting in label_hits or ():
+                matched.setdefault(posting, []).append('label')
+
+        matches = []
+        for posting in sorted(matched):
+            dataset, name, label = self.variables[posting]
+            matches.append({'dataset': dataset, 'name': name, 'label': label,
+                            'matched_on': matched[posting]})
+
+        return {
+            'query': query,
+            'mode': mode,
+            'field': field,
+            'total_matches': len(matches),
+            'datasets': sorted({match['dataset'] for match in matches}),
+            'matches': matches
+        }
+
+
+def load_index(catalog_path: str) -> Optional[VariableIndex]:
+    """Load the persisted index for a catalog, or None if missing or outdated"""
+    try:
+        with open(index_path_for(catalog_path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != INDEX_VERSION:
+        return None
+    return VariableIndex(data)
+
+
+def find_variable(folder: str, query: str, mode: str = 'substring', field: str = 'both',
+                  catalog_path: Optional[str] = None) -> Dict[str, Any]:
+    """Look up variables across a folder from its persisted index
+
+    The catalog is brought up to date first (see build_catalog), so new,
+    changed and deleted datasets are reflected; when nothing changed that is
+    only a size/mtime check of each file.
+    """
+    folder = os.path.abspath(folder)
+    catalog_path = catalog_path or os.path.join(folder, DEFAULT_CATALOG_NAME)
+
+    summary = build_catalog(folder, catalog_path)
+    if 'error' in summary:
+        return summary
+
+    index = load_index(catalog_path)
+    if index is None:
+        return {'error': f'Could not read the variable index of {catalog_path}'}
+    return index.find(query, mode, field)
+
+
+def build_catalog(folder: str, catalog_path: Optional[str] = None,
+                  workers: Optional[int] = None) -> Dict[str, Any]:
+    """Catalog every dataset in folder, re-reading only new, changed or previously failed files
+
+    Returns a summary with the catalog path and how many entries were
+    refreshed, reused and removed. The catalog and index files are only
+    rewritten when something changed (or either is missing).
+    """
+    folder = os.path.abspath(folder)
+    if not os.path.isdir(folder):
+        return {'error': f'Folder not found: {folder}'}
+
+    catalog_path = catalog_path or os.path.join(folder, DEFAULT_CATALOG_NAME)
+    previous = load_catalog(catalog_path)['datasets']
+
+    datasets = {}
+    stale = []
+    for rel_path in find_datasets(folder):
+        stat = os.stat(os.path.join(folder, rel_path))
+        entry = previous.get(rel_path)
+        # Failed reads are retried: the file may have been locked or still being written
+        if entry and 'error' not in entry and entry['size'] == stat.st_size and \
+                entry['mtime_ns'] == stat.st_mtime_ns:
+            datasets[rel_path] = entry
+        else:
+            datasets[rel_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                  'format': Path(rel_path).suffix.lower().lstrip('.')}
+            stale.append(rel_path)
+
+    paths = [os.path.join(folder, rel_path) for rel_path in stale]
+    if len(paths) > 1:
+        workers = workers or min(len(paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(read_file_metadata, paths))
+    else:
+        results = [read_file_metadata(path) for path in paths]
+
+    for rel_path, result in zip(stale, results):
+        datasets[rel_path].update(result)
+
+    removed = set(previous) - set(datasets)
+    if stale or removed or not os.path.exists(catalog_path) or not os.path.exists(index_path_for(catalog_path)):
+        catalog = {
+            'version': CATALOG_VERSION,
+            'root': folder,
+            'generated': datetime.now(timezone.utc).isoformat(),
+            'datasets': datasets
+        }
+        save_catalog(catalog, catalog_path)
+        save_catalog(VariableIndex.from_catalog(catalog).to_dict(), index_path_for(catalog_path))
+
+    return {
+        'catalog_path': catalog_path,
+        'datasets': len(datasets),
+        'refreshed': len(stale),
+        'reused': len(datasets) - len(stale),
+        'removed': len(removed),
+        'errors': sorted(rel_path for rel_path, entry in datasets.items() if 'error' in entry)
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(dumps({'error': 'Usage: catalog.py catalog <folder> [catalog_path] [workers] | '
+                                   'find_variable <folder> <query> [mode] [field] [catalog_path]'}))
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    try:
+        if command == 'catalog':
+            if len(sys.argv) < 3:
+                print(dumps({'error': 'Folder path required'}))
+                sys.exit(1)
+
+            folder = sys.argv[2]
+            catalog_path = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] else None
+            workers = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else None
+            print(dumps(build_catalog(folder, catalog_path, workers)))
+
+        elif command == 'find_variable':
+            if len(sys.argv) < 4:
+                print(dumps({'error': 'Folder path and query required'}))
+                sys.exit(1)
+
+            folder = sys.argv[2]
+            query = sys.argv[3]
+            mode = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] else 'substring'
+            field = sys.argv[5] if len(sys.argv) > 5 and sys.argv[5] else 'both'
+            catalog_path = sys.argv[6] if len(sys.argv) > 6 and sys.argv[6] else None
+            print(dumps(find_variable(folder, query, mode, field, catalog_path)))
+
+        else:
+            print(dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(dumps({'error': f'Unexpected error: {str(e)}'}))
+
+
+if __name__ == '__main__':
+    main()
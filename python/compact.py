@@ -0,0 +1,133 @@
+"""
+Memory-compact representation for loaded datasets
+Shared by the SAS, XPT and R readers
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Tuple
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# A string column becomes categorical when its distinct values are at most
+# this fraction of its non-missing values
+CATEGORY_MAX_RATIO = 0.5
+
+# Smallest-first nullable integer dtypes tried for integer-valued floats
+NULLABLE_INT_DTYPES = [
+    ('Int8', np.iinfo(np.int8)),
+    ('Int16', np.iinfo(np.int16)),
+    ('Int32', np.iinfo(np.int32)),
+    ('Int64', np.iinfo(np.int64)),
+]
+
+
+def is_text_column(series: pd.Series) -> bool:
+    """True for character columns, whether object, string or categorical of strings"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.api.types.is_string_dtype(series.cat.categories) or \
+            pd.api.types.is_object_dtype(series.cat.categories)
+    if pd.api.types.is_object_dtype(series.dtype):
+        # Object columns may also hold dates/times decoded from SAS formats
+        return pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty')
+    return pd.api.types.is_string_dtype(series.dtype)
+
+
+def _compact_strings(series: pd.Series) -> pd.Series:
+    non_missing = series.count()
+    if non_missing == 0:
+        return series.astype('category')
+
+    distinct = series.nunique(dropna=True)
+    if distinct <= non_missing * CATEGORY_MAX_RATIO:
+        return series.astype('category')
+
+    if HAS_PYARROW:
+        return series.astype('string[pyarrow]')
+
+    return series
+
+
+def _compact_float(series: pd.Series) -> pd.Series:
+    values = series.to_numpy()
+    present = values[~np.isnan(values)]
+    if present.size == 0 or not np.all(np.mod(present, 1) == 0):
+        return series
+
+    low, high = present.min(), present.max()
+    for dtype, info in NULLABLE_INT_DTYPES:
+        if info.min <= low and high <= info.max:
+            return series.astype(dtype)
+
+    return series
+
+
+def compact_dataframe(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """Convert columns to compact dtypes and report memory per column
+
+    - low-cardinality strings become ``category``
+    - other strings become Arrow-backed strings (when pyarrow is installed)
+    - integer-valued floats become the smallest nullable integer dtype
+
+    Returns the compacted DataFrame and a per-column report with memory in
+    bytes before and after conversion.
+    """
+    columns = {}
+    report = []
+
+    for col in df.columns:
+        series = df[col]
+        before = int(series.memory_usage(index=False, deep=True))
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            compacted = series
+        elif is_text_column(series):
+            compacted = _compact_strings(series)
+        elif pd.api.types.is_float_dtype(series.dtype):
+            compacted = _compact_float(series)
+        else:
+            compacted = series
+
+        columns[col] = compacted
+        report.append({
+            "name": col,
+            "dtype_before": str(series.dtype),
+            "dtype_after": str(compacted.dtype),
+            "bytes_before": before,
+            "bytes_after": int(compacted.memory_usage(index=False, deep=True))
+        })
+
+    return pd.DataFrame(columns, index=df.index), report
+
+
+def memory_summary(report: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarize a compact_dataframe report for the metadata response"""
+    before = sum(col["bytes_before"] for col in report)
+    after = sum(col["bytes_after"] for col in report)
+    return {
+        "bytes_before": before,
+        "bytes_after": after,
+        "columns": report
+    }
+
+
+def categorical_value_counts(series: pd.Series) -> List[Tuple[Any, int]]:
+    """Count values of a categorical column from its codes
+
+    Each distinct value is touched once instead of once per row. Missing
+    values are reported under ``None``. Results are sorted by descending count.
+    """
+    codes = series.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+    pairs = [(value, int(count)) for value, count in zip(series.cat.categories, counts) if count]
+
+    missing = int(np.count_nonzero(codes < 0))
+    if missing:
+        pairs.append((None, missing))
+
+    pairs.sort(key=lambda pair: pair[1], reverse=True)
+    return pairs
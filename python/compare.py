@@ -0,0 +1,269 @@
+"""
+Dataset comparison (PROC COMPARE equivalent) for any mix of
+.sas7bdat, .xpt and .rds/.RData files
+
+Rows are aligned by key variables with a hash join over the key columns
+only; the remaining variables are then read and compared a batch of
+columns at a time, so only key columns plus one batch from each side are
+in memory at once.
+"""
+
+import sys
+import math
+from typing import Dict, List, Any, Optional
+
+from json_output import dumps
+from dataset_source import DatasetSource
+
+# Attributes compared for variables present in both datasets
+COMPARED_ATTRIBUTES = ('type', 'label', 'length', 'format')
+
+# Approximate bytes per cell used to size column batches
+BYTES_PER_CELL = 16
+
+# Memory allowed for one batch of columns from both datasets
+BATCH_MEMORY = 512 * 1024 ** 2
+
+# Key tuples listed for added/removed rows
+MAX_LISTED_KEYS = 100
+
+
+def json_value(value):
+    """Convert a NumPy/pandas scalar into a JSON-serializable value"""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # numpy types
+        value = value.item()
+        return None if isinstance(value, float) and math.isnan(value) else value
+    try:
+        import pandas as pd
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def resolve_names(requested: List[str], available: List[str]) -> List[str]:
+    """Match variable names case-insensitively, raising for unknown names"""
+    lookup = {name.upper(): name for name in available}
+    missing = [name for name in requested if name.upper() not in lookup]
+    if missing:
+        raise ValueError(f"Variable(s) not found: {', '.join(missing)}")
+    return [lookup[name.upper()] for name in requested]
+
+
+def _differs(base, compare, numeric: bool, tolerance: float):
+    """Vectorized per-row inequality of two aligned columns"""
+    import numpy as np
+    import pandas as pd
+
+    if numeric and pd.api.types.is_numeric_dtype(base.dtype) and pd.api.types.is_numeric_dtype(compare.dtype):
+        a = base.to_numpy(dtype=float, na_value=np.nan)
+        b = compare.to_numpy(dtype=float, na_value=np.nan)
+        both_missing = np.isnan(a) & np.isnan(b)
+        with np.errstate(invalid='ignore'):
+            close = np.abs(a - b) <= tolerance
+        return ~(both_missing | close)
+
+    if not numeric:
+        # SAS treats missing character values as blank and ignores trailing blanks
+        a = base.astype(object).where(base.notna(), '').astype(str).str.rstrip()
+        b = compare.astype(object).where(compare.notna(), '').astype(str).str.rstrip()
+        return (a.to_numpy() != b.to_numpy())
+
+    a_missing = base.isna().to_numpy()
+    b_missing = compare.isna().to_numpy()
+    equal = (base.to_numpy() == compare.to_numpy())
+    return ~((a_missing & b_missing) | (~a_missing & ~b_missing & equal))
+
+
+def compare_datasets(base_path: str, compare_path: str, keys: Optional[List[str]] = None,
+                     tolerance: float = 0.0, start_row: int = 0, num_rows: int = 100) -> Dict[str, Any]:
+    """Compare two datasets and return a summary plus a page of value differences
+
+    Without keys, rows are compared by position. Duplicate keys keep their
+    first occurrence and are counted in the summary.
+    """
+    import numpy as np
+    import pandas as pd
+
+    try:
+        base = DatasetSource(base_path)
+        comp = DatasetSource(compare_path)
+
+        base_vars = base.variables()
+        comp_vars = comp.variables()
+        base_names = list(base_vars)
+        comp_names = list(comp_vars)
+        comp_lookup = {name.upper(): name for name in comp_names}
+        base_upper = {name.upper() for name in base_names}
+
+        keys = keys or []
+        base_keys = resolve_names(keys, base_names)
+        comp_keys = resolve_names(keys, comp_names)
+
+        # Attribute differences for variables in both datasets
+        common = [(name, comp_lookup[name.upper()]) for name in base_names if name.upper() in comp_lookup]
+        attribute_differences = []
+        for base_name, comp_name in common:
+            for attribute in COMPARED_ATTRIBUTES:
+                base_value = base_vars[base_name].get(attribute)
+                comp_value = comp_vars[comp_name].get(attribute)
+                if base_value != comp_value:
+                    attribute_differences.append({'name': base_name, 'attribute': attribute,
+                                                  'base': base_value, 'compare': comp_value})
+
+        # Align rows: hash join on the key columns only
+        if keys:
+            left = base.read(base_keys)
+            right = comp.read(comp_keys)
+            right.columns = base_keys
+            duplicates = {'base': int(left.duplicated().sum()), 'compare': int(right.duplicated().sum())}
+            left = left.assign(_base_pos=np.arange(len(left))).drop_duplicates(base_keys)
+            right = right.assign(_comp_pos=np.arange(len(right))).drop_duplicates(base_keys)
+            joined = left.merge(right, on=base_keys, how='outer', indicator=True, sort=True)
+
+            matched = joined[joined['_merge'] == 'both']
+            removed = joined[joined['_merge'] == 'left_only']
+            added = joined[joined['_merge'] == 'right_only']
+            base_pos = matched['_base_pos'].to_numpy(dtype=np.int64)
+            comp_pos = matched['_comp_pos'].to_numpy(dtype=np.int64)
+            key_frame = matched[base_keys].reset_index(drop=True)
+            removed_keys = [{k: json_value(v) for k, v in row.items()}
+                            for row in removed[base_keys].head(MAX_LISTED_KEYS).to_dict('records')]
+            added_keys = [{k: json_value(v) for k, v in row.items()}
+                          for row in added[base_keys].head(MAX_LISTED_KEYS).to_dict('records')]
+            removed_count, added_count = len(removed), len(added)
+            del left, right, joined
+        else:
+            base_rows, comp_rows = base.row_count, comp.row_count
+            n = min(base_rows, comp_rows)
+            base_pos = comp_pos = np.arange(n)
+            key_frame = None
+            duplicates = {'base': 0, 'compare': 0}
+            removed_count, added_count = max(base_rows - n, 0), max(comp_rows - n, 0)
+            removed_keys = [{'_row': i} for i in range(n, min(base_rows, n + MAX_LISTED_KEYS))]
+            added_keys = [{'_row': i} for i in range(n, min(comp_rows, n + MAX_LISTED_KEYS))]
+
+        # Compare values a batch of columns at a time
+        key_upper = {k.upper() for k in keys}
+        value_columns = [(b, c) for b, c in common
+                         if b.upper() not in key_upper
+                         and base_vars[b]['type'] == comp_vars[c]['type']]
+        rows = max(base.row_count, comp.row_count, 1)
+        batch_size = max(1, BATCH_MEMORY // (rows * BYTES_PER_CELL * 2))
+
+        # Differences are paged in variable order, so the page can be filled
+        # while scanning and no other differing values need to be kept
+        value_differences = []
+        differences = []
+        total_differences = 0
+        end_row = start_row + num_rows
+        for i in range(0, len(value_columns), batch_size):
+            batch = value_columns[i:i + batch_size]
+            base_batch = base.read([b for b, _ in batch])
+            comp_batch = comp.read([c for _, c in batch])
+            for base_name, comp_name in batch:
+                a = base_batch[base_name].iloc[base_pos].reset_index(drop=True)
+                b = comp_batch[comp_name].iloc[comp_pos].reset_index(drop=True)
+                numeric = base_vars[base_name]['type'] == 'numeric'
+                rows_differing = np.flatnonzero(_differs(a, b, numeric, tolerance))
+                if rows_differing.size == 0:
+                    continue
+
+                entry = {'name': base_name, 'differences': int(rows_differing.size)}
+                if numeric and pd.api.types.is_numeric_dtype(a.dtype) and pd.api.types.is_numeric_dtype(b.dtype):
+                    deltas = np.abs(a.to_numpy(dtype=float, na_value=np.nan)[rows_differing] -
+                                    b.to_numpy(dtype=float, na_value=np.nan)[rows_differing])
+                    if not np.all(np.isnan(deltas)):
+                        entry['max_abs_diff'] = float(np.nanmax(deltas))
+                value_differences.append(entry)
+
+                lo = max(start_row - total_differences, 0)
+                hi = min(end_row - total_differences, rows_differing.size)
+                for row in rows_differing[lo:max(lo, hi)]:
+                    record = {
+                        'variable': base_name,
+                        'base': json_value(a.iloc[row]),
+                        'compare': json_value(b.iloc[row])
+                    }
+                    if key_frame is not None:
+                        record['keys'] = {k: json_value(v) for k, v in key_frame.iloc[row].items()}
+                    else:
+                        record['row'] = int(base_pos[row])
+                    differences.append(record)
+
+                total_differences += int(rows_differing.size)
+            del base_batch, comp_batch
+
+        return {
+            'base': base_path,
+            'compare': compare_path,
+            'keys': base_keys,
+            'tolerance': tolerance,
+            'summary': {
+                'base_rows': base.row_count,
+                'compare_rows': comp.row_count,
+                'matched_rows': int(len(base_pos)),
+                'removed_rows': removed_count,
+                'added_rows': added_count,
+                'duplicate_keys': duplicates,
+                'variables_compared': len(value_columns),
+                'variables_with_differences': len(value_differences),
+                'total_differences': total_differences
+            },
+            'variables': {
+                'only_in_base': [name for name in base_names if name.upper() not in comp_lookup],
+                'only_in_compare': [name for name in comp_names if name.upper() not in base_upper]
+            },
+            'dataset_label': {'base': base.dataset_label(), 'compare': comp.dataset_label()},
+            'attribute_differences': attribute_differences,
+            'value_differences': value_differences,
+            'removed': removed_keys,
+            'added': added_keys,
+            'differences': differences,
+            'start_row': start_row,
+            'returned_rows': len(differences)
+        }
+
+    except Exception as e:
+        return {'error': f'Error comparing datasets: {str(e)}'}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(dumps({'error': 'Usage: compare.py compare <base> <compare> [keys] [tolerance] [start] [num]'}))
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    try:
+        if command == 'compare':
+            if len(sys.argv) < 4:
+                print(dumps({'error': 'Base and compare file paths required'}))
+                sys.exit(1)
+
+            base_path = sys.argv[2]
+            compare_path = sys.argv[3]
+            keys = [k.strip() for k in sys.argv[4].split(',') if k.strip()] if len(sys.argv) > 4 else []
+            tolerance = float(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else 0.0
+            start_row = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+            num_rows = int(sys.argv[7]) if len(sys.argv) > 7 else 100
+
+            print(dumps(compare_datasets(base_path, compare_path, keys, tolerance, start_row, num_rows)))
+
+        else:
+            print(dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(dumps({'error': f'Unexpected error: {str(e)}'}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Batch conversion of datasets between .sas7bdat, .xpt, .rds/.RData and .parquet
+
+Converts every dataset in a folder (or matching a glob) to one target format
+in a process pool, one file per worker. Variable labels, formats and the
+dataset label are carried over: Parquet keeps them as field and schema
+metadata, XPT in its variable and member headers; .rds has no place for them.
+XPT targets are written as version 5 transport files; a dataset with longer
+names, labels or character values than version 5 allows is reported as an
+error for that file instead.
+Outputs newer than their source are skipped.
+
+SAS, XPT and Parquet sources are read in chunks. A Parquet target is written
+chunk by chunk, so a worker holds one chunk at a time; the XPT and RDS
+writers take a whole data frame, so those targets are built in memory.
+.sas7bdat can be read but not written.
+"""
+
+import sys
+import os
+import glob
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+
+from json_output import dumps
+
+SOURCE_EXTENSIONS = ('.sas7bdat', '.xpt', '.rds', '.rdata', '.rda', '.parquet')
+
+TARGET_EXTENSIONS = {'parquet': '.parquet', 'xpt': '.xpt', 'rds': '.rds'}
+
+CONVERT_CHUNK_SIZE = 100000
+
+# Parquet metadata keys used for SAS attributes
+LABEL_KEY = b'label'
+FORMAT_KEY = b'format'
+DATASET_LABEL_KEY = b'dataset_label'
+TABLE_NAME_KEY = b'table_name'
+
+
+def find_sources(source: str) -> List[Tuple[str, str]]:
+    """(path, path relative to the source root) of every dataset in a folder or matching a glob"""
+    if os.path.isdir(source):
+        root = source
+        paths = [os.path.join(dirpath, name)
+                 for dirpath, _, files in os.walk(source) for name in files]
+    else:
+        paths = glob.glob(source, recursive=True)
+        root = os.path.dirname(source.split('*', 1)[0].split('?', 1)[0]) or '.'
+
+    return sorted((path, os.path.relpath(path, root)) for path in paths
+                  if os.path.isfile(path) and Path(path).suffix.lower() in SOURCE_EXTENSIONS)
+
+
+def is_up_to_date(source_path: str, output_path: str) -> bool:
+    try:
+        return os.stat(output_path).st_mtime_ns >= os.stat(source_path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def read_attributes(meta) -> Dict[str, Any]:
+    """Labels, formats and dataset label from pyreadstat metadata"""
+    labels = getattr(meta, 'column_names_to_labels', None) or {}
+    return {
+        'labels': {col: label for col, label in labels.items() if label},
+        'formats': {col: fmt for col, fmt in (getattr(meta, 'original_variable_types', None) or {}).items()
+                    if fmt},
+        'character': {col for col, kind in (getattr(meta, 'readstat_variable_types', None) or {}).items()
+                      if kind == 'string'},
+        'dataset_label': getattr(meta, 'file_label', None) or None,
+        'table_name': getattr(meta, 'table_name', None) or None
+    }
+
+
+def iter_source(file_path: str) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+    """(chunk, attributes) pairs for a dataset; R files come as a single chunk"""
+    ext = Path(file_path).suffix.lower()
+
+    if ext in ('.sas7bdat', '.xpt'):
+        import pyreadstat
+        read_function = pyreadstat.read_sas7bdat if ext == '.sas7bdat' else pyreadstat.read_xport
+        attributes = None
+        for chunk, meta in pyreadstat.read_file_in_chunks(read_function, file_path,
+                                                          chunksize=CONVERT_CHUNK_SIZE):
+            if attributes is None:
+                attributes = read_attributes(meta)
+            yield chunk, attributes
+
+    elif ext == '.parquet':
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_path)
+        schema = parquet_file.schema_arrow
+        schema_meta = schema.metadata or {}
+        attributes = {'labels': {}, 'formats': {}, 'character': set(),
+                      'dataset_label': (schema_meta.get(DATASET_LABEL_KEY) or b'').decode() or None,
+                      'table_name': (schema_meta.get(TABLE_NAME_KEY) or b'').decode() or None}
+        for field in schema:
+            field_meta = field.metadata or {}
+            if LABEL_KEY in field_meta:
+                attributes['labels'][field.name] = field_meta[LABEL_KEY].decode()
+            if FORMAT_KEY in field_meta:
+                attributes['formats'][field.name] = field_meta[FORMAT_KEY].decode()
+        for batch in parquet_file.iter_batches(batch_size=CONVERT_CHUNK_SIZE):
+            yield batch.to_pandas(), attributes
+
+    else:
+        import pyreadr
+        result = pyreadr.read_r(file_path)
+        frames = [df for df in result.values() if df is not None]
+        if not frames:
+            raise ValueError('No data frame found in R file')
+        yield frames[0], {'labels': {}, 'formats': {}, 'character': set(),
+                          'dataset_label': None, 'table_name': None}
+
+
+def missing_column_type(name: str, attributes: Dict[str, Any]):
+    """Arrow type for a column with no values yet, from its SAS type and format
+
+    Chunks are read with pyreadstat's datetime conversion, which gives
+    datetime.date, datetime64[us] and datetime.time values for temporal formats.
+    """
+    import pyarrow as pa
+    from temporal import temporal_kind
+
+    if name in attributes['character']:
+        return pa.string()
+    kind = temporal_kind(attributes['formats'].get(name))
+    if kind == 'date':
+        return pa.date32()
+    if kind == 'datetime':
+        return pa.timestamp('us')
+    if kind == 'time':
+        return pa.time64('us')
+    return pa.float64()
+
+
+def parquet_schema(chunk, attributes: Dict[str, Any]):
+    """Arrow schema for the first chunk, with SAS attributes as metadata
+
+    Columns that are all missing in the first chunk get their type from the
+    SAS variable (string, or date, timestamp, time or float from its format)
+    so later chunks still fit the schema.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for field in pa.Schema.from_pandas(chunk, preserve_index=False):
+        if pa.types.is_null(field.type):
+            field = field.with_type(missing_column_type(field.name, attributes))
+        field_meta = {}
+        if field.name in attributes['labels']:
+            field_meta[LABEL_KEY] = attributes['labels'][field.name].encode()
+        if field.name in attributes['formats']:
+            field_meta[FORMAT_KEY] = attributes['formats'][field.name].encode()
+        fields.append(field.with_metadata(field_meta or None))
+
+    schema_meta = {}
+    if attributes['dataset_label']:
+        schema_meta[DATASET_LABEL_KEY] = attributes['dataset_label'].encode()
+    if attributes['table_name']:
+        schema_meta[TABLE_NAME_KEY] = attributes['table_name'].encode()
+    return pa.schema(fields, metadata=schema_meta or None)
+
+
+def write_parquet(chunks: Iterator[Tuple[Any, Dict[str, Any]]], output_path: str) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    rows = 0
+    try:
+        for chunk, attributes in chunks:
+            if writer is None:
+                schema = parquet_schema(chunk, attributes)
+                writer = pq.ParquetWriter(output_path, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def xpt_problems(df, attributes: Dict[str, Any]) -> List[str]:
+    """Reasons a data frame cannot be written as an XPORT version 5 file"""
+    from compact import is_text_column
+    from validate import MAX_NAME_LENGTH, MAX_LABEL_LENGTH, MAX_CHARACTER_LENGTH
+
+    problems = []
+    label = attributes['dataset_label'] or ''
+    if len(label) > MAX_LABEL_LENGTH:
+        problems.append(f'dataset label is {len(label)} characters (limit {MAX_LABEL_LENGTH})')
+    for col in df.columns:
+        if len(col) > MAX_NAME_LENGTH:
+            problems.append(f'{col}: name is longer than {MAX_NAME_LENGTH} characters')
+        label = attributes['labels'].get(col) or ''
+        if len(label) > MAX_LABEL_LENGTH:
+            problems.append(f'{col}: label is {len(label)} characters (limit {MAX_LABEL_LENGTH})')
+        if is_text_column(df[col]):
+            width = df[col].dropna().astype(str).str.encode('utf-8').str.len().max()
+            if width and width > MAX_CHARACTER_LENGTH:
+                problems.append(f'{col}: values are up to {int(width)} bytes (limit {MAX_CHARACTER_LENGTH})')
+    return problems
+
+
+def write_whole(chunks: Iterator[Tuple[Any, Dict[str, Any]]], output_path: str, target: str) -> int:
+    """Write an XPT or RDS file; both writers need the full data frame"""
+    import pandas as pd
+
+    frames = []
+    attributes = None
+    for chunk, attributes in chunks:
+        frames.append(chunk)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    if target == 'xpt':
+        import pyreadstat
+        # Version 5 is the transport format regulators accept; refuse what it cannot hold
+        problems = xpt_problems(df, attributes)
+        if problems:
+            raise ValueError('Cannot write XPT version 5: ' + '; '.join(problems))
+        pyreadstat.write_xport(
+            df, output_path, file_format_version=5,
+            file_label=attributes['dataset_label'] or '',
+            column_labels={col: label for col, label in attributes['labels'].items() if col in df.columns},
+            table_name=attributes['table_name'] or Path(output_path).name.split('.')[0].upper()[:8],
+            variable_format={col: fmt for col, fmt in attributes['formats'].items()
+                             if col in df.columns and fmt not in ('NULL', '$')})
+    else:
+        import pyreadr
+        pyreadr.write_rds(output_path, df)
+    return len(df)
+
+
+def convert_file(source_path: str, output_path: str, target: str, force: bool = False) -> Dict[str, Any]:
+    """Convert one dataset; runs in a worker process"""
+    result = {'source': source_path, 'output': output_path}
+    if not force and is_up_to_date(source_path, output_path):
+        result['status'] = 'skipped'
+        return result
+
+    # Written next to the output and renamed, so an interrupted run leaves no partial file
+    temp_path = output_path + '.tmp'
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        chunks = iter_source(source_path)
+        if target == 'parquet':
+            rows = write_parquet(chunks, temp_path)
+        else:
+            rows = write_whole(chunks, temp_path, target)
+        os.replace(temp_path, output_path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        result.update(status='error', error=str(e))
+        return result
+
+    result.update(status='converted', rows=rows)
+    return result
+
+
+def convert(source: str, target: str, output_dir: Optional[str] = None,
+            workers: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+    """Convert every dataset in a folder or glob to target (parquet, xpt or rds)
+
+    Outputs keep the source's relative path below output_dir, or are written
+    next to their sources without one. Sources already in the target format
+    are left out.
+    """
+    target = target.lower()
+    if target not in TARGET_EXTENSIONS:
+        return {'error': f"Unsupported target format '{target}' (use {', '.join(TARGET_EXTENSIONS)})"}
+    extension = TARGET_EXTENSIONS[target]
+
+    sources = find_sources(source)
+    if not sources:
+        return {'error': f'No datasets found: {source}'}
+
+    jobs = []
+    for path, rel_path in sources:
+        if Path(path).suffix.lower() == extension:
+            continue
+        output_path = str(Path(os.path.join(output_dir, rel_path) if output_dir else path).with_suffix(extension))
+        jobs.append((path, output_path))
+
+    if len(jobs) > 1:
+        workers = workers or min(len(jobs), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(convert_file, [job[0] for job in jobs], [job[1] for job in jobs],
+                                    [target] * len(jobs), [force] * len(jobs)))
+    else:
+        results = [convert_file(path, output_path, target, force) for path, output_path in jobs]
+
+    return {
+        'target': target,
+        'converted': sum(1 for result in results if result['status'] == 'converted'),
+        'skipped': sum(1 for result in results if result['status'] == 'skipped'),
+        'errors': sum(1 for result in results if result['status'] == 'error'),
+        'files': results
+    }
+
+
+def main():
+    if len(sys.argv) < 4:
+        print(dumps({'error': 'Usage: convert.py convert <folder|glob> <parquet|xpt|rds> '
+                                   '[output_dir] [workers] [--force]'}))
+        sys.exit(1)
+
+    force = '--force' in sys.argv
+    if force:
+        sys.argv.remove('--force')
+    args = sys.argv
+    command = args[1]
+
+    try:
+        if command == 'convert':
+            output_dir = args[4] if len(args) > 4 and args[4] else None
+            workers = int(args[5]) if len(args) > 5 and args[5] else None
+            print(dumps(convert(args[2], args[3], output_dir, workers, force)))
+        else:
+            print(dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(dumps({'error': str(e)}))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
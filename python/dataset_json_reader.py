@@ -0,0 +1,625 @@
+"""
+Python script for reading CDISC Dataset-JSON files (v1.0, v1.1 and NDJSON v1.1)
+Same command contract as sas_reader.py: metadata, data, count, unique
+
+The file is never parsed as a whole. Only the metadata part is parsed
+up front. Rows are decoded one at a time from a buffered read
+(json.JSONDecoder.raw_decode). While rows are read, the byte offset of every
+ROW_INDEX_STRIDE-th row is recorded, so later pages seek close to their first
+row instead of re-reading the file from the start. The zone map saved by a
+full scan keeps the byte offset and row count of each chunk, so other
+processes seek the same way without scanning the file again. Memory stays
+proportional to the page (or the chunk being filtered), not to the file.
+"""
+
+from __future__ import annotations
+
+import sys
+import os
+import re
+import json
+import codecs
+from typing import Dict, List, Any, Optional, Tuple, Iterator, TYPE_CHECKING
+
+from json_output import dumps
+from reader_common import column_window, window_info, pop_option
+from sas_reader import SASReader
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from zone_maps import ZoneMap
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+DATASET_JSON_EXTENSIONS = ('.json',) + NDJSON_EXTENSIONS
+
+# A byte offset is kept for every ROW_INDEX_STRIDE-th row
+ROW_INDEX_STRIDE = 1000
+
+# Bytes read per block while decoding rows
+READ_BLOCK_SIZE = 1024 * 1024
+
+# Rows per DataFrame when filtering or counting
+SCAN_CHUNK_SIZE = 50000
+
+# Column data types read as numbers (decimal values may be stored as strings)
+NUMERIC_TYPES = ('integer', 'float', 'double', 'decimal')
+
+ROWS_KEY = re.compile(r'"(rows|itemData)"\s*:\s*\[')
+
+# Complete strings and structural characters, for walking the metadata prefix
+STRUCTURE_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{}]')
+
+SEPARATORS = re.compile(r'[\s,]*')
+
+CLOSERS = {'{': '}', '[': ']'}
+
+_DECODER = json.JSONDecoder()
+
+
+def dataset_object(document: Dict[str, Any], default_name: str) -> Tuple[str, Dict[str, Any]]:
+    """(name, dataset object) holding columns/items and rows/itemData
+
+    v1.1 keeps the dataset at the top level; v1.0 nests it under
+    clinicalData/referenceData -> itemGroupData -> <item group OID>.
+    """
+    if 'columns' in document or 'rows' in document:
+        return document.get('name') or default_name, document
+
+    root = document.get('clinicalData') or document.get('referenceData')
+    if not isinstance(root, dict) or not isinstance(root.get('itemGroupData'), dict):
+        raise ValueError('Invalid CDISC Dataset-JSON: missing clinicalData/referenceData or itemGroupData')
+
+    groups = root['itemGroupData']
+    if 'records' in groups and ('items' in groups or 'columns' in groups):
+        return groups.get('name') or default_name, groups
+    if not groups:
+        raise ValueError('Invalid CDISC Dataset-JSON: itemGroupData is empty')
+    key = next(iter(groups))
+    return groups[key].get('name') or key, groups[key]
+
+
+def find_rows_array(text: str) -> Optional[Tuple[int, List[str]]]:
+    """(position just after the '[' opening the rows, open brackets before it), or None
+
+    ``text`` must extend past the '[' of the rows key; occurrences of the key
+    inside string values are skipped.
+    """
+    for candidate in ROWS_KEY.finditer(text):
+        stack = []
+        last_end = 0
+        for match in STRUCTURE_TOKEN.finditer(text, 0, candidate.start()):
+            token = match.group()
+            if token in CLOSERS:
+                stack.append(token)
+            elif token in '}]':
+                stack.pop()
+            last_end = match.end()
+        if '"' in text[last_end:candidate.start()]:
+            continue  # the key text is inside a string value
+        return candidate.end(), stack
+    return None
+
+
+def utf8_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+class DatasetJsonReader(SASReader):
+    """Streaming reader for Dataset-JSON, with the SASReader request contract
+
+    Requests are always served from the file (like SASReader's chunked
+    engine); WHERE clauses are evaluated a chunk of rows at a time.
+    """
+
+    def __init__(self, file_path: str):
+        super().__init__(file_path)
+        self.ndjson = os.path.splitext(file_path)[1].lower() in NDJSON_EXTENSIONS
+        self.dataset_name = None
+        self.dataset_label = None
+        self.columns = []
+        self.total_rows = None
+        self.rows_start = None
+        self.rows_end = None
+        self.row_offsets = []
+        self.zone_map = None
+        self.engine = {'name': 'chunked', 'requested': 'auto'}
+
+    @property
+    def chunked(self) -> bool:
+        return True
+
+    def row_count(self) -> int:
+        if self._header_row_count() is None:
+            # Scanned in chunks so the zone map (with the chunks' byte offsets) is saved
+            for _ in self._iter_chunks(SCAN_CHUNK_SIZE):
+                pass
+        return self.total_rows
+
+    def _header_row_count(self) -> Optional[int]:
+        if self.total_rows is None and self._saved_zone_map().chunks:
+            self.total_rows = self._saved_zone_map().row_count
+        return self.total_rows
+
+    def _saved_zone_map(self) -> ZoneMap:
+        """The saved zone map of SCAN_CHUNK_SIZE chunks, read once (empty if there is none)"""
+        from zone_maps import ZoneMap
+
+        if self.zone_map is None:
+            self.zone_map = ZoneMap.load(self.file_path, SCAN_CHUNK_SIZE) or ZoneMap(SCAN_CHUNK_SIZE)
+        return self.zone_map
+
+    def _saved_origin(self, start_row: int) -> Optional[Tuple[int, int]]:
+        """(row, byte offset) of the saved zone map chunk holding start_row, if known"""
+        chunks = self._saved_zone_map().chunks
+        slot = start_row // SCAN_CHUNK_SIZE
+        if slot < len(chunks) and chunks[slot].get('byte_offset') is not None:
+            return slot * SCAN_CHUNK_SIZE, chunks[slot]['byte_offset']
+        return None
+
+    def load_file(self, compact: bool = False, catalog_path: Optional[str] = None, columns=None,
+                  engine: str = 'auto'):
+        """Parse the metadata and locate the rows (arguments kept for the reader interface)"""
+        try:
+            document = self._read_header()
+            self.dataset_name, dataset = dataset_object(
+                document, os.path.splitext(os.path.basename(self.file_path))[0])
+            self.dataset_label = dataset.get('label') or document.get('label') or ''
+
+            self.columns = [{
+                'name': item.get('name') or item.get('itemOID') or item.get('OID') or '',
+                'label': item.get('label') or '',
+                'type': item.get('dataType') or item.get('type') or 'string',
+                'length': item.get('length'),
+                'format': item.get('displayFormat') or ''
+            } for item in dataset.get('columns') or dataset.get('items') or []]
+            if not self.columns:
+                raise ValueError('Invalid CDISC Dataset-JSON: no columns/items found')
+
+            self.column_names = [col['name'] for col in self.columns]
+            self.all_columns = list(self.column_names)
+            self.column_labels = {col['name']: col['label'] for col in self.columns}
+            self.column_formats = {col['name']: col['format'] for col in self.columns}
+            self.variable_types = {col['name']: 'numeric' if col['type'] in NUMERIC_TYPES else 'character'
+                                   for col in self.columns}
+            records = dataset.get('records', document.get('records'))
+            self.total_rows = int(records) if records is not None else None
+            return True
+        except Exception as e:
+            return f"Error loading file: {str(e)}"
+
+    def _read_header(self) -> Dict[str, Any]:
+        """Parse everything except the rows; records where the rows start"""
+        with open(self.file_path, 'rb') as f:
+            if self.ndjson:
+                # NDJSON: the first line is the metadata, each following line a row
+                first = f.readline()
+                self.rows_start = f.tell()
+                self.row_offsets = [self.rows_start]
+                return json.loads(first.decode('utf-8-sig'))
+
+            bom = len(codecs.BOM_UTF8) if f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8 else 0
+            f.seek(bom)
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            text = ''
+            found = None
+            while found is None:
+                block = f.read(READ_BLOCK_SIZE)
+                text += decoder.decode(block, final=not block)
+                found = find_rows_array(text)
+                if not block:
+                    break
+
+        if found is None:
+            # No rows array: the whole (small) file is metadata
+            self.total_rows = 0
+            return json.loads(text)
+
+        start, stack = found
+        self.rows_start = bom + utf8_length(text[:start])
+        self.row_offsets = [self.rows_start]
+
+        # Metadata before the rows, closed off as if the rows were the last member
+        closing = ''.join(CLOSERS[bracket] for bracket in reversed(stack))
+        document = json.loads(text[:start] + ']' + closing)
+        _, dataset = dataset_object(document, '')
+        if dataset.get('columns') or dataset.get('items'):
+            return document
+
+        # Metadata after the rows: read past them once, then parse the tail too
+        for _ in self._iter_rows():
+            pass
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.rows_end)
+            tail = f.read().decode('utf-8')
+        return json.loads(text[:start] + ']' + tail.lstrip()[1:])
+
+    def _iter_rows(self, start_row: int = 0, origin: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, list]]:
+        """Yield (row_number, values) from start_row on, seeking via the row index
+
+        ``origin`` is a known (row, byte offset) at or before start_row, used
+        when it is closer than the row index; by default the saved zone map's.
+        """
+        if not self.row_offsets:
+            self.total_rows = 0
+            return
+        if origin is None and start_row >= SCAN_CHUNK_SIZE:
+            origin = self._saved_origin(start_row)
+
+        slot = min(start_row // ROW_INDEX_STRIDE, len(self.row_offsets) - 1)
+        row = slot * ROW_INDEX_STRIDE
+        base = self.row_offsets[slot]    # byte offset of buffer[0]
+        if origin is not None and row < origin[0] <= start_row:
+            row, base = origin
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(base)
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            buffer = ''
+            pos = 0
+            eof = False
+
+            while True:
+                pos = SEPARATORS.match(buffer, pos).end()
+                if pos >= len(buffer):
+                    if eof:
+                        break
+                    base += utf8_length(buffer[:pos])
+                    block = f.read(READ_BLOCK_SIZE)
+                    eof = not block
+                    buffer, pos = decoder.decode(block, final=eof), 0
+                    continue
+
+                if buffer[pos] == ']' and not self.ndjson:
+                    self.rows_end = base + utf8_length(buffer[:pos])
+                    break
+
+                try:
+                    values, end = _DECODER.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise ValueError(f"Malformed row {row + 1} at byte {base + utf8_length(buffer[:pos])}")
+                    # Row continues in the next block
+                    base += utf8_length(buffer[:pos])
+                    block = f.read(READ_BLOCK_SIZE)
+                    eof = not block
+                    buffer, pos = buffer[pos:] + decoder.decode(block, final=eof), 0
+                    continue
+
+                if row % ROW_INDEX_STRIDE == 0 and row // ROW_INDEX_STRIDE == len(self.row_offsets):
+                    self.row_offsets.append(base + utf8_length(buffer[:pos]))
+                if row >= start_row:
+                    yield row, values
+                row += 1
+                pos = end
+
+        self.total_rows = row
+
+    def _frame(self, rows: List[list], columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """DataFrame for decoded rows, with numeric columns as numbers"""
+        import pandas as pd
+
+        df = pd.DataFrame(rows, columns=self.column_names) if rows else pd.DataFrame(
+            {name: pd.Series(dtype=object) for name in self.column_names})
+        if columns is not None:
+            df = df[columns]
+        for col in df.columns:
+            if self.variable_types.get(col) == 'numeric' and not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        return df
+
+    def _iter_chunks(self, chunk_size: int, where_clause: Optional[str] = None) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """Yield (offset, chunk) pairs in row order, skipping chunks the zone map rules out
+
+        A full scan builds the zone map, with the byte offset of each chunk
+        so that later filtered scans seek straight to the chunks they need.
+        """
+        from zone_maps import ZoneMap, chunk_runs
+
+        if chunk_size == SCAN_CHUNK_SIZE:
+            zone_map = self._saved_zone_map() if self._saved_zone_map().chunks else None
+        else:
+            zone_map = ZoneMap.load(self.file_path, chunk_size)
+        candidates = zone_map.candidates(where_clause, self.temporal_formats) if zone_map is not None and where_clause else None
+        if candidates is not None:
+            for first, stop in chunk_runs(candidates):
+                origin = (first * chunk_size, zone_map.chunks[first].get('byte_offset'))
+                yield from self._read_chunks(chunk_size, first * chunk_size, (stop - first) * chunk_size,
+                                             origin if origin[1] is not None else None)
+            return
+
+        builder = ZoneMap(chunk_size, self.column_names) if zone_map is None else None
+        for offset, chunk in self._read_chunks(chunk_size):
+            if builder is not None:
+                builder.add_chunk(chunk)
+            yield offset, chunk
+        if builder is not None:
+            if chunk_size % ROW_INDEX_STRIDE == 0:
+                for i, chunk in enumerate(builder.chunks):
+                    slot = i * chunk_size // ROW_INDEX_STRIDE
+                    if slot < len(self.row_offsets):
+                        chunk['byte_offset'] = self.row_offsets[slot]
+            builder.save(self.file_path)
+            if chunk_size == SCAN_CHUNK_SIZE:
+                self.zone_map = builder
+
+    def _read_chunks(self, chunk_size: int, offset: int = 0, limit: int = 0,
+                     origin: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """Yield (offset, chunk) pairs for ``limit`` rows from ``offset`` (all rows if limit is 0)"""
+        rows = []
+        start = offset
+        for row, values in self._iter_rows(offset, origin):
+            if limit and row >= offset + limit:
+                break
+            rows.append(values)
+            if len(rows) == chunk_size:
+                yield start, self._frame(rows)
+                start += len(rows)
+                rows = []
+        if rows or start == offset == 0:
+            yield start, self._frame(rows)
+
+    def get_metadata(self, var_offset: int = 0, var_limit: Optional[int] = None) -> Dict[str, Any]:
+        if not self.columns:
+            return {"error": "File not loaded"}
+
+        by_name = {col['name']: col for col in self.columns}
+        variables = []
+        for name in column_window(self.column_names, var_offset, var_limit):
+            var_type = self.variable_types[name]
+            variables.append({
+                "name": name,
+                "type": var_type,
+                "label": by_name[name]['label'],
+                "format": by_name[name]['format'],
+                "length": by_name[name]['length'],
+                "dtype": 'object' if var_type == 'character' else 'float64',
+                "data_type": by_name[name]['type']
+            })
+
+        metadata = {
+            "total_rows": self.row_count(),
+            "total_variables": len(self.column_names),
+            "variables": variables,
+            "file_path": self.file_path,
+            "dataset_label": self.dataset_label or self.dataset_name
+        }
+        if var_offset or var_limit is not None:
+            metadata.update(window_info(len(self.column_names), var_offset, len(variables)))
+        return metadata
+
+    def get_data(self, start_row: int = 0, num_rows: int = 100,
+                 selected_vars: List[str] = None, where_clause: str = None,
+                 var_offset: int = 0, var_limit: Optional[int] = None,
+                 mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Get a page of rows, reading only as far into the file as the page needs
+
+        A WHERE clause or row mask needs one pass over the file to count the
+        matching rows; only the page's rows are kept.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not self.columns:
+            return {"error": "File not loaded"}
+
+        try:
+            windowed = bool(var_offset) or var_limit is not None
+            base = [v for v in selected_vars or [] if v in self.column_names] or self.column_names
+            columns = column_window(base, var_offset, var_limit) if windowed else base
+
+            if (where_clause and where_clause.strip()) or mask is not None:
+                pages = []
+                filtered_rows = 0
+                for offset, chunk in self._iter_chunks(SCAN_CHUNK_SIZE, where_clause):
+                    keep = np.ones(len(chunk), dtype=bool)
+                    if mask is not None:
+                        keep &= mask[offset:offset + len(chunk)]
+                    condition = self.parse_where_condition(where_clause, chunk) if where_clause else None
+                    if condition is not None:
+                        keep &= np.asarray(condition, dtype=bool)
+                    matched = chunk.loc[keep, columns]
+                    lo = max(start_row - filtered_rows, 0)
+                    hi = start_row + num_rows - filtered_rows
+                    if hi > 0 and lo < len(matched):
+                        pages.append(matched.iloc[lo:hi])
+                    filtered_rows += len(matched)
+                page_df = pd.concat(pages) if pages else self._frame([], columns)
+            else:
+                rows = []
+                for row, values in self._iter_rows(start_row):
+                    if row >= start_row + num_rows:
+                        break
+                    rows.append(values)
+                page_df = self._frame(rows, columns)
+                filtered_rows = self.row_count()
+
+            data = self._page_records(page_df)
+            result = {
+                "data": data,
+                "total_rows": self.row_count(),
+                "filtered_rows": filtered_rows,
+                "start_row": start_row,
+                "returned_rows": len(data),
+                "columns": list(page_df.columns)
+            }
+            if windowed:
+                result.update(window_info(len(base), var_offset, len(page_df.columns)))
+            return result
+
+        except Exception as e:
+            return {"error": f"Error retrieving data: {str(e)}"}
+
+    def get_filtered_row_count(self, where_clause: str, mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Get count of rows matching WHERE clause (within ``mask`` if given)"""
+        if not self.columns:
+            return {"error": "File not loaded"}
+
+        try:
+            if mask is not None:
+                return {"count": int((mask & self.filter_mask(where_clause)).sum())}
+            if not where_clause or not where_clause.strip():
+                return {"count": self.row_count()}
+            return {"count": int(self.filter_mask(where_clause).sum())}
+        except Exception as e:
+            return {"error": f"Error counting rows: {str(e)}"}
+
+    def get_unique_values(self, column_name: str, include_count: bool = False,
+                          mask: Optional[np.ndarray] = None, approximate: bool = False,
+                          top_k: Optional[int] = None) -> Dict[str, Any]:
+        """Get unique values for a column, counted a chunk at a time (or sketched with ``approximate``)"""
+        import pandas as pd
+
+        if not self.columns:
+            return {"error": "File not loaded"}
+
+        try:
+            actual_col = next((c for c in self.column_names if c.upper() == column_name.upper()), None)
+            if actual_col is None:
+                return {"error": f"Column '{column_name}' not found"}
+
+            def columns():
+                for offset, chunk in self._iter_chunks(SCAN_CHUNK_SIZE):
+                    column = chunk[actual_col]
+                    yield column if mask is None else column[mask[offset:offset + len(chunk)]]
+
+            if approximate:
+                from sketches import approximate_counts, DEFAULT_TOP_K
+                pairs, summary = approximate_counts(columns(), top_k or DEFAULT_TOP_K)
+                values = []
+                for val, count in pairs:
+                    val = val.item() if hasattr(val, 'item') else val
+                    values.append({"value": val, "count": count} if include_count else val)
+                return {"values": values, "approximate": summary}
+
+            counts = None
+            for column in columns():
+                chunk_counts = column.value_counts(dropna=False)
+                counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+
+            values = []
+            if counts is not None:
+                for val, count in counts.sort_values(ascending=False, kind='stable').items():
+                    val = None if pd.isna(val) else (val.item() if hasattr(val, 'item') else val)
+                    values.append({"value": val, "count": int(count)} if include_count else val)
+            return {"values": values}
+
+        except Exception as e:
+            return {"error": f"Error getting unique values: {str(e)}"}
+
+    def _read_positions(self, positions: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Rows at sorted positions, reading each run of nearby rows in one pass"""
+        import numpy as np
+        import pandas as pd
+        from sampling import COALESCE_GAP
+
+        parts = []
+        breaks = np.flatnonzero(np.diff(positions) > COALESCE_GAP) + 1
+        for run in np.split(positions, breaks) if len(positions) else []:
+            lo, hi = int(run[0]), int(run[-1])
+            _, block = next(self._read_chunks(hi - lo + 1, lo, hi - lo + 1))
+            parts.append(block.iloc[run - lo])
+        frame = pd.concat(parts, ignore_index=True) if parts else self._frame([])
+        return frame[columns] if columns is not None else frame
+
+    def check_keys(self, keys: List[str], start_row: int = 0, num_rows: int = 100) -> Dict[str, Any]:
+        """Whether ``keys`` identify every row, with a page of the duplicate rows (see key_check)"""
+        from key_check import check_keys, resolve_keys
+
+        if not self.columns:
+            return {"error": "File not loaded"}
+
+        try:
+            keys = resolve_keys(keys, self.column_names)
+            result, page = check_keys(self._iter_chunks(SCAN_CHUNK_SIZE), self._read_positions,
+                                      keys, start_row, num_rows)
+            result["data"] = self._page_records(page)
+            result["columns"] = list(page.columns)
+            return result
+
+        except Exception as e:
+            return {"error": f"Error checking keys: {str(e)}"}
+
+    def search(self, *args, **kwargs) -> Dict[str, Any]:
+        return {"error": "Search is not available for Dataset-JSON files"}
+
+    def sample(self, *args, **kwargs) -> Dict[str, Any]:
+        return {"error": "Sampling is not available for Dataset-JSON files"}
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(dumps({"error": "Usage: dataset_json_reader.py <metadata|data|count|unique|check_keys> <file> [args...]"}))
+        return
+
+    approximate = '--approximate' in sys.argv
+    if approximate:
+        sys.argv.remove('--approximate')
+
+    try:
+        filter_set = pop_option(sys.argv, '--filter-set')
+        top_k = pop_option(sys.argv, '--top-k')
+        top_k = int(top_k) if top_k else None
+    except ValueError as e:
+        print(dumps({"error": str(e)}))
+        return
+
+    command = sys.argv[1]
+    file_path = sys.argv[2]
+
+    try:
+        reader = DatasetJsonReader(file_path)
+        load_result = reader.load_file()
+        if load_result is not True:
+            print(dumps({"error": load_result}))
+            return
+
+        from filter_sets import resolve_filter_set
+
+        if command == "metadata":
+            var_offset = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else 0
+            var_limit = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else None
+            print(dumps(reader.get_metadata(var_offset, var_limit)))
+
+        elif command == "data":
+            start_row = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+            num_rows = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+            selected_vars = sys.argv[5].split(',') if len(sys.argv) > 5 and sys.argv[5] else None
+            where_clause = sys.argv[6] if len(sys.argv) > 6 else None
+            var_offset = int(sys.argv[7]) if len(sys.argv) > 7 and sys.argv[7] else 0
+            var_limit = int(sys.argv[8]) if len(sys.argv) > 8 and sys.argv[8] else None
+            print(dumps(reader.get_data(start_row, num_rows, selected_vars, where_clause,
+                                             var_offset, var_limit, resolve_filter_set(reader, filter_set))))
+
+        elif command == "count":
+            where_clause = sys.argv[3] if len(sys.argv) > 3 else ''
+            print(dumps(reader.get_filtered_row_count(where_clause, resolve_filter_set(reader, filter_set))))
+
+        elif command == "check_keys":
+            if len(sys.argv) < 4:
+                print(dumps({"error": "File path and key variables required"}))
+                return
+            keys = [k.strip() for k in sys.argv[3].split(',') if k.strip()]
+            start_row = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else 0
+            num_rows = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else 100
+            print(dumps(reader.check_keys(keys, start_row, num_rows)))
+
+        elif command == "unique":
+            if len(sys.argv) < 4:
+                print(dumps({"error": "File path and column name required"}))
+                return
+            include_count = sys.argv[4].lower() == 'true' if len(sys.argv) > 4 else False
+            print(dumps(reader.get_unique_values(sys.argv[3], include_count,
+                                                      resolve_filter_set(reader, filter_set),
+                                                      approximate, top_k)))
+
+        else:
+            print(dumps({"error": f"Unknown command: {command}"}))
+
+    except Exception as e:
+        print(dumps({"error": f"Unexpected error: {str(e)}"}))
+
+
+if __name__ == "__main__":
+    main()
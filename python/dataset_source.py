@@ -0,0 +1,152 @@
+"""
+Column- and row-range access to a dataset in any supported format
+(.sas7bdat, .xpt, .rds/.RData), used by the multi-dataset commands
+(compare, join, ...) so they read only the columns and rows they need
+"""
+
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+R_EXTENSIONS = ('.rds', '.rdata', '.rda')
+
+
+class DatasetSource:
+    """A dataset file that can be read a few columns or rows at a time
+
+    SAS and XPT files are read with pyreadstat column projection
+    (``usecols``) and row ranges, with temporal variables left as SAS
+    numbers (see temporal.py). pyreadr cannot do either, so R files are
+    loaded once and sliced in memory. A reader's already loaded DataFrame
+    can be passed as ``frame`` to slice it in memory instead of the file.
+    ``encoding`` is passed to pyreadstat (see text_encoding).
+    """
+
+    def __init__(self, file_path: str, object_name: Optional[str] = None, frame=None,
+                 encoding: Optional[str] = None):
+        self.file_path = file_path
+        self.object_name = object_name
+        self.encoding = encoding
+        self.ext = Path(file_path).suffix.lower()
+        if self.ext not in ('.sas7bdat', '.xpt') + R_EXTENSIONS:
+            raise ValueError(f"Unsupported file type: {self.ext}")
+
+        self._meta = None
+        self._row_count = None
+        self._frame = frame
+
+    def _read_function(self):
+        import pyreadstat
+        return pyreadstat.read_sas7bdat if self.ext == '.sas7bdat' else pyreadstat.read_xport
+
+    @property
+    def in_memory(self) -> bool:
+        return self.ext in R_EXTENSIONS or self._frame is not None
+
+    def _r_frame(self):
+        if self._frame is None:
+            from r_reader import RDataReader
+            reader = RDataReader(self.file_path)
+            result = reader.load_file(self.object_name)
+            if result is not True:
+                raise ValueError(result)
+            self._frame = reader.df
+        return self._frame
+
+    def _header(self):
+        if self._meta is None:
+            from reader_common import read_header
+            _, self._meta = read_header(self._read_function(), self.file_path, self.encoding)
+        return self._meta
+
+    @property
+    def columns(self) -> List[str]:
+        if self.ext in R_EXTENSIONS:
+            return list(self._r_frame().columns)
+        return list(self._header().column_names)
+
+    @property
+    def row_count(self) -> int:
+        if self._row_count is None:
+            if self.ext in R_EXTENSIONS:
+                self._row_count = len(self._r_frame())
+            elif self._frame is not None:
+                self._row_count = len(self._frame)
+            elif self._header().number_rows is not None:
+                self._row_count = self._header().number_rows
+            else:
+                # XPORT headers carry no row count
+                columns = self.columns
+                self._row_count = len(self.read(columns[:1])) if columns else 0
+        return self._row_count
+
+    def variables(self) -> Dict[str, Dict[str, Any]]:
+        """Variable attributes (type, label, format, length) by name"""
+        if self.ext in R_EXTENSIONS:
+            from compact import is_text_column
+            df = self._r_frame()
+            return {col: {'type': 'character' if is_text_column(df[col]) else 'numeric',
+                          'label': '', 'format': '', 'length': None}
+                    for col in df.columns}
+
+        meta = self._header()
+        labels = meta.column_names_to_labels or {}
+        formats = meta.original_variable_types or {}
+        types = meta.readstat_variable_types or {}
+        widths = meta.variable_storage_width or {}
+        return {col: {'type': 'character' if types.get(col) == 'string' else 'numeric',
+                      'label': labels.get(col) or '',
+                      'format': formats.get(col) or '',
+                      'length': widths.get(col)}
+                for col in meta.column_names}
+
+    def dataset_label(self) -> str:
+        if self.ext in R_EXTENSIONS:
+            return ''
+        meta = self._header()
+        return (getattr(meta, 'file_label', None) or getattr(meta, 'table_name', None) or '').strip()
+
+    def read(self, columns: Optional[List[str]] = None, row_offset: int = 0,
+             row_limit: int = 0):
+        """Read the given columns (all if None) for a row range (to the end if row_limit is 0)"""
+        if self.in_memory:
+            df = self._r_frame()
+            if columns is not None:
+                df = df[columns]
+            end = row_offset + row_limit if row_limit else None
+            return df.iloc[row_offset:end]
+
+        from text_encoding import encoding_kwargs
+
+        kwargs = {'row_offset': row_offset, 'row_limit': row_limit,
+                  'disable_datetime_conversion': True, **encoding_kwargs(self.encoding)}
+        if columns is not None:
+            kwargs['usecols'] = columns
+        df, meta = self._read_function()(self.file_path, **kwargs)
+        if self._meta is None:
+            self._meta = meta
+        if not row_offset and not row_limit and self._row_count is None:
+            self._row_count = len(df)
+        # pyreadstat returns projected columns in file order
+        return df[columns] if columns is not None else df
+
+    def iter_chunks(self, chunk_size: int, columns: Optional[List[str]] = None) -> Iterator[Tuple[int, Any]]:
+        """Yield (offset, chunk) pairs covering the dataset in row order"""
+        if self.in_memory:
+            df = self._r_frame()
+            if columns is not None:
+                df = df[columns]
+            for offset in range(0, len(df), chunk_size):
+                yield offset, df.iloc[offset:offset + chunk_size]
+            return
+
+        import pyreadstat
+        from text_encoding import encoding_kwargs
+
+        offset = 0
+        kwargs = {'disable_datetime_conversion': True, **encoding_kwargs(self.encoding)}
+        if columns is not None:
+            kwargs['usecols'] = columns
+        for chunk, _ in pyreadstat.read_file_in_chunks(self._read_function(), self.file_path,
+                                                       chunksize=chunk_size, **kwargs):
+            yield offset, chunk
+            offset += len(chunk)
@@ -0,0 +1,127 @@
+"""
+Engine selection for opening a dataset, from its estimated memory footprint
+
+- memory:   load every column into pandas as read (fastest queries)
+- columnar: load a batch of columns at a time, converting each batch to
+            compact dtypes (see compact.py) before reading the next, so
+            peak memory stays near the compact size
+- chunked:  keep only the header and stream rows in chunks per request
+
+The footprint is estimated from header metadata only: row count times the
+storage width of each variable plus pandas/Python per-value overhead.
+"""
+
+import os
+import importlib.util
+from typing import Dict, Any, Optional
+
+ENGINES = ('memory', 'columnar', 'chunked')
+
+# Share of the currently available memory a dataset may take
+MEMORY_FRACTION = 0.5
+
+# Bytes per value on top of the storage width
+NUMERIC_BYTES = 8
+OBJECT_STRING_OVERHEAD = 57    # CPython str header plus the object pointer
+COMPACT_STRING_OVERHEAD = 4    # Arrow offsets (or categorical codes)
+
+# Columns read per batch by the columnar engine
+COLUMNAR_BATCH = 64
+
+HAS_PSUTIL = importlib.util.find_spec('psutil') is not None
+
+
+def available_memory() -> Optional[int]:
+    """Bytes of memory currently available to this process, or None if unknown"""
+    if HAS_PSUTIL:
+        import psutil
+        return int(psutil.virtual_memory().available)
+
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def estimate_footprint(meta, row_count: Optional[int], columns=None) -> Dict[str, int]:
+    """Estimated bytes for the memory and columnar engines, from header metadata"""
+    rows = row_count or 0
+    types = getattr(meta, 'readstat_variable_types', None) or {}
+    widths = getattr(meta, 'variable_storage_width', None) or {}
+
+    memory = 0
+    columnar = 0
+    for col in columns or meta.column_names:
+        if types.get(col) == 'string':
+            width = widths.get(col) or 8
+            memory += width + OBJECT_STRING_OVERHEAD
+            columnar += width + COMPACT_STRING_OVERHEAD
+        else:
+            memory += NUMERIC_BYTES
+            columnar += NUMERIC_BYTES
+
+    return {'memory': rows * memory, 'columnar': rows * columnar}
+
+
+def choose_engine(meta, row_count: Optional[int], requested: str = 'auto',
+                  columns=None) -> Dict[str, Any]:
+    """Pick an engine and describe the choice for the response
+
+    An explicitly requested engine is used as is. With 'auto', the first
+    engine whose estimate fits within MEMORY_FRACTION of available memory
+    wins; if memory cannot be measured the dataset is loaded in memory.
+    """
+    if requested not in ENGINES + ('auto',):
+        raise ValueError(f"Unknown engine '{requested}'. Use one of: auto, {', '.join(ENGINES)}")
+
+    estimate = estimate_footprint(meta, row_count, columns)
+    available = available_memory()
+    budget = int(available * MEMORY_FRACTION) if available is not None else None
+
+    if requested != 'auto':
+        name = requested
+    elif budget is None or estimate['memory'] <= budget:
+        name = 'memory'
+    elif estimate['columnar'] <= budget:
+        name = 'columnar'
+    else:
+        name = 'chunked'
+
+    return {
+        'name': name,
+        'requested': requested,
+        'estimated_bytes': estimate,
+        'available_bytes': available
+    }
+
+
+def load_columnar(read_function, file_path: str, columns, **kwargs):
+    """Read a file a batch of columns at a time, compacting each batch
+
+    Returns (df, meta, memory_report) like a pyreadstat read followed by
+    compact.compact_dataframe, without ever holding the uncompacted file.
+    """
+    import pandas as pd
+    from compact import compact_dataframe
+
+    frames = []
+    report = []
+    meta = None
+    for i in range(0, len(columns), COLUMNAR_BATCH):
+        batch = list(columns[i:i + COLUMNAR_BATCH])
+        df, batch_meta = read_function(file_path, usecols=batch, **kwargs)
+        df, batch_report = compact_dataframe(df[batch])
+        frames.append(df)
+        report.extend(batch_report)
+        meta = meta or batch_meta
+
+    df = pd.concat(frames, axis=1) if frames else pd.DataFrame()
+    return df, meta, report
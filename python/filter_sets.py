@@ -0,0 +1,338 @@
+"""
+Named filter sets: WHERE clause results saved as row bitmaps per dataset
+
+A filter set stores the rows a WHERE clause selected as a packed bitmap (one
+bit per row, zlib-compressed) in a sidecar file next to the dataset, with
+the dataset's size and mtime as its fingerprint. Sets are combined with
+AND/OR/NOT by bitwise operations on the packed bytes, so "SAFETY AND NOT
+ALT3" is answered without evaluating either WHERE clause again. When the
+dataset changes, stored bitmaps are dropped and rebuilt from their WHERE
+clauses the next time they are used.
+"""
+
+from __future__ import annotations
+
+import sys
+import os
+import re
+import json
+import zlib
+import base64
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
+
+from json_output import dumps
+from reader_common import fingerprint
+
+if TYPE_CHECKING:
+    import numpy as np
+
+FILTER_SETS_VERSION = 1
+
+# Sidecar file written next to the dataset
+SIDECAR_SUFFIX = '.filtersets.json'
+
+# Set names may contain spaces; such names are double-quoted in expressions
+SET_NAME = re.compile(r'^[^"()&|~!\s][^"()&|~!]*$')
+
+EXPRESSION_TOKEN = re.compile(r'\s*(?:(\()|(\))|(&|\|)|(~|!)|"([^"]+)"|([A-Za-z_][A-Za-z0-9_.-]*))')
+
+
+def sidecar_path(file_path: str) -> str:
+    return file_path + SIDECAR_SUFFIX
+
+
+def pack_mask(mask: np.ndarray) -> np.ndarray:
+    import numpy as np
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+
+def unpack_mask(bits: np.ndarray, row_count: int) -> np.ndarray:
+    import numpy as np
+    return np.unpackbits(bits, count=row_count).astype(bool)
+
+
+def encode_bits(bits: np.ndarray) -> str:
+    return base64.b64encode(zlib.compress(bits.tobytes())).decode('ascii')
+
+
+def decode_bits(text: str) -> np.ndarray:
+    import numpy as np
+    return np.frombuffer(zlib.decompress(base64.b64decode(text)), dtype=np.uint8)
+
+
+def parse_expression(expression: str):
+    """Parse 'A AND (B OR NOT C)' into nested tuples: ('and', l, r), ('or', l, r), ('not', x), ('set', name)
+
+    AND/OR/NOT are case-insensitive; &, | and ~ (or !) may be used instead.
+    Names containing spaces go in double quotes. NOT binds tightest, then AND.
+    """
+    tokens = []
+    pos = 0
+    text = expression.strip()
+    while pos < len(text):
+        match = EXPRESSION_TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Invalid filter set expression near '{text[pos:].strip()}'")
+        pos = match.end()
+        open_paren, close_paren, binary, negate, quoted, word = match.groups()
+        if open_paren or close_paren:
+            tokens.append(open_paren or close_paren)
+        elif binary:
+            tokens.append('and' if binary == '&' else 'or')
+        elif negate:
+            tokens.append('not')
+        elif quoted:
+            tokens.append(('set', quoted))
+        elif word.upper() in ('AND', 'OR', 'NOT'):
+            tokens.append(word.lower())
+        else:
+            tokens.append(('set', word))
+
+    if not tokens:
+        raise ValueError("Empty filter set expression")
+
+    def parse_or(i):
+        node, i = parse_and(i)
+        while i < len(tokens) and tokens[i] == 'or':
+            right, i = parse_and(i + 1)
+            node = ('or', node, right)
+        return node, i
+
+    def parse_and(i):
+        node, i = parse_not(i)
+        while i < len(tokens) and tokens[i] == 'and':
+            right, i = parse_not(i + 1)
+            node = ('and', node, right)
+        return node, i
+
+    def parse_not(i):
+        if i < len(tokens) and tokens[i] == 'not':
+            operand, i = parse_not(i + 1)
+            return ('not', operand), i
+        return parse_atom(i)
+
+    def parse_atom(i):
+        if i >= len(tokens):
+            raise ValueError("Incomplete filter set expression")
+        token = tokens[i]
+        if token == '(':
+            node, i = parse_or(i + 1)
+            if i >= len(tokens) or tokens[i] != ')':
+                raise ValueError("Unbalanced parentheses in filter set expression")
+            return node, i + 1
+        if isinstance(token, tuple):
+            return token, i + 1
+        raise ValueError(f"Unexpected '{token}' in filter set expression")
+
+    tree, end = parse_or(0)
+    if end != len(tokens):
+        raise ValueError(f"Unexpected '{tokens[end]}' in filter set expression")
+    return tree
+
+
+def expression_sets(tree) -> List[str]:
+    """Set names referenced by a parsed expression"""
+    if tree[0] == 'set':
+        return [tree[1]]
+    return [name for child in tree[1:] for name in expression_sets(child)]
+
+
+def evaluate_packed(tree, packed: Dict[str, np.ndarray]) -> np.ndarray:
+    """Evaluate a parsed expression over packed bitmaps (padding bits are ignored on unpack)"""
+    import numpy as np
+
+    op = tree[0]
+    if op == 'set':
+        return packed[tree[1].upper()]
+    if op == 'not':
+        return np.invert(evaluate_packed(tree[1], packed))
+    left = evaluate_packed(tree[1], packed)
+    right = evaluate_packed(tree[2], packed)
+    return np.bitwise_and(left, right) if op == 'and' else np.bitwise_or(left, right)
+
+
+class FilterSetStore:
+    """Filter sets of one dataset (or one object of an R file), persisted in a sidecar file"""
+
+    def __init__(self, file_path: str, object_name: Optional[str] = None):
+        self.file_path = file_path
+        self.object_name = object_name or ''
+        self.path = sidecar_path(file_path)
+        self.document = None
+        self.packed = {}
+
+    def _load(self) -> Dict[str, Any]:
+        current = fingerprint(self.file_path)
+        if self.document is not None and self.document['fingerprint'] == current:
+            return self.document
+
+        document = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    document = json.load(f)
+            except (OSError, ValueError):
+                document = None
+        if not document or document.get('version') != FILTER_SETS_VERSION:
+            document = {'version': FILTER_SETS_VERSION, 'fingerprint': current, 'datasets': {}}
+
+        if document['fingerprint'] != current:
+            # Dataset changed: keep the definitions, rebuild bitmaps on use
+            for sets in document['datasets'].values():
+                for entry in sets.values():
+                    entry.pop('bits', None)
+                    entry.pop('rows', None)
+            document['fingerprint'] = current
+
+        self.document = document
+        self.packed = {}
+        return document
+
+    def _sets(self) -> Dict[str, Dict[str, Any]]:
+        return self._load()['datasets'].setdefault(self.object_name, {})
+
+    def _write(self) -> None:
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.document, f)
+        os.replace(tmp_path, self.path)
+
+    def _find(self, name: str) -> Tuple[str, Dict[str, Any]]:
+        sets = self._sets()
+        for key, entry in sets.items():
+            if key.upper() == name.upper():
+                return key, entry
+        raise ValueError(f"Filter set '{name}' not found")
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [{
+            'name': name,
+            'where_clause': entry['where_clause'],
+            'rows': entry.get('rows'),
+            'total_rows': entry.get('total_rows'),
+            'saved': entry.get('saved'),
+            'stale': 'bits' not in entry
+        } for name, entry in self._sets().items()]
+
+    def save(self, name: str, where_clause: str, mask: np.ndarray) -> Dict[str, Any]:
+        """Store the rows selected by where_clause (mask) under name, replacing any set of that name"""
+        name = name.strip()
+        if not SET_NAME.match(name) or name.upper() in ('AND', 'OR', 'NOT'):
+            raise ValueError(f"Invalid filter set name '{name}'")
+
+        sets = self._sets()
+        for key in [key for key in sets if key.upper() == name.upper()]:
+            del sets[key]
+
+        bits = pack_mask(mask)
+        sets[name] = {
+            'where_clause': where_clause,
+            'rows': int(mask.sum()),
+            'total_rows': int(len(mask)),
+            'saved': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'bits': encode_bits(bits)
+        }
+        self.packed[name.upper()] = bits
+        self._write()
+        return {'name': name, 'where_clause': where_clause,
+                'rows': sets[name]['rows'], 'total_rows': sets[name]['total_rows']}
+
+    def delete(self, name: str) -> bool:
+        try:
+            key, _ = self._find(name)
+        except ValueError:
+            return False
+        del self._sets()[key]
+        self.packed.pop(key.upper(), None)
+        self._write()
+        return True
+
+    def memory_usage(self) -> int:
+        """Bytes held by the decoded bitmaps kept for reuse"""
+        return sum(bits.nbytes for bits in self.packed.values())
+
+    def _packed(self, name: str, reader, row_count: int) -> np.ndarray:
+        """Packed bitmap of a set, rebuilt from its WHERE clause if it is stale"""
+        key, entry = self._find(name)
+        if key.upper() in self.packed:
+            return self.packed[key.upper()]
+
+        if 'bits' in entry and entry.get('total_rows') == row_count:
+            bits = decode_bits(entry['bits'])
+        elif reader is not None:
+            self.save(key, entry['where_clause'], reader.filter_mask(entry['where_clause']))
+            return self.packed[key.upper()]
+        else:
+            raise ValueError(f"Filter set '{name}' is out of date; open the dataset to rebuild it")
+
+        self.packed[key.upper()] = bits
+        return bits
+
+    def resolve(self, expression: str, reader, row_count: Optional[int] = None) -> np.ndarray:
+        """Boolean row mask for an expression over saved sets
+
+        ``reader`` rebuilds sets whose dataset has changed since they were
+        saved; ``row_count`` defaults to reader.row_count().
+        """
+        tree = parse_expression(expression)
+        if row_count is None:
+            row_count = reader.row_count()
+        packed = {name.upper(): self._packed(name, reader, row_count) for name in expression_sets(tree)}
+        return unpack_mask(evaluate_packed(tree, packed), row_count)
+
+
+def resolve_filter_set(reader, expression: Optional[str], object_name: Optional[str] = None):
+    """Row mask for a filter set expression on a loaded reader, or None without one"""
+    if not expression or not expression.strip():
+        return None
+    return FilterSetStore(reader.file_path, object_name).resolve(expression, reader)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(dumps({'error': 'Usage: filter_sets.py <save|list|delete|count> <file> [args...] [--object name]'}))
+        sys.exit(1)
+
+    from reader_common import pop_option
+    object_name = pop_option(sys.argv, '--object')
+    command = sys.argv[1]
+    file_path = sys.argv[2]
+
+    try:
+        store = FilterSetStore(file_path, object_name)
+
+        if command == 'list':
+            print(dumps({'file_path': file_path, 'filter_sets': store.list()}))
+
+        elif command == 'delete':
+            if len(sys.argv) < 4:
+                print(dumps({'error': 'Usage: filter_sets.py delete <file> <name>'}))
+                sys.exit(1)
+            print(dumps({'deleted': store.delete(sys.argv[3])}))
+
+        elif command in ('save', 'count'):
+            if len(sys.argv) < 4 or (command == 'save' and len(sys.argv) < 5):
+                print(dumps({'error': 'Usage: filter_sets.py save <file> <name> <where> | count <file> <expression>'}))
+                sys.exit(1)
+
+            from reader_service import open_reader
+            reader = open_reader(file_path, object_name)
+            if command == 'save':
+                print(dumps(store.save(sys.argv[3], sys.argv[4], reader.filter_mask(sys.argv[4]))))
+            else:
+                mask = store.resolve(sys.argv[3], reader)
+                print(dumps({'expression': sys.argv[3], 'count': int(mask.sum()),
+                                  'total_rows': int(len(mask))}))
+
+        else:
+            print(dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(dumps({'error': str(e)}))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+SAS value formats from a format catalog (.sas7bcat)
+
+A catalog is parsed once per fingerprint (path, size, mtime) and each format
+is compiled into a lookup table (a pandas Index of raw values plus an array of
+labels). Applying a format factorizes the column, looks up each distinct value
+once and takes the labels through the codes, so a 10M-row column costs one
+hashing pass rather than a dictionary lookup per cell.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Dict, Any, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Width/decimals suffix of a format reference: $SEXF8. -> $SEXF
+FORMAT_SUFFIX = re.compile(r'\d*\.?\d*$')
+
+# Parsed catalogs by fingerprint, kept for the life of the process
+_CATALOGS: Dict[Tuple[str, int, int], 'FormatCatalog'] = {}
+
+
+def catalog_fingerprint(catalog_path: str) -> Tuple[str, int, int]:
+    stat = os.stat(catalog_path)
+    return os.path.abspath(catalog_path), stat.st_size, stat.st_mtime_ns
+
+
+def format_name(format_ref: Optional[str]) -> str:
+    """Catalog name of a format reference, e.g. '$SEXF8.' -> '$SEXF'"""
+    return FORMAT_SUFFIX.sub('', (format_ref or '').strip()).upper()
+
+
+class FormatCatalog:
+    """Value formats of one .sas7bcat file, compiled on first use"""
+
+    def __init__(self, value_labels: Dict[str, Dict[Any, str]]):
+        self.value_labels = {name.upper(): labels for name, labels in value_labels.items()}
+        self._lookups = {}
+
+    @classmethod
+    def load(cls, catalog_path: str) -> 'FormatCatalog':
+        """Parse a catalog, reusing the cached one while the file is unchanged"""
+        fingerprint = catalog_fingerprint(catalog_path)
+        catalog = _CATALOGS.get(fingerprint)
+        if catalog is None:
+            import pyreadstat
+            try:
+                _, meta = pyreadstat.read_sas7bcat(catalog_path, output_format='dict')
+            except TypeError:
+                _, meta = pyreadstat.read_sas7bcat(catalog_path)
+            catalog = cls(meta.value_labels or {})
+            _CATALOGS[fingerprint] = catalog
+        return catalog
+
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        """Catalog format matching a format reference, or None"""
+        name = format_name(name)
+        if not name:
+            return None
+        for candidate in (name, name.lstrip('$'), '$' + name):
+            if candidate in self.value_labels:
+                return candidate
+        return None
+
+    def variable_formats(self, meta) -> Dict[str, str]:
+        """Map dataset variables to catalog formats using the dataset metadata"""
+        assigned = {}
+        by_label = getattr(meta, 'variable_to_label', None) or {}
+        formats = getattr(meta, 'original_variable_types', None) or {}
+        for col in meta.column_names:
+            name = self.resolve(by_label.get(col)) or self.resolve(formats.get(col))
+            if name is not None:
+                assigned[col] = name
+        return assigned
+
+    def _lookup(self, name: str):
+        """(Index of raw values, array of labels) for a format, built once"""
+        if name not in self._lookups:
+            import numpy as np
+            import pandas as pd
+            labels = self.value_labels[name]
+            self._lookups[name] = (pd.Index(list(labels.keys())),
+                                   np.array(list(labels.values()), dtype=object))
+        return self._lookups[name]
+
+    def apply(self, series: pd.Series, name: str) -> pd.Series:
+        """Formatted values of a column; values without a label keep their raw value"""
+        import numpy as np
+        import pandas as pd
+
+        keys, labels = self._lookup(name)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+
+        # One lookup per distinct value, then a single take through the codes
+        positions = keys.get_indexer(uniques)
+        formatted = np.asarray(uniques, dtype=object).copy()
+        found = positions >= 0
+        formatted[found] = labels[positions[found]]
+
+        values = np.append(formatted, None)[codes]
+        return pd.Series(values, index=series.index, name=series.name, dtype=object)
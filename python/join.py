@@ -0,0 +1,301 @@
+"""
+Keyed join preview across two datasets (.sas7bdat, .xpt, .rds/.RData)
+
+Only the key columns of both datasets are read to build the join. A hash
+index (rows grouped by key) is built on the smaller dataset and probed with
+the keys of the larger one, producing matching row positions rather than
+joined rows. Pages are then assembled by reading just the rows they need,
+using the same paging contract as SASReader.get_data.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
+
+from json_output import dumps
+from dataset_source import DatasetSource
+from sas_reader import SASReader
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+JOIN_TYPES = ('inner', 'left')
+
+# Joined rows assembled at a time when evaluating a WHERE clause
+FILTER_CHUNK_SIZE = 100000
+
+# Suffix for right-hand variables whose names clash with left-hand ones
+RIGHT_SUFFIX = '_right'
+
+
+def resolve_keys(keys: List[str], columns: List[str]) -> List[str]:
+    lookup = {col.upper(): col for col in columns}
+    missing = [key for key in keys if key.upper() not in lookup]
+    if missing:
+        raise ValueError(f"Key variable(s) not found: {', '.join(missing)}")
+    return [lookup[key.upper()] for key in keys]
+
+
+def hash_join_positions(left_keys: pd.DataFrame, right_keys: pd.DataFrame,
+                        how: str = 'inner') -> Tuple[np.ndarray, np.ndarray]:
+    """Row positions (left_pos, right_pos) of the join, in left row order
+
+    The smaller side is grouped by key into a CSR-style index (positions
+    sorted by key code plus start offsets); the larger side probes it with
+    vectorized lookups. Unmatched left rows in a left join get right_pos -1.
+    Missing key values match each other, as in a SAS merge.
+    """
+    import numpy as np
+    import pandas as pd
+
+    right_keys = right_keys.set_axis(list(left_keys.columns), axis=1)
+    left_is_small = len(left_keys) <= len(right_keys)
+    small, large = (left_keys, right_keys) if left_is_small else (right_keys, left_keys)
+
+    # One integer code per distinct key tuple across both sides
+    codes = pd.concat([small, large], ignore_index=True).groupby(
+        list(small.columns), sort=False, dropna=False).ngroup().to_numpy()
+    small_codes, large_codes = codes[:len(small)], codes[len(small):]
+    groups = int(codes.max()) + 1 if len(codes) else 0
+
+    # Hash index on the smaller side
+    order = np.argsort(small_codes, kind='stable')
+    counts = np.bincount(small_codes, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if groups else counts
+
+    # Probe with the larger side
+    matches = counts[large_codes]
+    large_pos = np.repeat(np.arange(len(large)), matches)
+    within = np.arange(len(large_pos)) - np.repeat(np.cumsum(matches) - matches, matches)
+    small_pos = order[np.repeat(starts[large_codes], matches) + within]
+
+    if left_is_small:
+        left_pos, right_pos = small_pos, large_pos
+        if how == 'left':
+            unmatched = np.flatnonzero(np.bincount(small_pos, minlength=len(small)) == 0)
+            left_pos = np.concatenate([left_pos, unmatched])
+            right_pos = np.concatenate([right_pos, np.full(len(unmatched), -1)])
+        sort = np.lexsort((right_pos, left_pos))
+        return left_pos[sort], right_pos[sort]
+
+    left_pos, right_pos = large_pos, small_pos
+    if how == 'left':
+        unmatched = np.flatnonzero(matches == 0)
+        left_pos = np.concatenate([left_pos, unmatched])
+        right_pos = np.concatenate([right_pos, np.full(len(unmatched), -1)])
+        sort = np.argsort(left_pos, kind='stable')
+        left_pos, right_pos = left_pos[sort], right_pos[sort]
+    return left_pos, right_pos
+
+
+class JoinReader(SASReader):
+    """Paged, filterable view of the join of two datasets
+
+    Behaves like SASReader for paging and WHERE clauses, but rows are
+    assembled on demand from the two source files.
+    """
+
+    def __init__(self, left_path: str, right_path: str, keys: List[str], how: str = 'inner'):
+        super().__init__(left_path)
+        self.right_path = right_path
+        self.keys = keys
+        self.how = how
+        self.left = None
+        self.right = None
+        self.left_pos = None
+        self.right_pos = None
+        self.right_columns = {}
+        self.small_frames = {}
+        self.filter_cache = {}
+
+    def load_file(self, compact: bool = False):
+        """Build the join positions from the key columns of both datasets"""
+        try:
+            if self.how not in JOIN_TYPES:
+                return f"Unsupported join type '{self.how}'. Use one of: {', '.join(JOIN_TYPES)}"
+
+            self.left = DatasetSource(self.file_path)
+            self.right = DatasetSource(self.right_path)
+            left_keys = resolve_keys(self.keys, self.left.columns)
+            right_keys = resolve_keys(self.keys, self.right.columns)
+
+            self.left_pos, self.right_pos = hash_join_positions(
+                self.left.read(left_keys), self.right.read(right_keys), self.how)
+
+            # Joined variables: all left ones, then right non-keys (renamed on clash)
+            left_vars = self.left.variables()
+            right_vars = self.right.variables()
+            self.column_names = list(left_vars)
+            key_upper = {key.upper() for key in self.keys}
+            taken = {name.upper() for name in self.column_names}
+            for name in right_vars:
+                if name.upper() in key_upper:
+                    continue
+                joined_name = name + RIGHT_SUFFIX if name.upper() in taken else name
+                self.right_columns[name] = joined_name
+                self.column_names.append(joined_name)
+                taken.add(joined_name.upper())
+
+            self.variable_types = {name: attrs['type'] for name, attrs in left_vars.items()}
+            self.column_labels = {name: attrs['label'] for name, attrs in left_vars.items()}
+            self.column_formats = {name: attrs['format'] for name, attrs in left_vars.items()}
+            for name, joined_name in self.right_columns.items():
+                self.variable_types[joined_name] = right_vars[name]['type']
+                self.column_labels[joined_name] = right_vars[name]['label']
+                self.column_formats[joined_name] = right_vars[name]['format']
+            self.detect_temporal()
+
+            return True
+        except Exception as e:
+            return f"Error loading file: {str(e)}"
+
+    def get_metadata(self) -> Dict[str, Any]:
+        if self.left_pos is None:
+            return {"error": "File not loaded"}
+
+        return {
+            "total_rows": int(len(self.left_pos)),
+            "total_variables": len(self.column_names),
+            "variables": [{
+                "name": name,
+                "type": self.variable_types.get(name, "unknown"),
+                "label": self.column_labels.get(name, ""),
+                "format": self.column_formats.get(name, ""),
+                "length": None,
+                "dtype": 'object' if self.variable_types.get(name) == 'character' else 'float64'
+            } for name in self.column_names],
+            "file_path": self.file_path,
+            "right_file_path": self.right_path,
+            "keys": self.keys,
+            "join_type": self.how,
+            "dataset_label": f"{self.left.dataset_label() or 'left'} + {self.right.dataset_label() or 'right'}"
+        }
+
+    def _rows(self, source: DatasetSource, positions: np.ndarray, columns: List[str]) -> pd.DataFrame:
+        """Rows of a source at the given positions (-1 gives a missing row)"""
+        import numpy as np
+
+        if source is self._smaller():
+            # The smaller dataset is read once and kept
+            if source.file_path not in self.small_frames:
+                self.small_frames[source.file_path] = source.read().reset_index(drop=True)
+            frame = self.small_frames[source.file_path][columns]
+            return frame.reindex(positions).reset_index(drop=True)
+
+        from sampling import read_positions
+
+        # Positions on a page may be scattered over the larger dataset, so
+        # runs of nearby rows are read instead of one span covering them all
+        present = positions >= 0
+        wanted, index = np.unique(positions[present], return_inverse=True)
+        frame = read_positions(source, wanted, columns)
+        order = np.full(len(positions), -1, dtype=np.int64)
+        order[present] = index
+        return frame.reindex(order).reset_index(drop=True)
+
+    def _smaller(self) -> DatasetSource:
+        return self.left if self.left.row_count <= self.right.row_count else self.right
+
+    def _assemble(self, pairs: np.ndarray, selected: Optional[List[str]] = None) -> pd.DataFrame:
+        """Joined rows for the given indices into the position arrays"""
+        import pandas as pd
+
+        wanted = set(selected) if selected else None
+        left_cols = [c for c in self.left.columns if wanted is None or c in wanted]
+        right_cols = [c for c, joined in self.right_columns.items() if wanted is None or joined in wanted]
+
+        left_rows = self._rows(self.left, self.left_pos[pairs], left_cols)
+        parts = [left_rows]
+        if right_cols:
+            right_rows = self._rows(self.right, self.right_pos[pairs], right_cols)
+            parts.append(right_rows.rename(columns=self.right_columns))
+        joined = pd.concat(parts, axis=1)
+        return joined[selected] if selected else joined
+
+    def _filtered_pairs(self, where_clause: str) -> np.ndarray:
+        """Indices of joined rows matching the WHERE clause (cached per clause)"""
+        import numpy as np
+
+        if where_clause not in self.filter_cache:
+            matched = []
+            for start in range(0, len(self.left_pos), FILTER_CHUNK_SIZE):
+                pairs = np.arange(start, min(start + FILTER_CHUNK_SIZE, len(self.left_pos)))
+                chunk = self._assemble(pairs)
+                condition = self.parse_where_condition(where_clause, chunk)
+                matched.append(pairs[np.asarray(condition, dtype=bool)] if condition is not None else pairs)
+            self.filter_cache[where_clause] = np.concatenate(matched) if matched else np.array([], dtype=np.int64)
+        return self.filter_cache[where_clause]
+
+    def get_data(self, start_row: int = 0, num_rows: int = 100,
+                 selected_vars: List[str] = None, where_clause: str = None) -> Dict[str, Any]:
+        """Get a page of joined rows with variable selection and filtering"""
+        import numpy as np
+
+        if self.left_pos is None:
+            return {"error": "File not loaded"}
+
+        try:
+            if where_clause and where_clause.strip():
+                pairs = self._filtered_pairs(where_clause.strip())
+            else:
+                pairs = np.arange(len(self.left_pos))
+
+            valid_vars = [v for v in selected_vars if v in self.column_names] if selected_vars else None
+            page_pairs = pairs[start_row:start_row + num_rows]
+            page_df = self._assemble(page_pairs, valid_vars or None)
+            data = self._page_records(page_df)
+
+            return {
+                "data": data,
+                "total_rows": int(len(self.left_pos)),
+                "filtered_rows": int(len(pairs)),
+                "start_row": start_row,
+                "returned_rows": len(data),
+                "columns": list(page_df.columns)
+            }
+
+        except Exception as e:
+            return {"error": f"Error retrieving data: {str(e)}"}
+
+
+def main():
+    if len(sys.argv) < 5:
+        print(dumps({"error": "Usage: join.py <command> <left> <right> <keys> [how] [start] [num] [vars] [where]"}))
+        return
+
+    command = sys.argv[1]
+
+    try:
+        left_path = sys.argv[2]
+        right_path = sys.argv[3]
+        keys = [k.strip() for k in sys.argv[4].split(',') if k.strip()]
+        how = sys.argv[5] if len(sys.argv) > 5 and sys.argv[5] else 'inner'
+
+        reader = JoinReader(left_path, right_path, keys, how)
+        load_result = reader.load_file()
+
+        if load_result is not True:
+            print(dumps({"error": load_result}))
+            return
+
+        if command == "metadata":
+            print(dumps(reader.get_metadata()))
+
+        elif command == "join":
+            start_row = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+            num_rows = int(sys.argv[7]) if len(sys.argv) > 7 else 100
+            selected_vars = sys.argv[8].split(',') if len(sys.argv) > 8 and sys.argv[8] else None
+            where_clause = sys.argv[9] if len(sys.argv) > 9 else None
+            print(dumps(reader.get_data(start_row, num_rows, selected_vars, where_clause)))
+
+        else:
+            print(dumps({"error": f"Unknown command: {command}"}))
+
+    except Exception as e:
+        print(dumps({"error": f"Unexpected error: {str(e)}"}))
+
+
+if __name__ == "__main__":
+    main()
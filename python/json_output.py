@@ -0,0 +1,287 @@
+"""
+JSON output for the reader CLIs and the reader service
+
+``dumps`` encodes with orjson when it is installed (it is optional, like
+pyarrow) and with the stdlib json module otherwise; DATASET_LENS_JSON=json
+forces the stdlib encoder. Both encoders accept NumPy scalars and arrays,
+NaN (as null) and pandas timestamps, so payloads need no boxing first, and
+both produce ASCII-only JSON (non-ASCII characters escaped as \\uXXXX, as
+json.dumps does by default): the extension decodes stdout chunk by chunk,
+which must not split a multi-byte character.
+
+``frame_records`` wraps a page as FrameRecords: a sequence of row dicts for
+Python callers, which the orjson encoder writes straight from the page's
+columns (numeric arrays encoded whole, text through its distinct values)
+instead of boxing every cell. The output is byte for byte what encoding the
+row dicts would give.
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import math
+import codecs
+import importlib.util
+from collections.abc import Sequence
+from typing import Dict, List, Any, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+HAS_ORJSON = importlib.util.find_spec('orjson') is not None
+
+# Set to 'json' to use the stdlib encoder even when orjson is installed
+ENCODER_ENV = 'DATASET_LENS_JSON'
+
+# Non-numeric columns holding only these (as inferred by pandas) are already JSON-ready
+NATIVE_INFERRED_TYPES = {'string', 'empty', 'integer', 'floating', 'mixed-integer-float', 'boolean'}
+
+
+def _escape_non_ascii(error: UnicodeEncodeError):
+    """Codec error handler writing characters as JSON \\uXXXX escapes (surrogate pairs above U+FFFF)"""
+    parts = []
+    for char in error.object[error.start:error.end]:
+        code = ord(char)
+        if code > 0xFFFF:
+            code -= 0x10000
+            parts.append(f'\\u{0xD800 + (code >> 10):04x}\\u{0xDC00 + (code & 0x3FF):04x}')
+        else:
+            parts.append(f'\\u{code:04x}')
+    return ''.join(parts), error.end
+
+
+codecs.register_error('json_escape', _escape_non_ascii)
+
+
+def to_json_value(value: Any) -> Any:
+    """JSON-ready form of a value neither encoder handles natively"""
+    import pandas as pd
+
+    if isinstance(value, FrameRecords):
+        return value.rows()
+    if isinstance(value, (pd.Timestamp, pd.Period)):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    if hasattr(value, 'tolist'):  # numpy scalars and arrays
+        return _nan_to_none(value.tolist())
+    if value is pd.NA or value is pd.NaT:
+        return None
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _nan_to_none(value: Any) -> Any:
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, list):
+        return [_nan_to_none(item) for item in value]
+    return value
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    try:
+        return json.dumps(obj, default=to_json_value, allow_nan=False)
+    except ValueError:
+        # NaN/Infinity outside NumPy arrays: replace them, as orjson does
+        return json.dumps(_replace_nan(obj), default=to_json_value)
+
+
+def _replace_nan(obj: Any) -> Any:
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _replace_nan(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_nan(item) for item in obj]
+    return obj
+
+
+def _orjson_options() -> int:
+    import orjson
+
+    # Datetimes are passed to the default handler so they match str() as in the stdlib path
+    return orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _orjson_dumps(obj: Any) -> str:
+    import re
+    import orjson
+
+    # FrameRecords are encoded from their columns; orjson < 3.9 has no
+    # Fragment to embed them, so a placeholder string is swapped for them
+    fragments = []
+    marker = f'frame-records-{os.urandom(8).hex()}-'
+
+    def default(value: Any) -> Any:
+        if isinstance(value, FrameRecords):
+            fragments.append(value.to_json())
+            return f'{marker}{len(fragments) - 1}'
+        return to_json_value(value)
+
+    data = orjson.dumps(obj, default=default, option=_orjson_options())
+    if fragments:
+        data = re.sub(b'"' + marker.encode() + rb'(\d+)"', lambda match: fragments[int(match.group(1))], data)
+    if data.isascii():
+        return data.decode('ascii')
+    return data.decode('utf-8').encode('ascii', 'json_escape').decode('ascii')
+
+
+ENCODERS: Dict[str, Callable[[Any], str]] = {'json': _stdlib_dumps, 'orjson': _orjson_dumps}
+
+
+def encoder_name() -> str:
+    name = os.environ.get(ENCODER_ENV)
+    if name in ENCODERS and (name != 'orjson' or HAS_ORJSON):
+        return name
+    return 'orjson' if HAS_ORJSON else 'json'
+
+
+def dumps(obj: Any) -> str:
+    """Encode a response as ASCII-only JSON text"""
+    return ENCODERS[encoder_name()](obj)
+
+
+def _convert_values(values: np.ndarray) -> np.ndarray:
+    """Object array with values neither encoder handles natively converted one by one"""
+    import numpy as np
+    import pandas as pd
+
+    converted = [value if value is None or isinstance(value, (str, int, float, bool))
+                 else None if pd.isna(value) is True else to_json_value(value)
+                 for value in values.ravel()]
+    out = np.empty(len(converted), dtype=object)
+    out[:] = converted
+    return out.reshape(values.shape)
+
+
+def _boxed_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Rows of a page as dicts of JSON-ready values, converted a dtype at a time"""
+    import numpy as np
+    import pandas as pd
+
+    names = list(df.columns)
+    if not names:
+        return [{} for _ in range(len(df))]
+
+    groups = {}
+    for i, dtype in enumerate(df.dtypes):
+        groups.setdefault(dtype, []).append(i)
+
+    values = np.empty(df.shape, dtype=object)
+    for dtype, positions in groups.items():
+        block = df.iloc[:, positions].to_numpy(dtype=object, na_value=None)
+        numeric = isinstance(dtype, np.dtype) and dtype.kind in 'biuf'
+        if not numeric and pd.api.types.infer_dtype(block.ravel(), skipna=True) not in NATIVE_INFERRED_TYPES:
+            block = _convert_values(block)
+        values[:, positions] = block
+    return [dict(zip(names, row)) for row in values.tolist()]
+
+
+def _encode_each(values: np.ndarray) -> np.ndarray:
+    """Object array of the JSON text of each value (converted as in _boxed_records)"""
+    import numpy as np
+    import orjson
+
+    options = _orjson_options()
+    out = np.empty(len(values), dtype=object)
+    out[:] = [orjson.dumps(value, default=to_json_value, option=options).decode('utf-8')
+              for value in _convert_values(values)]
+    return out
+
+
+def _column_cells(series: pd.Series) -> np.ndarray:
+    """Object array of the JSON text of every value in a column
+
+    Numeric arrays are encoded in one call; text, categorical and datetime
+    columns encode each distinct value once and pick them by code.
+    """
+    import numpy as np
+    import pandas as pd
+    import orjson
+
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        values = series.to_numpy()
+        if dtype.kind == 'f' and dtype.itemsize < 8:
+            # Boxed float32 values are printed as the doubles they convert to
+            values = values.astype(np.float64)
+        text = orjson.dumps(values, option=orjson.OPT_SERIALIZE_NUMPY).decode('ascii')
+        out = np.empty(len(values), dtype=object)
+        out[:] = text[1:-1].split(',')
+        return out
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    elif pd.api.types.is_datetime64_any_dtype(dtype) or \
+            pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+        # Distinct strings or timestamps only: no values that compare equal across types
+        codes, uniques = pd.factorize(series)
+    else:
+        return _encode_each(series.to_numpy(dtype=object, na_value=None))
+
+    lookup = np.append(_encode_each(np.asarray(uniques, dtype=object)), 'null')
+    return lookup[codes]
+
+
+class FrameRecords(Sequence):
+    """Rows of a page: a sequence of row dicts, JSON-encoded from the page's columns
+
+    The row dicts are only built when Python code reads them (indexing,
+    iteration, comparison) or the stdlib encoder is used; the orjson encoder
+    calls to_json instead, which writes the same bytes.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._rows = None
+
+    def rows(self) -> List[Dict[str, Any]]:
+        if self._rows is None:
+            self._rows = _boxed_records(self.df)
+        return self._rows
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def __getitem__(self, index):
+        return self.rows()[index]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, FrameRecords):
+            other = other.rows()
+        return isinstance(other, list) and self.rows() == other
+
+    def __repr__(self) -> str:
+        return repr(self.rows())
+
+    def to_json(self) -> bytes:
+        """orjson bytes of the rows, written a column at a time"""
+        import numpy as np
+        import orjson
+
+        df = self.df
+        names = list(df.columns)
+        if (self._rows is not None or not names or not len(df)
+                or df.columns.has_duplicates or not all(isinstance(name, str) for name in names)):
+            return orjson.dumps(self.rows(), default=to_json_value, option=_orjson_options())
+
+        cells = np.empty((len(df), len(names)), dtype=object)
+        for i, (name, series) in enumerate(df.items()):
+            prefix = ('{' if i == 0 else ',') + orjson.dumps(name).decode('utf-8') + ':'
+            cells[:, i] = prefix + _column_cells(series)
+        rows = [''.join(row) for row in cells.tolist()]
+        return ('[' + '},'.join(rows) + '}]').encode('utf-8')
+
+
+def frame_records(df: pd.DataFrame) -> FrameRecords:
+    """Rows of a page as dicts of JSON-ready values (see FrameRecords)
+
+    Missing values become None and NumPy numbers Python numbers; columns
+    holding dates, timestamps or other non-JSON values are converted value
+    by value.
+    """
+    return FrameRecords(df)
@@ -0,0 +1,104 @@
+"""
+Key uniqueness check: do the key variables identify each record?
+
+The key tuple of every row is hashed to 64 bits (vectorised over a chunk at
+a time, reading only the key columns), and rows are grouped by sorting the
+hashes. Rows that share a hash are re-read and compared on their actual key
+values, so hash collisions are never reported as duplicates. Only the
+hashes (8 bytes per row) and the duplicate candidates are held in memory.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Any, Callable, Iterable, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+KEY_CHUNK_SIZE = 500000
+
+
+def key_hashes(chunks: Iterable[Tuple[int, pd.DataFrame]], keys: List[str]) -> np.ndarray:
+    """64-bit hash of the key tuple of every row, in row order"""
+    import numpy as np
+    import pandas as pd
+
+    parts = [pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy() for _, chunk in chunks]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint64)
+
+
+def duplicate_positions(hashes: np.ndarray,
+                        read_rows: Callable[[np.ndarray, List[str]], pd.DataFrame],
+                        keys: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(positions, group ids) of rows whose key is shared with another row
+
+    Positions are ordered by group and by row within a group; group ids
+    number the duplicate groups 0, 1, ... by their first row. ``read_rows``
+    returns the given columns of rows at sorted positions.
+    """
+    import numpy as np
+
+    order = np.argsort(hashes, kind='stable')
+    ordered = hashes[order]
+    shared = np.zeros(len(ordered), dtype=bool)
+    if len(ordered) > 1:
+        same = ordered[1:] == ordered[:-1]
+        shared[1:] |= same
+        shared[:-1] |= same
+    candidates = order[shared]
+    if len(candidates) == 0:
+        return candidates, np.zeros(0, dtype=np.int64)
+
+    # Compare the real key values of candidate rows (in row order) to rule out collisions
+    by_row = np.sort(candidates)
+    frame = read_rows(by_row, keys).reset_index(drop=True)
+    confirmed = frame.duplicated(keys, keep=False).to_numpy()
+    positions = by_row[confirmed]
+
+    # Group by key values, not hashes (colliding keys share a hash); ids follow first rows
+    groups = frame[confirmed].groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+    order = np.lexsort((positions, groups))
+    return positions[order], groups[order]
+
+
+def check_keys(chunks: Iterable[Tuple[int, pd.DataFrame]],
+               read_rows: Callable[[np.ndarray, List[str]], pd.DataFrame],
+               keys: List[str], start_row: int = 0, num_rows: int = 100) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """Uniqueness summary for keys and the page of duplicate rows (all columns)
+
+    ``chunks`` yields (offset, frame) pairs holding at least the key
+    columns. The summary includes the positions ("rows") and group ids
+    ("groups") of the returned page.
+    """
+    import numpy as np
+
+    hashes = key_hashes(chunks, keys)
+    positions, groups = duplicate_positions(hashes, read_rows, keys)
+
+    page_positions = positions[start_row:start_row + num_rows]
+    by_row = np.sort(page_positions)
+    # read_rows returns row order; put the page back in group order
+    page = read_rows(by_row, None).iloc[np.searchsorted(by_row, page_positions)].reset_index(drop=True)
+
+    summary = {
+        'keys': keys,
+        'total_rows': int(len(hashes)),
+        'unique': len(positions) == 0,
+        'duplicate_groups': int(groups[-1] + 1) if len(groups) else 0,
+        'duplicate_rows': int(len(positions)),
+        'start_row': start_row,
+        'returned_rows': int(len(page_positions)),
+        'rows': [int(row) for row in page_positions],
+        'groups': [int(group) for group in groups[start_row:start_row + num_rows]]
+    }
+    return summary, page
+
+
+def resolve_keys(keys: List[str], column_names: List[str]) -> List[str]:
+    """Key names matched case-insensitively to the dataset's variables"""
+    lookup = {col.upper(): col for col in column_names}
+    missing = [key for key in keys if key.upper() not in lookup]
+    if missing:
+        raise ValueError(f"Key variables not found: {', '.join(missing)}")
+    return [lookup[key.upper()] for key in keys]
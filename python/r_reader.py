@@ -3,18 +3,24 @@ Python script for reading R data files (.rds and .rdata/.rda)
 Uses pyreadr library for reading R data formats
 """
 
+from __future__ import annotations
+
 import sys
-import json
 import re
+import importlib.util
 from pathlib import Path
-import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
 
-try:
-    import pyreadr
-    HAS_PYREADR = True
-except ImportError:
-    HAS_PYREADR = False
+from json_output import dumps
+from reader_common import column_window, window_info, pop_option
+
+# pandas and pyreadr are imported only when a file is actually read, so usage
+# errors and argument validation do not pay for them
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+HAS_PYREADR = importlib.util.find_spec('pyreadr') is not None
 
 
 class RDataReader:
@@ -24,55 +30,76 @@ class RDataReader:
         self.column_names = []
         self.available_objects = []
         self.selected_object = None
+        self.memory_report = None
+        self.search_index = None
+        self.shared_key = None
 
-    def load_file(self, object_name: str = None) -> bool:
-        """Load R data file and select the appropriate data frame"""
+    def load_file(self, object_name: str = None, compact: bool = False, share: bool = False) -> bool:
+        """Load R data file and select the appropriate data frame
+
+        With ``compact`` the columns are converted to memory-compact dtypes
+        (see compact.compact_dataframe). With ``share`` the decoded frame is
+        shared with other processes (see shared_cache).
+        """
         if not HAS_PYREADR:
             return "pyreadr library is not installed. Install with: pip install pyreadr"
 
-        try:
+        import pandas as pd
+        import pyreadr
+
+        def load():
             result = pyreadr.read_r(self.file_path)
 
             # Store available objects
-            self.available_objects = list(result.keys())
+            available_objects = list(result.keys())
 
             # For .rds files, the key is None
             if None in result:
-                self.df = result[None]
-                self.selected_object = None
-            else:
-                # For .rdata files, select the specified object or first data frame
-                if object_name and object_name in result:
-                    self.df = result[object_name]
-                    self.selected_object = object_name
-                else:
-                    # Find first DataFrame
-                    for name, obj in result.items():
-                        if isinstance(obj, pd.DataFrame):
-                            self.df = obj
-                            self.selected_object = name
-                            break
-
-                    if self.df is None:
-                        return "No data frames found in R data file"
+                return result[None], (available_objects, None)
+
+            # For .rdata files, select the specified object or first data frame
+            if object_name and object_name in result:
+                return result[object_name], (available_objects, object_name)
+
+            # Find first DataFrame
+            for name, obj in result.items():
+                if isinstance(obj, pd.DataFrame):
+                    return obj, (available_objects, name)
+            return None, (available_objects, None)
+
+        try:
+            from shared_cache import shared_frame
+            self.df, (self.available_objects, self.selected_object), self.shared_key = shared_frame(
+                self.file_path, ('r', object_name), load, share)
+
+            if self.df is None:
+                return "No data frames found in R data file"
 
             self.column_names = list(self.df.columns)
+
+            if compact:
+                from compact import compact_dataframe
+                self.df, self.memory_report = compact_dataframe(self.df)
+
             return True
 
         except Exception as e:
             return f"Error loading file: {str(e)}"
 
-    def get_metadata(self) -> Dict[str, Any]:
-        """Get dataset metadata"""
+    def get_metadata(self, var_offset: int = 0, var_limit: Optional[int] = None) -> Dict[str, Any]:
+        """Get dataset metadata, optionally for a window of variables only"""
+        import pandas as pd
+        from compact import is_text_column
+
         if self.df is None:
             return {"error": "File not loaded"}
 
         variables = []
-        for col in self.column_names:
+        for col in column_window(self.column_names, var_offset, var_limit):
             col_dtype = self.df[col].dtype
 
             # Determine type
-            if col_dtype == 'object':
+            if is_text_column(self.df[col]):
                 var_type = 'character'
             elif 'int' in str(col_dtype) or 'float' in str(col_dtype):
                 var_type = 'numeric'
@@ -85,7 +112,11 @@ class RDataReader:
 
             # Calculate length for string columns
             col_length = None
-            if col_dtype == 'object':
+            if isinstance(col_dtype, pd.CategoricalDtype):
+                # Only the distinct values need measuring
+                max_len = self.df[col].cat.categories.astype(str).str.len().max()
+                col_length = int(max_len) if pd.notna(max_len) else None
+            elif var_type == 'character':
                 max_len = self.df[col].astype(str).str.len().max()
                 col_length = int(max_len) if pd.notna(max_len) else None
 
@@ -116,8 +147,27 @@ class RDataReader:
             "selected_object": self.selected_object
         }
 
+        if self.memory_report is not None:
+            from compact import memory_summary
+            metadata["memory"] = memory_summary(self.memory_report)
+
+        if var_offset or var_limit is not None:
+            metadata.update(window_info(len(self.column_names), var_offset, len(variables)))
+
         return metadata
 
+    def row_count(self) -> int:
+        return len(self.df)
+
+    def filter_mask(self, where_clause: Optional[str]) -> np.ndarray:
+        """Boolean mask over all rows for a WHERE clause (all rows without one)"""
+        import numpy as np
+
+        condition = self.parse_where_condition(where_clause)
+        if condition is None:
+            return np.ones(len(self.df), dtype=bool)
+        return np.asarray(condition, dtype=bool)
+
     def parse_where_condition(self, where_clause: str) -> Optional[pd.Series]:
         """Parse and apply WHERE condition to dataframe"""
         if not where_clause or not where_clause.strip():
@@ -213,9 +263,30 @@ class RDataReader:
 
         raise ValueError(f"Could not parse simple condition: {where_clause}")
 
+    def _page_records(self, page_df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Convert a page of rows into JSON-serializable records"""
+        from json_output import frame_records
+        from temporal import render_frame
+        from text_encoding import decode_frame
+
+        # Datetime columns are rendered, byte strings decoded and missing values
+        # replaced a whole column at a time
+        page_df = render_frame(page_df, {})
+        page_df, _, _ = decode_frame(page_df)
+        return frame_records(page_df)
+
     def get_data(self, start_row: int = 0, num_rows: int = 100,
-                 selected_vars: List[str] = None, where_clause: str = None) -> Dict[str, Any]:
-        """Get data with pagination, variable selection, and filtering"""
+                 selected_vars: List[str] = None, where_clause: str = None,
+                 var_offset: int = 0, var_limit: Optional[int] = None,
+                 mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Get data with pagination, variable selection, and filtering
+
+        ``var_offset``/``var_limit`` select a window over the selected (or
+        all) variables. ``mask`` is a boolean row mask (e.g. from a filter
+        set) combined with the WHERE clause.
+        """
+        import pandas as pd
+
         if self.df is None:
             return {"error": "File not loaded"}
 
@@ -224,14 +295,22 @@ class RDataReader:
 
             # Apply WHERE condition if provided
             filtered_rows = len(working_df)
+            condition = mask
             if where_clause:
-                condition = self.parse_where_condition(where_clause)
-                if condition is not None:
-                    working_df = working_df.loc[condition]
-                    filtered_rows = len(working_df)
+                where_condition = self.parse_where_condition(where_clause)
+                if where_condition is not None:
+                    condition = where_condition if mask is None else mask & where_condition
+            if condition is not None:
+                working_df = working_df.loc[condition]
+                filtered_rows = len(working_df)
+
+            windowed = bool(var_offset) or var_limit is not None
+            if windowed:
+                base = [v for v in selected_vars or [] if v in working_df.columns] or self.column_names
+                working_df = working_df[column_window(base, var_offset, var_limit)]
 
             # Select variables if specified
-            if selected_vars:
+            elif selected_vars:
                 valid_vars = [v for v in selected_vars if v in working_df.columns]
                 if valid_vars:
                     working_df = working_df[valid_vars]
@@ -240,24 +319,9 @@ class RDataReader:
             end_row = min(start_row + num_rows, len(working_df))
             page_df = working_df.iloc[start_row:end_row]
 
-            # Convert to records
-            data = page_df.to_dict('records')
-
-            # Handle special types and NaN
-            for row in data:
-                for col, value in row.items():
-                    if pd.isna(value):
-                        row[col] = None
-                    elif isinstance(value, (pd.Timestamp, pd.Period)):
-                        row[col] = str(value)
-                    elif hasattr(value, 'isoformat'):
-                        row[col] = value.isoformat()
-                    elif isinstance(value, bytes):
-                        row[col] = value.decode('utf-8', errors='ignore')
-                    elif hasattr(value, 'item'):  # numpy types
-                        row[col] = value.item()
-
-            return {
+            data = self._page_records(page_df)
+
+            result = {
                 "data": data,
                 "total_rows": len(self.df),
                 "filtered_rows": filtered_rows,
@@ -265,16 +329,22 @@ class RDataReader:
                 "returned_rows": len(data),
                 "columns": list(page_df.columns)
             }
+            if windowed:
+                result.update(window_info(len(base), var_offset, len(page_df.columns)))
+            return result
 
         except Exception as e:
             return {"error": f"Error retrieving data: {str(e)}"}
 
-    def get_filtered_row_count(self, where_clause: str) -> Dict[str, Any]:
-        """Get count of rows matching WHERE clause without loading all data"""
+    def get_filtered_row_count(self, where_clause: str, mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Get count of rows matching WHERE clause (within ``mask`` if given)"""
         if self.df is None:
             return {"error": "File not loaded"}
 
         try:
+            if mask is not None:
+                return {"count": int((mask & self.filter_mask(where_clause)).sum())}
+
             if not where_clause or not where_clause.strip():
                 return {"count": len(self.df)}
 
@@ -288,8 +358,17 @@ class RDataReader:
         except Exception as e:
             return {"error": f"Error counting rows: {str(e)}"}
 
-    def get_unique_values(self, column_name: str, include_count: bool = False) -> Dict[str, Any]:
-        """Get unique values for a column"""
+    def get_unique_values(self, column_name: str, include_count: bool = False,
+                          mask: Optional[np.ndarray] = None, approximate: bool = False,
+                          top_k: Optional[int] = None) -> Dict[str, Any]:
+        """Get unique values for a column (over the rows in ``mask`` if given)
+
+        With ``approximate`` the ``top_k`` most frequent values come from a
+        sketch (see sketches), with error bounds under "approximate".
+        """
+        import pandas as pd
+        from compact import categorical_value_counts
+
         if self.df is None:
             return {"error": "File not loaded"}
 
@@ -304,8 +383,25 @@ class RDataReader:
             if actual_col is None:
                 return {"error": f"Column '{column_name}' not found"}
 
-            if include_count:
-                value_counts = self.df[actual_col].value_counts(dropna=False)
+            column = self.df[actual_col] if mask is None else self.df[actual_col][mask]
+            if approximate:
+                from sketches import approximate_counts, series_chunks, DEFAULT_TOP_K
+                pairs, summary = approximate_counts(series_chunks(column), top_k or DEFAULT_TOP_K)
+                values = []
+                for val, count in pairs:
+                    if hasattr(val, 'item'):
+                        val = val.item()
+                    values.append({"value": val, "count": count} if include_count else val)
+                return {"values": values, "approximate": summary}
+            elif include_count and isinstance(column.dtype, pd.CategoricalDtype):
+                # Categorical columns: count codes, not strings
+                values = []
+                for val, count in categorical_value_counts(column):
+                    values.append({"value": val if not hasattr(val, 'item') else val.item(),
+                                   "count": count})
+                return {"values": values}
+            elif include_count:
+                value_counts = column.value_counts(dropna=False)
                 values = []
                 for val, count in value_counts.items():
                     if pd.isna(val):
@@ -315,7 +411,7 @@ class RDataReader:
                                       "count": int(count)})
                 return {"values": values}
             else:
-                unique_vals = self.df[actual_col].unique()
+                unique_vals = column.unique()
                 values = []
                 for val in unique_vals:
                     if pd.isna(val):
@@ -329,12 +425,86 @@ class RDataReader:
         except Exception as e:
             return {"error": f"Error getting unique values: {str(e)}"}
 
+    def sample(self, n: int = 1000, method: str = 'random', seed: int = 42,
+               strata: Optional[str] = None, selected_vars: List[str] = None) -> Dict[str, Any]:
+        """Sample rows (head, tail, systematic, random), optionally stratified"""
+        from dataset_source import DatasetSource
+        from sampling import sample_dataset
+
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        try:
+            columns = [v for v in selected_vars if v in self.column_names] or None if selected_vars else None
+            source = DatasetSource(self.file_path, self.selected_object, frame=self.df)
+            frame, info = sample_dataset(source, n, method, seed, strata, columns)
+            data = self._page_records(frame)
+
+            result = {
+                "data": data,
+                "total_rows": info.pop("total_rows"),
+                "returned_rows": len(data),
+                "columns": list(frame.columns)
+            }
+            result.update(info)
+            return result
+
+        except Exception as e:
+            return {"error": f"Error sampling data: {str(e)}"}
+
+    def check_keys(self, keys: List[str], start_row: int = 0, num_rows: int = 100) -> Dict[str, Any]:
+        """Whether ``keys`` identify every row, with a page of the duplicate rows (see key_check)"""
+        from dataset_source import DatasetSource
+        from key_check import check_keys, resolve_keys, KEY_CHUNK_SIZE
+        from sampling import read_positions
+
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        try:
+            keys = resolve_keys(keys, self.column_names)
+            source = DatasetSource(self.file_path, self.selected_object, frame=self.df)
+            result, page = check_keys(source.iter_chunks(KEY_CHUNK_SIZE, keys),
+                                      lambda positions, columns: read_positions(source, positions, columns),
+                                      keys, start_row, num_rows)
+            result["data"] = self._page_records(page)
+            result["columns"] = list(page.columns)
+            return result
+
+        except Exception as e:
+            return {"error": f"Error checking keys: {str(e)}"}
+
+    def search(self, pattern: str, columns: List[str] = None, regex: bool = False,
+               start_row: int = 0, num_rows: int = 100, indexed: bool = False) -> Dict[str, Any]:
+        """Find rows where character variables contain a substring or regex (case-insensitive)
+
+        With ``indexed`` a SearchIndex with n-gram postings is built once and
+        kept on the reader for repeated searches.
+        """
+        from search import SearchIndex, search_frame
+
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        if not pattern:
+            return {"error": "Search pattern required"}
+
+        if not indexed:
+            return search_frame(self.df, pattern, columns, regex, start_row, num_rows)
+
+        if self.search_index is None:
+            self.search_index = SearchIndex(self.df, ngrams=True)
+        return self.search_index.search(pattern, columns, regex, start_row, num_rows)
+
 
 def list_objects(file_path: str) -> Dict[str, Any]:
     """List all objects in an R data file without fully loading them"""
     if not HAS_PYREADR:
         return {"error": "pyreadr library is not installed. Install with: pip install pyreadr"}
 
+    import pandas as pd
+    import pyreadr
+
     try:
         result = pyreadr.read_r(file_path)
 
@@ -358,7 +528,23 @@ def list_objects(file_path: str) -> Dict[str, Any]:
 
 def main():
     if len(sys.argv) < 2:
-        print(json.dumps({"error": "No command provided. Usage: r_reader.py <command> <args>"}))
+        print(dumps({"error": "No command provided. Usage: r_reader.py <command> <args>"}))
+        return
+
+    # Optional flags may appear anywhere after the command
+    compact = '--compact' in sys.argv
+    if compact:
+        sys.argv.remove('--compact')
+    approximate = '--approximate' in sys.argv
+    if approximate:
+        sys.argv.remove('--approximate')
+
+    try:
+        filter_set = pop_option(sys.argv, '--filter-set')
+        top_k = pop_option(sys.argv, '--top-k')
+        top_k = int(top_k) if top_k else None
+    except ValueError as e:
+        print(dumps({"error": str(e)}))
         return
 
     command = sys.argv[1]
@@ -366,25 +552,27 @@ def main():
     try:
         if command == "metadata":
             if len(sys.argv) < 3:
-                print(json.dumps({"error": "File path required"}))
+                print(dumps({"error": "File path required"}))
                 return
 
             file_path = sys.argv[2]
             object_name = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] else None
+            var_offset = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else 0
+            var_limit = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else None
 
             reader = RDataReader(file_path)
-            load_result = reader.load_file(object_name)
+            load_result = reader.load_file(object_name, compact)
 
             if load_result is not True:
-                print(json.dumps({"error": load_result}))
+                print(dumps({"error": load_result}))
                 return
 
-            metadata = reader.get_metadata()
-            print(json.dumps({"metadata": metadata}))
+            metadata = reader.get_metadata(var_offset, var_limit)
+            print(dumps({"metadata": metadata}))
 
         elif command == "data":
             if len(sys.argv) < 3:
-                print(json.dumps({"error": "File path required"}))
+                print(dumps({"error": "File path required"}))
                 return
 
             file_path = sys.argv[2]
@@ -393,29 +581,33 @@ def main():
             selected_vars = sys.argv[5].split(',') if len(sys.argv) > 5 and sys.argv[5] else None
             where_clause = sys.argv[6] if len(sys.argv) > 6 else None
             object_name = sys.argv[7] if len(sys.argv) > 7 and sys.argv[7] else None
+            var_offset = int(sys.argv[8]) if len(sys.argv) > 8 and sys.argv[8] else 0
+            var_limit = int(sys.argv[9]) if len(sys.argv) > 9 and sys.argv[9] else None
 
             reader = RDataReader(file_path)
-            load_result = reader.load_file(object_name)
+            load_result = reader.load_file(object_name, compact)
 
             if load_result is not True:
-                print(json.dumps({"error": load_result}))
+                print(dumps({"error": load_result}))
                 return
 
-            data_result = reader.get_data(start_row, num_rows, selected_vars, where_clause)
-            print(json.dumps(data_result))
+            from filter_sets import resolve_filter_set
+            data_result = reader.get_data(start_row, num_rows, selected_vars, where_clause, var_offset, var_limit,
+                                          resolve_filter_set(reader, filter_set, object_name))
+            print(dumps(data_result))
 
         elif command == "list_objects":
             if len(sys.argv) < 3:
-                print(json.dumps({"error": "File path required"}))
+                print(dumps({"error": "File path required"}))
                 return
 
             file_path = sys.argv[2]
             result = list_objects(file_path)
-            print(json.dumps(result))
+            print(dumps(result))
 
         elif command == "count":
             if len(sys.argv) < 3:
-                print(json.dumps({"error": "File path required"}))
+                print(dumps({"error": "File path required"}))
                 return
 
             file_path = sys.argv[2]
@@ -423,18 +615,62 @@ def main():
             object_name = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] else None
 
             reader = RDataReader(file_path)
-            load_result = reader.load_file(object_name)
+            load_result = reader.load_file(object_name, compact)
+
+            if load_result is not True:
+                print(dumps({"error": load_result}))
+                return
+
+            from filter_sets import resolve_filter_set
+            result = reader.get_filtered_row_count(where_clause, resolve_filter_set(reader, filter_set, object_name))
+            print(dumps(result))
+
+        elif command == "sample":
+            if len(sys.argv) < 3:
+                print(dumps({"error": "File path required"}))
+                return
+
+            file_path = sys.argv[2]
+            n = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else 1000
+            method = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] else 'random'
+            seed = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else 42
+            strata = sys.argv[6] if len(sys.argv) > 6 and sys.argv[6] else None
+            selected_vars = sys.argv[7].split(',') if len(sys.argv) > 7 and sys.argv[7] else None
+            object_name = sys.argv[8] if len(sys.argv) > 8 and sys.argv[8] else None
+
+            # pyreadr always reads the whole object; the sample is then taken in memory
+            reader = RDataReader(file_path)
+            load_result = reader.load_file(object_name, compact)
 
             if load_result is not True:
-                print(json.dumps({"error": load_result}))
+                print(dumps({"error": load_result}))
+                return
+
+            print(dumps(reader.sample(n, method, seed, strata, selected_vars)))
+
+        elif command == "check_keys":
+            if len(sys.argv) < 4:
+                print(dumps({"error": "File path and key variables required"}))
                 return
 
-            result = reader.get_filtered_row_count(where_clause)
-            print(json.dumps(result))
+            file_path = sys.argv[2]
+            keys = [k.strip() for k in sys.argv[3].split(',') if k.strip()]
+            start_row = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else 0
+            num_rows = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else 100
+            object_name = sys.argv[6] if len(sys.argv) > 6 and sys.argv[6] else None
+
+            reader = RDataReader(file_path)
+            load_result = reader.load_file(object_name, compact)
+
+            if load_result is not True:
+                print(dumps({"error": load_result}))
+                return
+
+            print(dumps(reader.check_keys(keys, start_row, num_rows)))
 
         elif command == "unique":
             if len(sys.argv) < 4:
-                print(json.dumps({"error": "File path and column name required"}))
+                print(dumps({"error": "File path and column name required"}))
                 return
 
             file_path = sys.argv[2]
@@ -443,20 +679,46 @@ def main():
             object_name = sys.argv[5] if len(sys.argv) > 5 and sys.argv[5] else None
 
             reader = RDataReader(file_path)
-            load_result = reader.load_file(object_name)
+            load_result = reader.load_file(object_name, compact)
+
+            if load_result is not True:
+                print(dumps({"error": load_result}))
+                return
+
+            from filter_sets import resolve_filter_set
+            result = reader.get_unique_values(column_name, include_count,
+                                              resolve_filter_set(reader, filter_set, object_name),
+                                              approximate, top_k)
+            print(dumps(result))
+
+        elif command == "search":
+            if len(sys.argv) < 4:
+                print(dumps({"error": "File path and search pattern required"}))
+                return
+
+            file_path = sys.argv[2]
+            pattern = sys.argv[3]
+            columns = sys.argv[4].split(',') if len(sys.argv) > 4 and sys.argv[4] else None
+            regex = sys.argv[5].lower() == 'true' if len(sys.argv) > 5 else False
+            start_row = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+            num_rows = int(sys.argv[7]) if len(sys.argv) > 7 else 100
+            object_name = sys.argv[8] if len(sys.argv) > 8 and sys.argv[8] else None
+
+            reader = RDataReader(file_path)
+            load_result = reader.load_file(object_name, compact)
 
             if load_result is not True:
-                print(json.dumps({"error": load_result}))
+                print(dumps({"error": load_result}))
                 return
 
-            result = reader.get_unique_values(column_name, include_count)
-            print(json.dumps(result))
+            result = reader.search(pattern, columns, regex, start_row, num_rows)
+            print(dumps(result))
 
         else:
-            print(json.dumps({"error": f"Unknown command: {command}"}))
+            print(dumps({"error": f"Unknown command: {command}"}))
 
     except Exception as e:
-        print(json.dumps({"error": f"Unexpected error: {str(e)}"}))
+        print(dumps({"error": f"Unexpected error: {str(e)}"}))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+"""
+Helpers shared by the reader modules and their sidecar files
+Column windows, WHERE clause variables, CLI options, header-only reads,
+file fingerprints and header dtype names are used by the SAS, XPT, R and Dataset-JSON readers alike.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+
+def fingerprint(file_path: str) -> List[int]:
+    """[size, mtime_ns] of a dataset file, used to detect that it was rewritten"""
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+@lru_cache(maxsize=None)
+def text_dtype() -> str:
+    """Name of the dtype pandas reads character variables into, without importing pandas
+
+    pandas 3 reads strings into its 'str' dtype; earlier versions into 'object'.
+    """
+    from importlib import metadata
+
+    try:
+        major = int(metadata.version('pandas').split('.')[0])
+    except (metadata.PackageNotFoundError, ValueError):
+        return 'object'
+    return 'str' if major >= 3 else 'object'
+
+
+def column_window(columns: List[str], var_offset: int = 0, var_limit: Optional[int] = None) -> List[str]:
+    """Variables visible in a column window (all from var_offset when var_limit is None)"""
+    end = var_offset + var_limit if var_limit is not None else None
+    return columns[var_offset:end]
+
+
+def where_columns(where_clause: Optional[str], columns: List[str]) -> List[str]:
+    """Variables referenced by a WHERE clause (identifiers outside quoted strings)"""
+    if not where_clause:
+        return []
+    unquoted = re.sub(r"'[^']*'|\"[^\"]*\"", ' ', where_clause)
+    tokens = {token.upper() for token in re.findall(r'[A-Za-z_][A-Za-z0-9_]*', unquoted)}
+    return [col for col in columns if col.upper() in tokens]
+
+
+def window_info(total: int, var_offset: int, returned: int) -> Dict[str, int]:
+    """Response fields describing a column window"""
+    return {"total_variables": total, "variable_offset": var_offset, "returned_variables": returned}
+
+
+def pop_option(argv: List[str], name: str) -> Optional[str]:
+    """Remove ``name <value>`` from argv and return the value (None if absent)"""
+    if name not in argv:
+        return None
+    index = argv.index(name)
+    if index + 1 >= len(argv):
+        raise ValueError(f"Value required after {name}")
+    value = argv[index + 1]
+    del argv[index:index + 2]
+    return value
+
+
+def read_header(read_function, file_path: str, encoding: Optional[str] = None):
+    """Read only the metadata of a file, without building a pandas DataFrame when possible"""
+    from text_encoding import encoding_kwargs
+
+    kwargs = encoding_kwargs(encoding)
+    try:
+        # pyreadstat >= 1.3 can skip pandas entirely
+        return read_function(file_path, metadataonly=True, output_format='dict', **kwargs)
+    except TypeError:
+        return read_function(file_path, metadataonly=True, **kwargs)
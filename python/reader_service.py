@@ -0,0 +1,415 @@
+"""
+Long-running reader service that keeps several datasets loaded at once
+Reads one JSON request per line on stdin and writes one JSON response per line
+
+Request:  {"id": 1, "command": "data", "file_path": "adsl.sas7bdat", "start_row": 0, ...}
+Response: {"id": 1, ...same payload as the one-shot reader commands...}
+
+Loaded datasets are kept in an LRU cache bounded by a memory budget
+(--memory-budget, default 4GB), which counts each dataset's frame, search
+index and decoded filter-set bitmaps. When a file's size or modification time
+changes, loaded .sas7bdat and .xpt frames are patched with only the rows
+that changed where possible (see refresh.py); other entries are reloaded.
+Decoded frames are also shared with other reader processes through
+shared_cache.
+
+Saved filter sets (see filter_sets.py) are named with "filter_set" on data,
+data_progressive, count and unique requests, and managed with
+save_filter_set, filter_sets and delete_filter_set.
+
+data_progressive streams a filtered page (see SASReader.get_data_progressive):
+a "page" line as soon as the page's matches are found, with a lower bound and
+an estimate of filtered_rows, then "progress" lines while the scan goes on
+and a final "complete" line with the exact count, all with the request's id.
+Readers that cannot scan progressively send their get_data page as the
+"page" line, followed by "complete".
+"""
+
+import sys
+import os
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Callable
+
+from json_output import dumps
+from reader_common import fingerprint
+
+DEFAULT_MEMORY_BUDGET = 4 * 1024 ** 3
+
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+R_EXTENSIONS = ('.rds', '.rdata', '.rda')
+
+DATASET_JSON_EXTENSIONS = ('.json', '.ndjson', '.jsonl')
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as '4GB', '512MB' or '1073741824' into bytes"""
+    text = text.strip().upper()
+    for unit in sorted(SIZE_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+
+def file_signature(file_path: str) -> Tuple[int, int]:
+    """(size, mtime_ns) used to detect a rewritten file"""
+    return tuple(fingerprint(file_path))
+
+
+def open_reader(file_path: str, object_name: Optional[str] = None, compact: bool = False,
+                catalog_path: Optional[str] = None, encoding: Optional[str] = None,
+                track_changes: bool = False, share: bool = False):
+    """Create and load the reader matching the file extension
+
+    ``catalog_path`` (a .sas7bcat format catalog) applies to .sas7bdat files only;
+    ``encoding`` (overriding the file's character encoding) and ``track_changes``
+    (keeping a snapshot for refresh) to .sas7bdat and .xpt files; ``share``
+    (sharing the decoded frame, see shared_cache) to all but Dataset-JSON.
+    """
+    ext = Path(file_path).suffix.lower()
+
+    if ext == '.sas7bdat':
+        from sas_reader import SASReader
+        reader = SASReader(file_path, encoding)
+        result = reader.load_file(compact, catalog_path, track_changes=track_changes, share=share)
+    elif ext == '.xpt':
+        from xpt_reader import XPTReader
+        reader = XPTReader(file_path, encoding)
+        result = reader.load_file(compact, track_changes=track_changes, share=share)
+    elif ext in R_EXTENSIONS:
+        from r_reader import RDataReader
+        reader = RDataReader(file_path)
+        result = reader.load_file(object_name, compact, share)
+    elif ext in DATASET_JSON_EXTENSIONS:
+        # Streams rows from the file; the cached reader keeps its row index
+        from dataset_json_reader import DatasetJsonReader
+        reader = DatasetJsonReader(file_path)
+        result = reader.load_file()
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+
+    if result is not True:
+        raise ValueError(result)
+
+    return reader
+
+
+def frame_memory(reader) -> int:
+    """Bytes held by a reader's loaded DataFrame"""
+    if reader.df is None:
+        return 0
+    return int(reader.df.memory_usage(index=True, deep=True).sum())
+
+
+def index_memory(reader) -> int:
+    """Bytes held by a reader's search index, once one was built"""
+    search_index = getattr(reader, 'search_index', None)
+    return search_index.memory_usage() if search_index is not None else 0
+
+
+class DatasetCache:
+    """LRU cache of loaded readers bounded by a memory budget"""
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get(self, file_path: str, object_name: Optional[str] = None, compact: bool = False,
+            catalog_path: Optional[str] = None, encoding: Optional[str] = None):
+        """Return a loaded reader, reusing a cached one while the file is unchanged"""
+        catalog_key = os.path.abspath(catalog_path) if catalog_path else None
+        key = (os.path.abspath(file_path), object_name, compact, catalog_key, encoding)
+        signature = file_signature(file_path)
+        if catalog_path:
+            signature += file_signature(catalog_path)
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry['signature'] == signature:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry['reader']
+            # File was rewritten since it was loaded
+            if self.refresh(key, signature):
+                return entry['reader']
+            self.remove(key)
+
+        self.misses += 1
+        reader = open_reader(file_path, object_name, compact, catalog_path, encoding, track_changes=True, share=True)
+        size = frame_memory(reader)
+        self.entries[key] = {'reader': reader, 'signature': signature, 'bytes': size,
+                             'frame_bytes': size, 'mask_bytes': 0}
+        self.total_bytes += size
+        self.evict()
+        return reader
+
+    def refresh(self, key, signature: Tuple[int, ...]) -> bool:
+        """Patch a cached reader whose dataset file was rewritten; False when it must be reloaded"""
+        entry = self.entries[key]
+        refresh = getattr(entry['reader'], 'refresh', None)
+        # A changed catalog means a reload
+        if refresh is None or entry['signature'][2:] != signature[2:]:
+            return False
+        if refresh()['action'] == 'reload':
+            return False
+
+        entry.update(signature=signature, frame_bytes=frame_memory(entry['reader']))
+        self.resize(entry)
+        self.entries.move_to_end(key)
+        self.refreshes += 1
+        self.evict()
+        return True
+
+    def resize(self, entry: Dict[str, Any]) -> None:
+        """Recount an entry's bytes: its frame, search index and filter-set bitmaps"""
+        size = entry['frame_bytes'] + index_memory(entry['reader']) + entry['mask_bytes']
+        self.total_bytes += size - entry['bytes']
+        entry['bytes'] = size
+
+    def account(self, reader, mask_bytes: int = 0) -> None:
+        """Recount a cached reader after it built a search index or filter-set bitmaps (``mask_bytes``)"""
+        for entry in self.entries.values():
+            if entry['reader'] is reader:
+                entry['mask_bytes'] = mask_bytes
+                self.resize(entry)
+                self.evict()
+                return
+
+    def remove(self, key) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry['bytes']
+            shared_key = getattr(entry['reader'], 'shared_key', None)
+            if shared_key:
+                from shared_cache import release
+                release(shared_key)
+
+    def evict(self) -> None:
+        """Drop least-recently-used datasets until within budget
+
+        The most recent dataset is always kept, even if it alone exceeds the budget.
+        """
+        while self.total_bytes > self.memory_budget and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            self.remove(key)
+
+    def invalidate(self, file_path: Optional[str] = None) -> int:
+        """Drop cached entries for one file, or all entries; returns how many were dropped"""
+        if file_path is None:
+            keys = list(self.entries)
+        else:
+            path = os.path.abspath(file_path)
+            keys = [key for key in self.entries if key[0] == path]
+
+        for key in keys:
+            self.remove(key)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'memory_budget': self.memory_budget,
+            'total_bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'datasets': [
+                {'file_path': key[0], 'object_name': key[1], 'compact': key[2],
+                 'catalog_path': key[3], 'encoding': key[4], 'bytes': entry['bytes']}
+                for key, entry in self.entries.items()
+            ]
+        }
+
+
+class ReaderService:
+    """Dispatches JSON requests to cached readers"""
+
+    def __init__(self, cache: DatasetCache):
+        self.cache = cache
+        self.filter_sets = {}
+
+    def filter_set_store(self, file_path: str, object_name: Optional[str] = None):
+        """Filter sets of a dataset, kept between requests so decoded bitmaps are reused"""
+        from filter_sets import FilterSetStore
+
+        key = (os.path.abspath(file_path), object_name)
+        if key not in self.filter_sets:
+            self.filter_sets[key] = FilterSetStore(file_path, object_name)
+        return self.filter_sets[key]
+
+    def account(self, reader, file_path: str, object_name: Optional[str] = None) -> None:
+        """Count a reader's search index and its dataset's filter-set bitmaps against the memory budget"""
+        store = self.filter_sets.get((os.path.abspath(file_path), object_name))
+        self.cache.account(reader, store.memory_usage() if store is not None else 0)
+
+    def handle(self, request: Dict[str, Any],
+               emit: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Response to a request; streamed commands send their earlier lines to ``emit``"""
+        command = request.get('command')
+
+        if command == 'stats':
+            return self.cache.stats()
+
+        if command == 'invalidate':
+            return {'invalidated': self.cache.invalidate(request.get('file_path'))}
+
+        file_path = request.get('file_path')
+        if not file_path:
+            return {'error': 'File path required'}
+
+        reader = self.cache.get(file_path, request.get('object_name'), bool(request.get('compact')),
+                                request.get('catalog_path'), request.get('encoding'))
+
+        var_offset = int(request.get('var_offset') or 0)
+        var_limit = int(request['var_limit']) if request.get('var_limit') is not None else None
+
+        mask = None
+        if request.get('filter_set') and command in ('data', 'data_progressive', 'count', 'unique'):
+            store = self.filter_set_store(file_path, request.get('object_name'))
+            mask = store.resolve(request['filter_set'], reader)
+            self.account(reader, file_path, request.get('object_name'))
+
+        if command == 'metadata':
+            return {'metadata': reader.get_metadata(var_offset, var_limit)}
+
+        elif command == 'data':
+            selected_vars = request.get('selected_vars')
+            if isinstance(selected_vars, str):
+                selected_vars = [v for v in selected_vars.split(',') if v] or None
+            return reader.get_data(int(request.get('start_row', 0)),
+                                   int(request.get('num_rows', 100)),
+                                   selected_vars,
+                                   request.get('where_clause') or None,
+                                   var_offset, var_limit, mask)
+
+        elif command == 'data_progressive':
+            selected_vars = request.get('selected_vars')
+            if isinstance(selected_vars, str):
+                selected_vars = [v for v in selected_vars.split(',') if v] or None
+            return self.data_progressive(reader, request, selected_vars, var_offset, var_limit, mask,
+                                         emit or (lambda event: None))
+
+        elif command == 'count':
+            return reader.get_filtered_row_count(request.get('where_clause', ''), mask)
+
+        elif command == 'unique':
+            if not request.get('column_name'):
+                return {'error': 'Column name required'}
+            return reader.get_unique_values(request['column_name'], bool(request.get('include_count')), mask,
+                                            bool(request.get('approximate')), request.get('top_k'))
+
+        elif command == 'save_filter_set':
+            if not request.get('name'):
+                return {'error': 'Filter set name required'}
+            where_clause = request.get('where_clause') or ''
+            store = self.filter_set_store(file_path, request.get('object_name'))
+            result = store.save(request['name'], where_clause, reader.filter_mask(where_clause))
+            self.account(reader, file_path, request.get('object_name'))
+            return result
+
+        elif command == 'filter_sets':
+            return {'filter_sets': self.filter_set_store(file_path, request.get('object_name')).list()}
+
+        elif command == 'delete_filter_set':
+            store = self.filter_set_store(file_path, request.get('object_name'))
+            deleted = store.delete(request.get('name', ''))
+            self.account(reader, file_path, request.get('object_name'))
+            return {'deleted': deleted}
+
+        elif command == 'sample':
+            selected_vars = request.get('selected_vars')
+            if isinstance(selected_vars, str):
+                selected_vars = [v for v in selected_vars.split(',') if v] or None
+            return reader.sample(int(request.get('n', 1000)), request.get('method') or 'random',
+                                 int(request.get('seed', 42)), request.get('strata') or None,
+                                 selected_vars)
+
+        elif command == 'check_keys':
+            keys = request.get('keys') or []
+            if isinstance(keys, str):
+                keys = [k.strip() for k in keys.split(',') if k.strip()]
+            if not keys:
+                return {'error': 'Key variables required'}
+            return reader.check_keys(keys, int(request.get('start_row', 0)), int(request.get('num_rows', 100)))
+
+        elif command == 'search':
+            columns = request.get('columns')
+            if isinstance(columns, str):
+                columns = [c for c in columns.split(',') if c] or None
+            # Cached readers keep their search index between requests
+            result = reader.search(request.get('pattern', ''), columns,
+                                   bool(request.get('regex')),
+                                   int(request.get('start_row', 0)),
+                                   int(request.get('num_rows', 100)),
+                                   indexed=True)
+            self.account(reader, file_path, request.get('object_name'))
+            return result
+
+        return {'error': f'Unknown command: {command}'}
+
+    def data_progressive(self, reader, request: Dict[str, Any], selected_vars, var_offset: int,
+                         var_limit: Optional[int], mask, emit: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """Stream a page: "page" and "progress" events go to ``emit``, the "complete" event is returned"""
+        start_row = int(request.get('start_row', 0))
+        num_rows = int(request.get('num_rows', 100))
+        where_clause = request.get('where_clause') or None
+
+        if mask is None and not var_offset and var_limit is None and hasattr(reader, 'get_data_progressive'):
+            def forward(event: Dict[str, Any]) -> None:
+                # The complete event is the response itself
+                if event['event'] != 'complete':
+                    emit(event)
+
+            return reader.get_data_progressive(start_row, num_rows, selected_vars, where_clause, forward)
+
+        page = reader.get_data(start_row, num_rows, selected_vars, where_clause, var_offset, var_limit, mask)
+        if 'error' in page:
+            return page
+        filtered_rows = page.get('filtered_rows', page.get('total_rows'))
+        bounds = {'total_rows': page.get('total_rows'), 'scanned_rows': page.get('total_rows'),
+                  'filtered_rows_lower_bound': filtered_rows, 'estimated_filtered_rows': filtered_rows}
+        emit({'event': 'page', **page, **bounds})
+        return {'event': 'complete', **bounds, 'filtered_rows': filtered_rows}
+
+    def serve(self, stdin=sys.stdin, stdout=sys.stdout) -> None:
+        def write(response: Dict[str, Any], request_id) -> None:
+            response = dict(response)
+            response['id'] = request_id
+            stdout.write(dumps(response) + '\n')
+            stdout.flush()
+
+        for line in stdin:
+            if not line.strip():
+                continue
+
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get('id')
+                response = self.handle(request, lambda event: write(event, request_id))
+            except Exception as e:
+                response = {'error': f'Unexpected error: {str(e)}'}
+
+            write(response, request_id)
+
+
+def main():
+    memory_budget = DEFAULT_MEMORY_BUDGET
+    args = sys.argv[1:]
+    if '--memory-budget' in args:
+        index = args.index('--memory-budget')
+        if index + 1 >= len(args):
+            print(dumps({'error': 'Usage: reader_service.py [--memory-budget 4GB]'}))
+            sys.exit(1)
+        memory_budget = parse_size(args[index + 1])
+
+    ReaderService(DatasetCache(memory_budget)).serve()
+
+
+if __name__ == '__main__':
+    main()
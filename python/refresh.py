@@ -0,0 +1,389 @@
+"""
+Incremental refresh of a loaded dataset after its file is rewritten
+
+A FileSnapshot keeps a file's size, mtime and a CRC-32 checksum of each of
+its pages, with the rows each page holds: the pages of a .sas7bdat file, or
+the header and XPT_BLOCK_SIZE blocks of an XPORT file's fixed-width records
+(counted from the first record, so a header rewritten with new timestamps
+does not invalidate the rows after it). When the file
+changes, the pages whose checksum or rows differ give the row ranges to
+decode again, and the loaded rows of all other pages are kept. Appending
+rows changes only the header and the last pages, so a refresh costs one read
+of the file (for the checksums) and decoding the appended rows, instead of
+decoding the whole file again.
+
+A full reload is needed instead when the variables change (names, labels,
+types, lengths or formats), the page geometry changes, more than
+REFRESH_LIMIT of the rows changed, or pages cannot be mapped to rows
+(compressed .sas7bdat files, XPORT files with several members).
+"""
+
+from __future__ import annotations
+
+import os
+import zlib
+import struct
+from typing import Dict, List, Any, Optional, Tuple, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# XPORT files are checksummed in blocks of whole 80-byte records
+XPT_RECORD = 80
+XPT_BLOCK_SIZE = XPT_RECORD * 16384
+
+XPT_OBS_HEADERS = (b'HEADER RECORD*******OBS     HEADER RECORD!!!!!!!',
+                   b'HEADER RECORD*******OBSV8   HEADER RECORD!!!!!!!')
+XPT_MEMBER_HEADER = b'HEADER RECORD*******MEMB'
+
+# Page types (after masking) of .sas7bdat pages holding rows
+SAS_PAGE_TYPE_MASK = 0x0F00
+SAS_PAGE_TYPE_DATA = 0x0100
+SAS_PAGE_TYPE_MIX = 0x0200
+
+# Past this share of changed rows a full reload costs about the same
+REFRESH_LIMIT = 0.5
+
+
+class FileSnapshot:
+    """Size, mtime and per-page checksums of a dataset file, with the rows each page holds"""
+
+    def __init__(self, size: int, mtime_ns: int, layout: Tuple, pages: List[Tuple[int, int, int]], rows: int):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.layout = layout  # format and page geometry; must be unchanged to patch
+        self.pages = pages    # (crc32, first row, stop row) per page
+        self.rows = rows
+
+    @classmethod
+    def take(cls, file_path: str, meta, rows: Optional[int] = None,
+             signature: Optional[Tuple[int, int]] = None) -> Optional[FileSnapshot]:
+        """Snapshot of a file whose header was read into ``meta``, or None if its pages cannot be mapped to rows
+
+        ``rows`` (the rows loaded) and ``signature`` ((size, mtime_ns) when
+        loading started) make sure the snapshot describes the data loaded.
+        """
+        if meta is None:
+            return None
+        stat = os.stat(file_path)
+        if signature is not None and (stat.st_size, stat.st_mtime_ns) != tuple(signature):
+            return None
+
+        if file_path.lower().endswith('.sas7bdat'):
+            mapped = _sas7bdat_pages(file_path, meta)
+        else:
+            mapped = _xpt_pages(file_path, meta, stat.st_size)
+        if mapped is None or (rows is not None and mapped[2] != rows):
+            return None
+
+        # The file must not have changed while it was read
+        after = os.stat(file_path)
+        if (after.st_size, after.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return cls(stat.st_size, stat.st_mtime_ns, *mapped)
+
+    def changed_rows(self, new: FileSnapshot) -> Optional[List[Tuple[int, int]]]:
+        """Row ranges of ``new`` to decode again, or None when a full reload is needed"""
+        if new.layout != self.layout:
+            return None
+
+        ranges = [(first, stop) for i, (crc, first, stop) in enumerate(new.pages)
+                  if first < stop and (i >= len(self.pages) or self.pages[i] != (crc, first, stop))]
+        if new.rows > self.rows:
+            ranges.append((self.rows, new.rows))
+        ranges = merge_ranges(ranges)
+
+        if sum(stop - start for start, stop in ranges) > REFRESH_LIMIT * new.rows:
+            return None
+        return ranges
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sorted (start, stop) ranges with overlapping and adjacent ones joined"""
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def _find_record(block: bytes, prefix: bytes, start: int = 0) -> int:
+    """Offset of the first 80-byte record in ``block`` starting with ``prefix``, or -1"""
+    position = block.find(prefix, start)
+    while position >= 0 and position % XPT_RECORD:
+        position = block.find(prefix, position + 1)
+    return position
+
+
+def _xpt_pages(file_path: str, meta, size: int) -> Optional[Tuple[Tuple, List[Tuple[int, int, int]], int]]:
+    """(layout, pages, rows) of an XPORT file: its header, then blocks of its fixed-width records"""
+    widths = meta.variable_storage_width or {}
+    record_length = sum(widths.get(col) or 0 for col in meta.column_names)
+    if not record_length:
+        return None
+
+    with open(file_path, 'rb') as f:
+        header = b''
+        data_start = None
+        while data_start is None:
+            block = f.read(XPT_BLOCK_SIZE)
+            if not block:
+                return None
+            found = [position for position in (_find_record(block, header_record) for header_record in XPT_OBS_HEADERS)
+                     if position >= 0]
+            if found:
+                data_start = len(header) + min(found) + XPT_RECORD
+            header += block
+
+        # The header (with its timestamps) is checksummed on its own and maps
+        # to no rows; blocks of records are counted from the first record
+        checksums = [zlib.crc32(header[:data_start])]
+        f.seek(data_start)
+        while True:
+            block = f.read(XPT_BLOCK_SIZE)
+            if not block:
+                break
+            # pyreadstat reads the first member only
+            if _find_record(block, XPT_MEMBER_HEADER) >= 0:
+                return None
+            checksums.append(zlib.crc32(block))
+
+        # The last 80-byte record is padded with blanks, which are not rows
+        rows = max(0, size - data_start) // record_length
+        while rows and size - (data_start + (rows - 1) * record_length) < XPT_RECORD:
+            f.seek(data_start + (rows - 1) * record_length)
+            if f.read(record_length).strip(b' '):
+                break
+            rows -= 1
+
+    data_length = rows * record_length
+    pages = [(checksums[0], 0, 0)]
+    for i, crc in enumerate(checksums[1:]):
+        low = i * XPT_BLOCK_SIZE
+        high = min((i + 1) * XPT_BLOCK_SIZE, data_length)
+        if low < high:
+            pages.append((crc, low // record_length, -(-high // record_length)))
+        else:
+            pages.append((crc, 0, 0))
+    return ('xpt', data_start, record_length), pages, rows
+
+
+def _sas7bdat_pages(file_path: str, meta) -> Optional[Tuple[Tuple, List[Tuple[int, int, int]], int]]:
+    """(layout, pages, rows) of a .sas7bdat file, with rows counted from each page header
+
+    Rows are stored uncompressed on data and mix pages; compressed rows live
+    in subheaders, so compressed files do not map and get None.
+    """
+    total = getattr(meta, 'number_rows', None) or 0
+    with open(file_path, 'rb') as f:
+        head = f.read(216)
+        if len(head) < 216:
+            return None
+        is_u64 = head[32] == 0x33
+        align = 4 if head[35] == 0x33 else 0
+        endian = '<' if head[37] == 0x01 else '>'
+        header_length, page_size = struct.unpack(endian + 'ii', head[196 + align:204 + align])
+        if header_length <= 0 or page_size <= 0:
+            return None
+        type_offset = 32 if is_u64 else 16
+
+        pages = []
+        rows = 0
+        f.seek(header_length)
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            count = 0
+            if len(page) >= type_offset + 6:
+                page_type, blocks, subheaders = struct.unpack_from(endian + 'HHH', page, type_offset)
+                kind = page_type & SAS_PAGE_TYPE_MASK
+                if kind == SAS_PAGE_TYPE_DATA:
+                    count = blocks
+                elif kind == SAS_PAGE_TYPE_MIX:
+                    count = blocks - subheaders
+            count = max(0, min(count, total - rows))
+            pages.append((zlib.crc32(page), rows, rows + count))
+            rows += count
+
+    if rows != total:
+        return None
+    return ('sas7bdat', header_length, page_size), pages, rows
+
+
+def structure(meta) -> Tuple:
+    """Variables with their labels, types, lengths and formats; a patch needs them unchanged"""
+    return (list(meta.column_names), list(meta.column_labels or []),
+            dict(meta.readstat_variable_types or {}), dict(meta.variable_storage_width or {}),
+            dict(meta.original_variable_types or {}))
+
+
+def plan_refresh(snapshot: Optional[FileSnapshot], file_path: str, old_meta,
+                 new_meta) -> Optional[Tuple[FileSnapshot, List[Tuple[int, int]]]]:
+    """(snapshot of the rewritten file, row ranges to decode), or None when a full reload is needed"""
+    if snapshot is None or old_meta is None or structure(old_meta) != structure(new_meta):
+        return None
+    new = FileSnapshot.take(file_path, new_meta)
+    if new is None:
+        return None
+    ranges = snapshot.changed_rows(new)
+    return None if ranges is None else (new, ranges)
+
+
+def _ibm_to_ieee(field: np.ndarray) -> np.ndarray:
+    """float64 values of IBM floating point numbers (rows of 2-8 big-endian bytes), as readstat decodes them
+
+    Truncates the 56-bit mantissa to 53 bits; a zero mantissa is 0.0 with a
+    zero first byte and missing (NaN) otherwise, and all bits set is infinity.
+    """
+    import numpy as np
+
+    raw = np.zeros((len(field), 8), dtype=np.uint8)
+    raw[:, :field.shape[1]] = field
+    words = raw.view('>u8').ravel().astype(np.uint64)
+
+    sign = words & np.uint64(1 << 63)
+    exponent = ((words >> np.uint64(56)) & np.uint64(0x7f)).astype(np.int64)
+    mantissa = words & np.uint64((1 << 56) - 1)
+    # Shift the leading 1 bit of the hexadecimal mantissa into IEEE position
+    shift = np.select([mantissa >= (1 << 55), mantissa >= (1 << 54), mantissa >= (1 << 53)], [3, 2, 1], 0)
+    biased = ((exponent - 65) * 4 + shift + 1023).astype(np.uint64)
+    bits = sign | (biased << np.uint64(52)) | ((mantissa >> shift.astype(np.uint64)) & np.uint64((1 << 52) - 1))
+    values = bits.view(np.float64)
+
+    zero = mantissa == 0
+    values[zero] = np.where(raw[zero, 0] == 0, 0.0, np.nan)
+    infinite = (words & np.uint64((1 << 63) - 1)) == np.uint64((1 << 63) - 1)
+    values[infinite] = np.where(sign[infinite] != 0, -np.inf, np.inf)
+    return values
+
+
+def _xpt_strings(field: np.ndarray, encoding: str) -> pd.Series:
+    """Strings of fixed-width character fields, as readstat decodes them
+
+    Trailing blanks and NULs are dropped and a value ends at its first NUL.
+    Only the distinct values are decoded.
+    """
+    import numpy as np
+    import pandas as pd
+
+    fixed = np.ascontiguousarray(field).view(f'S{field.shape[1]}').ravel()
+    uniques, inverse = np.unique(fixed, return_inverse=True)
+    decoded = np.empty(len(uniques), dtype=object)
+    decoded[:] = [value.rstrip(b' \0').split(b'\0', 1)[0].decode(encoding) for value in uniques.tolist()]
+    return pd.Series(decoded[inverse.ravel()])
+
+
+def decode_xpt_rows(file_path: str, meta, layout: Tuple, start: int, stop: int, encoding: str) -> pd.DataFrame:
+    """Rows ``start`` to ``stop`` of an XPORT file, decoded straight from its fixed-width records
+
+    pyreadstat's row_offset still parses every earlier row of an XPORT
+    file; the records are fixed width, so only the requested ones are read.
+    """
+    import numpy as np
+    import pandas as pd
+
+    _, data_start, record_length = layout
+    with open(file_path, 'rb') as f:
+        f.seek(data_start + start * record_length)
+        data = f.read((stop - start) * record_length)
+    if len(data) != (stop - start) * record_length:
+        raise ValueError('File is shorter than its snapshot')
+    records = np.frombuffer(data, dtype=np.uint8).reshape(stop - start, record_length)
+
+    widths = meta.variable_storage_width or {}
+    types = meta.readstat_variable_types or {}
+    columns = {}
+    offset = 0
+    for col in meta.column_names:
+        field = records[:, offset:offset + widths[col]]
+        columns[col] = _xpt_strings(field, encoding) if types.get(col) == 'string' else _ibm_to_ieee(field)
+        offset += widths[col]
+    return pd.DataFrame(columns)
+
+
+def _concat_like(pieces: List[pd.DataFrame], like: pd.DataFrame) -> pd.DataFrame:
+    """Concatenate row pieces keeping the dtypes of ``like`` (compact dtypes, categories) where values allow"""
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    columns = {}
+    for col in like.columns:
+        dtype = like[col].dtype
+        parts = []
+        for piece in pieces:
+            part = piece[col].reset_index(drop=True)
+            if part.dtype != dtype and not isinstance(dtype, pd.CategoricalDtype):
+                try:
+                    part = part.astype(dtype)
+                except (TypeError, ValueError):
+                    pass
+            parts.append(part)
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Loaded codes are kept; new values are added as categories
+            try:
+                columns[col] = pd.Series(union_categoricals(
+                    [part if isinstance(part.dtype, pd.CategoricalDtype) else part.astype('category')
+                     for part in parts]))
+                continue
+            except TypeError:
+                columns[col] = pd.concat([part.astype(object) for part in parts], ignore_index=True).astype('category')
+                continue
+        columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def patch_frame(df: pd.DataFrame, ranges: List[Tuple[int, int]], rows: int,
+                read_rows: Callable[[int, int], pd.DataFrame]) -> pd.DataFrame:
+    """``df`` with the rows in ``ranges`` replaced by ``read_rows(start, stop)``, cut or extended to ``rows``"""
+    pieces = []
+    position = 0
+    for start, stop in ranges:
+        start, stop = min(start, rows), min(stop, rows)
+        if start >= stop:
+            continue
+        if start > position:
+            pieces.append(df.iloc[position:start])
+        pieces.append(read_rows(start, stop)[list(df.columns)])
+        position = stop
+    if position < rows:
+        pieces.append(df.iloc[position:rows])
+    return _concat_like(pieces, df)
+
+
+def refresh_reader(reader, meta, read_rows: Callable[[int, int], pd.DataFrame]) -> Dict[str, Any]:
+    """Bring a reader's loaded frame up to date with its rewritten file
+
+    ``meta`` is the file's new header and ``read_rows(start, stop)`` decodes
+    rows of the new file. The reader's df, meta, snapshot and search index
+    are patched in place and it stops sharing its frame (see shared_cache).
+    Returns {"action": "unchanged" | "patched" | "reload", ...}; on "reload"
+    the reader is left as it was and must be loaded again.
+    """
+    plan = plan_refresh(reader.snapshot, reader.file_path, reader.meta, meta)
+    if plan is None:
+        return {'action': 'reload'}
+    snapshot, ranges = plan
+
+    if not ranges and snapshot.rows == len(reader.df):
+        reader.meta, reader.snapshot = meta, snapshot
+        return {'action': 'unchanged', 'rows': snapshot.rows, 'decoded_rows': 0}
+
+    df = patch_frame(reader.df, ranges, snapshot.rows, read_rows)
+    if reader.search_index is not None:
+        reader.search_index.update_rows(df, ranges)
+    if reader.shared_key:
+        from shared_cache import release
+        release(reader.shared_key)
+        reader.shared_key = None
+    reader.df, reader.meta, reader.snapshot = df, meta, snapshot
+    return {
+        'action': 'patched',
+        'rows': snapshot.rows,
+        'decoded_rows': sum(min(stop, snapshot.rows) - start for start, stop in ranges if start < snapshot.rows),
+        'ranges': [[start, stop] for start, stop in ranges]
+    }
@@ -0,0 +1,186 @@
+"""
+Row samples of a dataset without loading it (head, tail, systematic, random)
+
+Sample positions are chosen first and the rows are then fetched with
+row-offset reads, so only the sampled rows are decoded. When the row count
+is not in the file header (XPORT), random samples are drawn in one chunked
+pass instead, keeping the rows with the smallest random keys (a vectorized
+reservoir). Samples can be stratified by a variable, with proportional
+allocation; only that variable is read in full.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
+
+from dataset_source import DatasetSource
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+SAMPLE_METHODS = ('head', 'tail', 'systematic', 'random')
+
+DEFAULT_SAMPLE_SIZE = 1000
+
+DEFAULT_SEED = 42
+
+# Sampled rows closer than this are fetched with a single read
+COALESCE_GAP = 256
+
+# Rows per chunk for the chunked reservoir pass
+RESERVOIR_CHUNK_SIZE = 100000
+
+
+def choose_positions(population: int, n: int, method: str, rng) -> np.ndarray:
+    """Sorted positions (0..population-1) of an n-row sample"""
+    import numpy as np
+
+    n = min(n, population)
+    if n <= 0:
+        return np.array([], dtype=np.int64)
+    if method == 'head':
+        return np.arange(n)
+    if method == 'tail':
+        return np.arange(population - n, population)
+    if method == 'systematic':
+        step = population / n
+        start = rng.uniform(0, step)
+        return np.minimum((start + step * np.arange(n)).astype(np.int64), population - 1)
+    return np.sort(rng.choice(population, size=n, replace=False))
+
+
+def allocate(counts: np.ndarray, n: int) -> np.ndarray:
+    """Proportional allocation of n rows over strata (largest remainders, at least one each)
+
+    The sizes always add up to n: with more non-empty strata than n, the n
+    largest strata get one row each, and rows given to small strata to keep
+    them represented are taken from the strata furthest above their share.
+    """
+    import numpy as np
+
+    total = counts.sum()
+    if total == 0:
+        return np.zeros_like(counts)
+    if n >= total:
+        return counts.copy()
+
+    if np.count_nonzero(counts) >= n:
+        sizes = np.zeros_like(counts)
+        sizes[np.argsort(-counts, kind='stable')[:n]] = 1
+        return sizes
+
+    exact = counts / total * n
+    sizes = np.minimum(np.maximum(np.floor(exact).astype(np.int64), 1), counts)
+    while sizes.sum() > n:
+        surplus = np.where(sizes > 1, sizes - exact, -np.inf)
+        sizes[int(np.argmax(surplus))] -= 1
+    remaining = n - sizes.sum()
+    if remaining > 0:
+        order = np.argsort(-(exact - np.floor(exact)), kind='stable')
+        for i in order:
+            if remaining <= 0:
+                break
+            if sizes[i] < counts[i]:
+                sizes[i] += 1
+                remaining -= 1
+    return sizes
+
+
+def read_positions(source: DatasetSource, positions: np.ndarray,
+                   columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Rows at sorted positions, coalescing nearby positions into one read"""
+    import numpy as np
+    import pandas as pd
+
+    if len(positions) == 0:
+        return source.read(columns, 0, 1).iloc[0:0]
+
+    breaks = np.flatnonzero(np.diff(positions) > COALESCE_GAP) + 1
+    parts = []
+    for run in np.split(positions, breaks):
+        lo, hi = int(run[0]), int(run[-1])
+        block = source.read(columns, lo, hi - lo + 1)
+        parts.append(block.iloc[run - lo])
+    return pd.concat(parts, ignore_index=True)
+
+
+def _reservoir(source: DatasetSource, n: int, rng,
+               columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, np.ndarray, int]:
+    """Uniform sample in one chunked pass, for files without a row count in the header"""
+    import numpy as np
+    import pandas as pd
+
+    kept = None
+    kept_keys = np.array([])
+    kept_rows = np.array([], dtype=np.int64)
+    total = 0
+    for offset, chunk in source.iter_chunks(RESERVOIR_CHUNK_SIZE, columns):
+        keys = rng.random(len(chunk))
+        rows = np.arange(offset, offset + len(chunk))
+        frame = chunk.reset_index(drop=True) if kept is None else pd.concat(
+            [kept, chunk], ignore_index=True)
+        keys = np.concatenate([kept_keys, keys])
+        rows = np.concatenate([kept_rows, rows])
+        if len(keys) > n:
+            best = np.argpartition(keys, n - 1)[:n]
+            frame, keys, rows = frame.iloc[best].reset_index(drop=True), keys[best], rows[best]
+        kept, kept_keys, kept_rows = frame, keys, rows
+        total = offset + len(chunk)
+
+    if kept is None:
+        return source.read(columns, 0, 1).iloc[0:0], kept_rows, 0
+    order = np.argsort(kept_rows)
+    return kept.iloc[order].reset_index(drop=True), kept_rows[order], total
+
+
+def sample_dataset(source: DatasetSource, n: int = DEFAULT_SAMPLE_SIZE, method: str = 'random',
+                   seed: int = DEFAULT_SEED, strata: Optional[str] = None,
+                   columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Sample rows of a dataset; returns (rows, info) with the source row numbers in info['rows']"""
+    import numpy as np
+    import pandas as pd
+
+    if method == 'reservoir':
+        method = 'random'
+    if method not in SAMPLE_METHODS:
+        raise ValueError(f"Unknown sample method '{method}'. Use one of: {', '.join(SAMPLE_METHODS)}")
+
+    rng = np.random.default_rng(seed)
+    info = {'method': method, 'seed': seed, 'requested_rows': n}
+
+    if strata:
+        lookup = {col.upper(): col for col in source.columns}
+        if strata.upper() not in lookup:
+            raise ValueError(f"Strata variable '{strata}' not found")
+        strata = lookup[strata.upper()]
+
+        values = source.read([strata])[strata]
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        counts = np.bincount(codes, minlength=len(uniques))
+        sizes = allocate(counts, n)
+
+        # Row numbers grouped by stratum, each group in file order
+        by_stratum = np.argsort(codes, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        chosen = [by_stratum[bounds[i]:bounds[i + 1]][choose_positions(int(counts[i]), int(sizes[i]), method, rng)]
+                  for i in range(len(uniques))]
+        positions = np.sort(np.concatenate(chosen)) if chosen else np.array([], dtype=np.int64)
+        total = len(values)
+        info['strata'] = {'variable': strata, 'groups': [
+            {'value': None if pd.isna(value) else (value.item() if hasattr(value, 'item') else value),
+             'rows': int(count), 'sampled': int(size)}
+            for value, count, size in zip(uniques, counts, sizes)]}
+
+    elif method == 'random' and not source.in_memory and source.ext != '.sas7bdat':
+        frame, positions, total = _reservoir(source, n, rng, columns)
+        info.update({'total_rows': total, 'rows': positions.tolist()})
+        return frame, info
+
+    else:
+        total = source.row_count
+        positions = choose_positions(total, n, method, rng)
+
+    frame = read_positions(source, positions, columns)
+    info.update({'total_rows': int(total), 'rows': positions.tolist()})
+    return frame, info
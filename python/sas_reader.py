@@ -1,55 +1,259 @@
-import json
+from __future__ import annotations
+
 import sys
 import os
 import re
-import pandas as pd
-import pyreadstat
-from typing import Dict, List, Any, Optional, Tuple
+import time
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator, TYPE_CHECKING
+
+from json_output import dumps
+from reader_common import column_window, where_columns, window_info, pop_option, read_header, text_dtype
+
+# pyreadstat and pandas (and the helper modules built on it) are imported only
+# by the code paths that need them, so usage errors and header-only commands
+# start quickly
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Rows read per chunk when scanning a file progressively
+PROGRESSIVE_CHUNK_SIZE = 50000
+# Minimum seconds between progress events in progressive mode
+PROGRESS_INTERVAL = 0.25
+
 
 class SASReader:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, encoding: Optional[str] = None):
+        """``encoding`` overrides the encoding recorded in the file header (see text_encoding)"""
         self.file_path = file_path
+        self.encoding_override = encoding
+        self.encoding = encoding
+        self.encoding_info = None
         self.df = None
         self.meta = None
         self.column_names = []
+        self.all_columns = []
         self.column_labels = {}
         self.column_formats = {}
         self.variable_types = {}
+        self.memory_report = None
+        self.search_index = None
+        self.format_catalog = None
+        self.value_formats = {}
+        self.temporal_formats = {}
+        self.temporal_units = {}
+        self.engine = None
+        self.shared_key = None
+        self.snapshot = None
+
+    def load_file(self, compact: bool = False, catalog_path: Optional[str] = None,
+                  columns: Optional[List[str]] = None, engine: str = 'auto', track_changes: bool = False,
+                  share: bool = False):
+        """Load SAS file and metadata
+
+        With ``compact`` the loaded columns are converted to memory-compact
+        dtypes (see compact.compact_dataframe). With ``catalog_path`` value
+        formats from a .sas7bcat catalog are applied alongside the raw values.
+        With ``columns`` only those variables are read; the full variable list
+        is kept from a previous load_header for column windows.
+
+        ``engine`` is 'memory', 'columnar', 'chunked' or 'auto' to choose from
+        the footprint estimated from the header (see engine.choose_engine).
+        With 'chunked' only the header is kept and requests stream the file.
+        With ``share`` the decoded frame is shared with other processes (see shared_cache).
+        Strings that do not decode in the header's encoding are read with a
+        fallback encoding, reported under "encoding" in the metadata.
+        With ``track_changes`` a snapshot of the file is kept so that refresh
+        can patch the loaded frame when the file is rewritten.
+        """
+        import pandas as pd
+        import pyreadstat
+        from engine import choose_engine, load_columnar
+        from text_encoding import encoding_kwargs, note_fallback_values, read_with_fallback
 
-    def load_file(self):
-        """Load SAS file and metadata"""
         try:
-            self.df, self.meta = pyreadstat.read_sas7bdat(self.file_path)
+            stat = os.stat(self.file_path)
+            header = self._read_header()
+            self.engine = choose_engine(header, header.number_rows, engine, columns)
+
+            if self.engine['name'] == 'chunked':
+                full_columns = self.all_columns
+                result = self.load_header()
+                if result is True:
+                    self._probe_encoding()
+                if full_columns:
+                    self.all_columns = full_columns
+                if result is True and catalog_path:
+                    self.load_catalog(catalog_path)
+                return result
+
+            # Temporal variables stay SAS numbers; pages render them per column
+            def read(encoding):
+                if self.engine['name'] == 'columnar':
+                    df, _, report = load_columnar(
+                        pyreadstat.read_sas7bdat, self.file_path, columns or header.column_names,
+                        disable_datetime_conversion=True, **encoding_kwargs(encoding))
+                    return df, header, report
+                kwargs = {'usecols': columns} if columns else {}
+                df, meta = pyreadstat.read_sas7bdat(self.file_path, disable_datetime_conversion=True,
+                                                    **encoding_kwargs(encoding), **kwargs)
+                return df, meta, None
+
+            def load():
+                (df, meta, report), used, fallback = read_with_fallback(
+                    read, self.encoding, bool(self.encoding_override))
+                info = dict(self.encoding_info, used=used or self.encoding_info['used'],
+                            fallback=self.encoding_info['fallback'] or fallback)
+                return df, (meta, report, note_fallback_values(info, df))
+
+            from shared_cache import shared_frame
+            self.df, (self.meta, self.memory_report, self.encoding_info), self.shared_key = shared_frame(
+                self.file_path, ('sas', self.engine['name'], columns, self.encoding_override), load, share)
+            if self.encoding_info['fallback']:
+                self.encoding = self.encoding_info['used']
             self.column_names = list(self.df.columns)
+            if not columns or not self.all_columns:
+                self.all_columns = list(self.column_names)
 
             # Extract metadata
             if self.meta:
                 self.column_labels = self.meta.column_names_to_labels or {}
                 self.column_formats = self.meta.original_variable_types or {}
+                self.detect_temporal()
                 # Create variable types mapping
+                storage_types = self.meta.readstat_variable_types or {}
                 for col in self.df.columns:
-                    if self.df[col].dtype == 'object':
+                    if col in storage_types:
+                        # Columnar loads are already compacted; use the declared type
+                        self.variable_types[col] = 'character' if storage_types[col] == 'string' else 'numeric'
+                    elif self.df[col].dtype == 'object' or pd.api.types.is_string_dtype(self.df[col].dtype):
                         self.variable_types[col] = 'character'
                     else:
                         self.variable_types[col] = 'numeric'
 
+            if compact and self.memory_report is None:
+                from compact import compact_dataframe
+                self.df, self.memory_report = compact_dataframe(self.df)
+
+            if catalog_path:
+                self.load_catalog(catalog_path)
+
+            if track_changes:
+                from refresh import FileSnapshot
+                self.snapshot = FileSnapshot.take(self.file_path, self.meta, len(self.df),
+                                                  (stat.st_size, stat.st_mtime_ns))
+
             return True
         except Exception as e:
             return f"Error loading file: {str(e)}"
 
-    def get_metadata(self) -> Dict[str, Any]:
-        """Get dataset metadata"""
+    def refresh(self) -> Dict[str, Any]:
+        """Patch the loaded frame after the file was rewritten, decoding only the rows that changed
+
+        Returns {"action": ...} (see refresh.refresh_reader); on "reload"
+        the file must be loaded again, as with the chunked engine, which
+        holds no frame to patch.
+        """
+        if self.df is None or self.snapshot is None:
+            return {"action": "reload"}
+
+        import pyreadstat
+        from refresh import refresh_reader
+        from text_encoding import encoding_kwargs
+
+        columns = list(self.df.columns)
+
+        def read_rows(start: int, stop: int) -> pd.DataFrame:
+            df, _ = pyreadstat.read_sas7bdat(self.file_path, row_offset=start, row_limit=stop - start,
+                                             usecols=columns, disable_datetime_conversion=True,
+                                             **encoding_kwargs(self.encoding))
+            return df
+
+        try:
+            _, meta = read_header(pyreadstat.read_sas7bdat, self.file_path, self.encoding)
+            return refresh_reader(self, meta, read_rows)
+        except Exception:
+            return {"action": "reload"}
+
+    def detect_temporal(self) -> None:
+        """Find date/time/datetime variables and their rendered units from their SAS formats (once per load)"""
+        from temporal import temporal_columns, temporal_units
+        self.temporal_formats = temporal_columns(self.column_formats)
+        self.temporal_units = temporal_units(self.column_formats, self.temporal_formats)
+
+    def load_catalog(self, catalog_path: str) -> None:
+        """Attach a .sas7bcat format catalog and match its formats to variables"""
+        from formats import FormatCatalog
+
+        self.format_catalog = FormatCatalog.load(catalog_path)
+        self.value_formats = self.format_catalog.variable_formats(self.meta)
+
+    def _formatted_records(self, page_df: pd.DataFrame) -> Optional[List[Dict[str, Any]]]:
+        """Formatted values of the page's catalog-formatted columns, or None"""
+        columns = [col for col in page_df.columns if col in self.value_formats]
+        if not columns:
+            return None
+
+        import pandas as pd
+        formatted = pd.DataFrame({col: self.format_catalog.apply(page_df[col], self.value_formats[col])
+                                  for col in columns})
+        return self._page_records(formatted)
+
+    @property
+    def chunked(self) -> bool:
+        """True when the chunked engine serves requests from the file"""
+        return self.df is None and self.engine is not None and self.engine['name'] == 'chunked'
+
+    def row_count(self) -> int:
+        return self.meta.number_rows if self.chunked else len(self.df)
+
+    def _header_row_count(self) -> Optional[int]:
+        """Row count known without reading the rows (None when only a scan tells)"""
+        return len(self.df) if self.df is not None else self.meta.number_rows
+
+    def filter_mask(self, where_clause: Optional[str]) -> np.ndarray:
+        """Boolean mask over all rows for a WHERE clause (all rows without one)"""
+        import numpy as np
+
+        if self.chunked:
+            if not where_clause or not where_clause.strip():
+                return np.ones(self.row_count(), dtype=bool)
+            # Rows of chunks skipped by the zone map stay False
+            mask = np.zeros(self.row_count(), dtype=bool)
+            for offset, chunk in self._iter_chunks(PROGRESSIVE_CHUNK_SIZE, where_clause):
+                condition = self.parse_where_condition(where_clause, chunk)
+                mask[offset:offset + len(chunk)] = True if condition is None else np.asarray(condition, dtype=bool)
+            return mask
+
+        condition = self.parse_where_condition(where_clause)
+        if condition is None:
+            return np.ones(len(self.df), dtype=bool)
+        return np.asarray(condition, dtype=bool)
+
+    def get_metadata(self, var_offset: int = 0, var_limit: Optional[int] = None) -> Dict[str, Any]:
+        """Get dataset metadata, optionally for a window of variables only"""
+        import pandas as pd
+
+        if self.chunked:
+            metadata = self.get_header_metadata(var_offset, var_limit)
+            metadata["engine"] = self.engine
+            return metadata
+
         if self.df is None:
             return {"error": "File not loaded"}
 
         variables = []
-        for col in self.column_names:
+        for col in column_window(self.column_names, var_offset, var_limit):
             # Get column info from DataFrame
             col_dtype = self.df[col].dtype
             col_length = None
 
             # Calculate length for string columns
-            if col_dtype == 'object':
+            if isinstance(col_dtype, pd.CategoricalDtype):
+                # Only the distinct values need measuring
+                max_len = self.df[col].cat.categories.astype(str).str.len().max()
+                col_length = int(max_len) if pd.notna(max_len) else None
+            elif self.variable_types.get(col) == 'character':
                 max_len = self.df[col].astype(str).str.len().max()
                 col_length = int(max_len) if pd.notna(max_len) else None
 
@@ -61,8 +265,77 @@ class SASReader:
                 "length": col_length,
                 "dtype": str(col_dtype)  # pandas dtype info
             }
+            if col in self.value_formats:
+                var_info["value_format"] = self.value_formats[col]
             variables.append(var_info)
 
+        metadata = {
+            "total_rows": len(self.df),
+            "total_variables": len(self.column_names),
+            "variables": variables,
+            "file_path": self.file_path,
+            "dataset_label": self._dataset_label()
+        }
+
+        if self.memory_report is not None:
+            from compact import memory_summary
+            metadata["memory"] = memory_summary(self.memory_report)
+
+        if self.format_catalog is not None:
+            metadata["formatted_variables"] = len(self.value_formats)
+
+        if var_offset or var_limit is not None:
+            metadata.update(window_info(len(self.column_names), var_offset, len(variables)))
+
+        if self.engine is not None:
+            metadata["engine"] = self.engine
+
+        if self.encoding_info is not None:
+            metadata["encoding"] = self.encoding_info
+
+        return metadata
+
+    def get_header_metadata(self, var_offset: int = 0, var_limit: Optional[int] = None) -> Dict[str, Any]:
+        """Get dataset metadata straight from the file header (see load_header)
+
+        Lengths are the declared storage widths rather than the longest value.
+        """
+        if self.meta is None:
+            return {"error": "File not loaded"}
+
+        variable_types = self.meta.readstat_variable_types or {}
+        storage_widths = self.meta.variable_storage_width or {}
+
+        variables = []
+        for col in column_window(self.column_names, var_offset, var_limit):
+            var_type = 'character' if variable_types.get(col) == 'string' else 'numeric'
+            variables.append({
+                "name": col,
+                "type": var_type,
+                "label": self.column_labels.get(col, ""),
+                "format": self.column_formats.get(col, ""),
+                "length": storage_widths.get(col),
+                "dtype": text_dtype() if var_type == 'character' else 'float64'
+            })
+
+        metadata = {
+            "total_rows": self.meta.number_rows,
+            "total_variables": len(self.column_names),
+            "variables": variables,
+            "file_path": self.file_path,
+            "dataset_label": self._dataset_label()
+        }
+
+        if var_offset or var_limit is not None:
+            metadata.update(window_info(len(self.column_names), var_offset, len(variables)))
+
+        if self.encoding_info is not None:
+            metadata["encoding"] = self.encoding_info
+
+        return metadata
+
+    def _dataset_label(self) -> Optional[str]:
+        """Dataset label from the metadata, falling back to the file name"""
         # Get dataset label if available
         dataset_label = None
         if self.meta:
@@ -82,21 +355,27 @@ class SASReader:
                 filename_base = os.path.splitext(os.path.basename(self.file_path))[0]
                 dataset_label = f"Dataset: {filename_base}"
 
-        return {
-            "total_rows": len(self.df),
-            "total_variables": len(self.column_names),
-            "variables": variables,
-            "file_path": self.file_path,
-            "dataset_label": dataset_label
-        }
+        return dataset_label
 
-    def parse_where_condition(self, where_clause: str) -> Optional[pd.Series]:
-        """Parse and apply WHERE condition to dataframe using pandas query"""
+    def parse_where_condition(self, where_clause: str,
+                              df: Optional[pd.DataFrame] = None) -> Optional[pd.Series]:
+        """Parse and apply WHERE condition to dataframe using pandas query
+
+        By default the condition is evaluated against the loaded dataset; pass
+        ``df`` to evaluate it against a chunk read from the file instead.
+        """
         if not where_clause or not where_clause.strip():
             return None
 
+        if df is None:
+            df = self.df
+
         try:
+            from temporal import translate_where_literals
+
             original_clause = where_clause.strip()
+            # Temporal columns hold SAS numbers: compare them with numbers, not ISO strings
+            translated_clause = translate_where_literals(original_clause, self.temporal_formats)
 
             # Create case-insensitive column name mapping
             column_mapping = {}
@@ -104,7 +383,7 @@ class SASReader:
                 column_mapping[col.upper()] = col
 
             # Replace column names with actual case-sensitive names
-            query_clause = original_clause
+            query_clause = translated_clause
 
             # Sort by length (descending) to replace longer names first
             # This prevents partial replacements (e.g., "NAME" in "FIRSTNAME")
@@ -134,10 +413,10 @@ class SASReader:
             query_clause = re.sub(r'([^!<>=])\s*=\s*([^=])', r'\1 == \2', query_clause)
             
             # Use pandas query method instead of eval
-            filtered_df = self.df.query(query_clause)
+            filtered_df = df.query(query_clause)
             
             # Return the boolean mask
-            condition = self.df.index.isin(filtered_df.index)
+            condition = df.index.isin(filtered_df.index)
             return condition
 
         except Exception as e:
@@ -164,14 +443,17 @@ class SASReader:
 
             # Fallback: try simple column-based filtering for basic cases
             try:
-                return self.parse_simple_condition(original_clause)
+                return self.parse_simple_condition(translated_clause, df)
             except Exception as fallback_error:
                 # If both fail, provide comprehensive error message
                 raise ValueError(f"Invalid WHERE clause '{original_clause}': {error_msg}")
     
-    def parse_simple_condition(self, where_clause: str) -> Optional[pd.Series]:
+    def parse_simple_condition(self, where_clause: str,
+                               df: Optional[pd.DataFrame] = None) -> Optional[pd.Series]:
         """Fallback parser for simple conditions like COLUMN = 'VALUE'"""
-        
+        if df is None:
+            df = self.df
+
         # Handle simple equality: COLUMN = 'VALUE'
         match = re.match(r'^\s*(\w+)\s*=\s*[\'"]([^\'"]*)[\'"]?\s*$', where_clause, re.IGNORECASE)
         if match:
@@ -185,7 +467,7 @@ class SASReader:
                     break
             
             if actual_col:
-                condition = self.df[actual_col] == value
+                condition = df[actual_col] == value
                 return condition
         
         # Handle simple numeric comparison: COLUMN > VALUE
@@ -203,26 +485,50 @@ class SASReader:
             if actual_col:
                 numeric_value = float(value)
                 if operator == '>':
-                    condition = self.df[actual_col] > numeric_value
+                    condition = df[actual_col] > numeric_value
                 elif operator == '<':
-                    condition = self.df[actual_col] < numeric_value
+                    condition = df[actual_col] < numeric_value
                 elif operator == '>=':
-                    condition = self.df[actual_col] >= numeric_value
+                    condition = df[actual_col] >= numeric_value
                 elif operator == '<=':
-                    condition = self.df[actual_col] <= numeric_value
+                    condition = df[actual_col] <= numeric_value
                 elif operator in ['=', '==']:
-                    condition = self.df[actual_col] == numeric_value
+                    condition = df[actual_col] == numeric_value
                 elif operator in ['!=', '<>']:
-                    condition = self.df[actual_col] != numeric_value
+                    condition = df[actual_col] != numeric_value
                 else:
                     raise ValueError(f"Unsupported operator: {operator}")
                 return condition
         
         raise ValueError(f"Could not parse simple condition: {where_clause}")
 
+    def _page_records(self, page_df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Convert a page of rows into JSON-serializable records"""
+        from json_output import frame_records
+        from temporal import render_frame
+        from text_encoding import decode_frame
+
+        # Dates and times are rendered, byte strings decoded and missing values
+        # replaced a whole column at a time
+        page_df = render_frame(page_df, self.temporal_formats, self.temporal_units)
+        page_df, _, _ = decode_frame(page_df, self.encoding)
+        return frame_records(page_df)
+
     def get_data(self, start_row: int = 0, num_rows: int = 100,
-                 selected_vars: List[str] = None, where_clause: str = None) -> Dict[str, Any]:
-        """Get data with pagination, variable selection, and filtering"""
+                 selected_vars: List[str] = None, where_clause: str = None,
+                 var_offset: int = 0, var_limit: Optional[int] = None,
+                 mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Get data with pagination, variable selection, and filtering
+
+        ``var_offset``/``var_limit`` select a window over the selected (or
+        all) variables, so wide datasets can be scrolled horizontally.
+        ``mask`` (a boolean row mask, e.g. from a filter set) is applied
+        before the WHERE clause.
+        """
+        if self.chunked:
+            return self._get_data_chunked(start_row, num_rows, selected_vars, where_clause,
+                                          var_offset, var_limit, mask)
+
         if self.df is None:
             return {"error": "File not loaded"}
 
@@ -230,17 +536,27 @@ class SASReader:
             # OPTIMIZATION: Use view instead of copy when possible
             working_df = self.df
 
-            # Apply WHERE condition if provided
             filtered_rows = len(working_df)
+            if mask is not None:
+                working_df = working_df[mask]
+                filtered_rows = len(working_df)
+
+            # Apply WHERE condition if provided
             if where_clause:
-                condition = self.parse_where_condition(where_clause)
+                condition = self.parse_where_condition(where_clause, working_df)
                 if condition is not None:
                     # OPTIMIZATION: Use loc for better performance
                     working_df = working_df.loc[condition]
                     filtered_rows = len(working_df)
 
+            windowed = bool(var_offset) or var_limit is not None
+            if windowed:
+                base = [v for v in selected_vars or [] if v in self.all_columns] or self.all_columns
+                window = column_window(base, var_offset, var_limit)
+                working_df = working_df[[v for v in window if v in working_df.columns]]
+
             # Select variables if specified
-            if selected_vars:
+            elif selected_vars:
                 # OPTIMIZATION: Use intersection for faster validation
                 valid_vars = list(set(selected_vars) & set(working_df.columns))
                 # Preserve original order
@@ -252,30 +568,13 @@ class SASReader:
             end_row = min(start_row + num_rows, len(working_df))
             page_df = working_df.iloc[start_row:end_row]
 
-            # OPTIMIZATION: Use vectorized operations for data conversion
-            # Convert to records first, then handle NaN and special types
-            data = page_df.to_dict('records')
-
-            # Fast type conversion for special types and handle NaN
-            for row in data:
-                for col, value in row.items():
-                    # Handle NaN/null values
-                    if pd.isna(value):
-                        row[col] = None
-                    elif isinstance(value, (pd.Timestamp, pd.Period)):
-                        row[col] = str(value)
-                    elif hasattr(value, 'isoformat'):
-                        row[col] = value.isoformat()
-                    elif isinstance(value, bytes):
-                        row[col] = value.decode('utf-8', errors='ignore')
-                    elif hasattr(value, 'item'):  # numpy types
-                        row[col] = value.item()
+            data = self._page_records(page_df)
 
             valid_row_count = len(data)
 
             # Removed debug print for performance
             
-            return {
+            result = {
                 "data": data,
                 "total_rows": len(self.df),
                 "filtered_rows": filtered_rows,
@@ -284,12 +583,535 @@ class SASReader:
                 "columns": list(page_df.columns)
             }
 
+            if windowed:
+                result.update(window_info(len(base), var_offset, len(page_df.columns)))
+
+            if self.engine is not None:
+                result["engine"] = self.engine["name"]
+
+            # Catalog-formatted values, row-aligned with "data"
+            formatted = self._formatted_records(page_df)
+            if formatted is not None:
+                result["formatted"] = formatted
+
+            return result
+
+        except Exception as e:
+            return {"error": f"Error retrieving data: {str(e)}"}
+
+    def _get_data_chunked(self, start_row: int, num_rows: int, selected_vars: List[str],
+                          where_clause: str, var_offset: int, var_limit: Optional[int],
+                          mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """get_data for the chunked engine: row-range reads, or a chunked scan when filtering
+
+        With a row mask the WHERE clause is folded into it and the page's
+        rows are read by position.
+        """
+        import numpy as np
+        import pyreadstat
+        from text_encoding import encoding_kwargs
+
+        try:
+            windowed = bool(var_offset) or var_limit is not None
+            base = [v for v in selected_vars or [] if v in self.all_columns] or self.all_columns
+            columns = column_window(base, var_offset, var_limit) if windowed or selected_vars else None
+            total_rows = self.meta.number_rows
+
+            if mask is not None:
+                if where_clause and where_clause.strip():
+                    mask = mask & self.filter_mask(where_clause)
+                from dataset_source import DatasetSource
+                from sampling import read_positions
+                positions = np.flatnonzero(mask)
+                page_df = read_positions(DatasetSource(self.file_path, encoding=self.encoding),
+                                         positions[start_row:start_row + num_rows], columns)
+                data, page_columns = self._page_records(page_df), list(page_df.columns)
+                filtered_rows = len(positions)
+                formatted = self._formatted_records(page_df)
+            elif where_clause and where_clause.strip():
+                events = []
+                complete = self.get_data_progressive(start_row, num_rows, columns, where_clause, events.append)
+                if "error" in complete:
+                    return complete
+                page = next(event for event in events if event["event"] == "page")
+                data, page_columns = page["data"], page["columns"]
+                filtered_rows = complete["filtered_rows"]
+                formatted = page.get("formatted")
+            else:
+                if start_row < (total_rows or 0):
+                    page_df, _ = pyreadstat.read_sas7bdat(self.file_path, row_offset=start_row,
+                                                          row_limit=num_rows, usecols=columns,
+                                                          disable_datetime_conversion=True,
+                                                          **encoding_kwargs(self.encoding))
+                else:
+                    page_df, _ = pyreadstat.read_sas7bdat(self.file_path, row_limit=1, usecols=columns,
+                                                          disable_datetime_conversion=True,
+                                                          **encoding_kwargs(self.encoding))
+                    page_df = page_df.iloc[0:0]
+                if columns:
+                    page_df = page_df[columns]
+                data, page_columns = self._page_records(page_df), list(page_df.columns)
+                filtered_rows = total_rows
+                formatted = self._formatted_records(page_df)
+
+            result = {
+                "data": data,
+                "total_rows": total_rows,
+                "filtered_rows": filtered_rows,
+                "start_row": start_row,
+                "returned_rows": len(data),
+                "columns": page_columns
+            }
+            if windowed:
+                result.update(window_info(len(base), var_offset, len(page_columns)))
+            result["engine"] = self.engine["name"]
+            if formatted is not None:
+                result["formatted"] = formatted
+            return result
+
+        except Exception as e:
+            return {"error": f"Error retrieving data: {str(e)}"}
+
+    def get_filtered_row_count(self, where_clause: str, mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Get count of rows matching WHERE clause (within ``mask`` if given)"""
+        if mask is not None:
+            if self.df is None and not self.chunked:
+                return {"error": "File not loaded"}
+            try:
+                if where_clause and where_clause.strip():
+                    mask = mask & self.filter_mask(where_clause)
+                return {"count": int(mask.sum())}
+            except Exception as e:
+                return {"error": f"Error counting rows: {str(e)}"}
+
+        if self.chunked:
+            try:
+                if not where_clause or not where_clause.strip():
+                    return {"count": self.meta.number_rows}
+                count = 0
+                for _, chunk in self._iter_chunks(PROGRESSIVE_CHUNK_SIZE, where_clause):
+                    condition = self.parse_where_condition(where_clause, chunk)
+                    count += len(chunk) if condition is None else int(condition.sum())
+                return {"count": count}
+            except Exception as e:
+                return {"error": f"Error counting rows: {str(e)}"}
+
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        try:
+            if not where_clause or not where_clause.strip():
+                return {"count": len(self.df)}
+
+            condition = self.parse_where_condition(where_clause)
+            if condition is not None:
+                return {"count": int(condition.sum())}
+            else:
+                return {"count": len(self.df)}
+
+        except Exception as e:
+            return {"error": f"Error counting rows: {str(e)}"}
+
+    def get_unique_values(self, column_name: str, include_count: bool = False,
+                          mask: Optional[np.ndarray] = None, approximate: bool = False,
+                          top_k: Optional[int] = None) -> Dict[str, Any]:
+        """Get unique values for a column (over the rows in ``mask`` if given)
+
+        With ``approximate`` only the ``top_k`` most frequent values are
+        returned, from one sketch pass (see sketches), with the estimated
+        distinct count and error bounds under "approximate".
+        """
+        import pandas as pd
+        from compact import categorical_value_counts
+
+        if self.df is None and not self.chunked:
+            return {"error": "File not loaded"}
+
+        try:
+            # Case-insensitive column lookup
+            actual_col = None
+            for col in self.column_names:
+                if col.upper() == column_name.upper():
+                    actual_col = col
+                    break
+
+            if actual_col is None:
+                return {"error": f"Column '{column_name}' not found"}
+
+            summary = None
+            if approximate:
+                from sketches import approximate_counts, series_chunks, DEFAULT_TOP_K
+                if self.df is None:
+                    chunks = self._column_chunks(actual_col, mask)
+                else:
+                    chunks = series_chunks(self.df[actual_col] if mask is None else self.df[actual_col][mask])
+                pairs, summary = approximate_counts(chunks, top_k or DEFAULT_TOP_K)
+            elif self.df is None:
+                # Chunked engine: count one column a chunk at a time
+                counts = None
+                for column in self._column_chunks(actual_col, mask):
+                    chunk_counts = column.value_counts(dropna=False)
+                    counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+                pairs = []
+                if counts is not None:
+                    pairs = [(None if pd.isna(val) else val, int(count))
+                             for val, count in counts.sort_values(ascending=False, kind='stable').items()]
+            else:
+                column = self.df[actual_col] if mask is None else self.df[actual_col][mask]
+                if isinstance(column.dtype, pd.CategoricalDtype):
+                    # Compact mode: count codes, not strings
+                    pairs = categorical_value_counts(column)
+                else:
+                    pairs = [(None if pd.isna(val) else val, int(count))
+                             for val, count in column.value_counts(dropna=False).items()]
+
+            values = []
+            for val, count in pairs:
+                if hasattr(val, 'item'):  # numpy types
+                    val = val.item()
+                values.append({"value": val, "count": count} if include_count else val)
+            if actual_col in self.temporal_formats:
+                from temporal import render_sas_values
+                rendered = render_sas_values([val for val, _ in pairs], self.temporal_formats[actual_col],
+                                             self.temporal_units.get(actual_col, 's'))
+                if include_count:
+                    for entry, text in zip(values, rendered):
+                        entry["value"] = text
+                else:
+                    values = list(rendered)
+
+            result = {"values": values}
+            if summary is not None:
+                result["approximate"] = summary
+
+            if actual_col in self.value_formats:
+                # Formatted labels, aligned with "values"
+                raw = pd.Series([val for val, _ in pairs], dtype=object)
+                result["formatted"] = self.format_catalog.apply(
+                    raw, self.value_formats[actual_col]).tolist()
+
+            return result
+
+        except Exception as e:
+            return {"error": f"Error getting unique values: {str(e)}"}
+
+    def check_keys(self, keys: List[str], start_row: int = 0, num_rows: int = 100) -> Dict[str, Any]:
+        """Whether ``keys`` identify every row, with a page of the duplicate rows (see key_check)
+
+        The chunked engine reads only the key columns to hash them.
+        """
+        from dataset_source import DatasetSource
+        from key_check import check_keys, resolve_keys, KEY_CHUNK_SIZE
+        from sampling import read_positions
+
+        if self.df is None and not self.chunked:
+            return {"error": "File not loaded"}
+
+        try:
+            keys = resolve_keys(keys, self.all_columns or self.column_names)
+            complete = self.df is not None and len(self.df.columns) >= len(self.all_columns)
+            source = DatasetSource(self.file_path, frame=self.df if complete else None, encoding=self.encoding)
+            result, page = check_keys(source.iter_chunks(KEY_CHUNK_SIZE, keys),
+                                      lambda positions, columns: read_positions(source, positions, columns),
+                                      keys, start_row, num_rows)
+            result["data"] = self._page_records(page)
+            result["columns"] = list(page.columns)
+            return result
+
+        except Exception as e:
+            return {"error": f"Error checking keys: {str(e)}"}
+
+    def search(self, pattern: str, columns: List[str] = None, regex: bool = False,
+               start_row: int = 0, num_rows: int = 100, indexed: bool = False) -> Dict[str, Any]:
+        """Find rows where character variables contain a substring or regex (case-insensitive)
+
+        With ``indexed`` a SearchIndex with n-gram postings is built once and
+        kept on the reader for repeated searches.
+        """
+        from search import SearchIndex, search_frame
+
+        if self.chunked:
+            return {"error": "Search needs the dataset in memory, which the chunked engine avoids "
+                             "for this file; use a WHERE clause instead"}
+
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        if not pattern:
+            return {"error": "Search pattern required"}
+
+        if not indexed:
+            return search_frame(self.df, pattern, columns, regex, start_row, num_rows)
+
+        if self.search_index is None:
+            self.search_index = SearchIndex(self.df, ngrams=True)
+        return self.search_index.search(pattern, columns, regex, start_row, num_rows)
+
+    def sample(self, n: int = 1000, method: str = 'random', seed: int = 42,
+               strata: Optional[str] = None, selected_vars: List[str] = None) -> Dict[str, Any]:
+        """Sample rows (head, tail, systematic, random), optionally stratified
+
+        Works after load_header: only the sampled rows are read from the file
+        (see sampling.sample_dataset). Uses the loaded DataFrame if there is one.
+        """
+        from dataset_source import DatasetSource
+        from sampling import sample_dataset
+
+        if self.df is None and self.meta is None:
+            return {"error": "File not loaded"}
+
+        try:
+            columns = [v for v in selected_vars if v in self.column_names] or None if selected_vars else None
+            source = DatasetSource(self.file_path, frame=self.df, encoding=self.encoding)
+            frame, info = sample_dataset(source, n, method, seed, strata, columns)
+            data = self._page_records(frame)
+
+            result = {
+                "data": data,
+                "total_rows": info.pop("total_rows"),
+                "returned_rows": len(data),
+                "columns": list(frame.columns)
+            }
+            result.update(info)
+            return result
+
+        except Exception as e:
+            return {"error": f"Error sampling data: {str(e)}"}
+
+    def _read_header(self):
+        """Read the file header, detecting its encoding (a fallback is kept for later reads)"""
+        import pyreadstat
+        from text_encoding import encoding_info, read_with_fallback
+
+        (_, header), used, fallback = read_with_fallback(
+            lambda encoding: read_header(pyreadstat.read_sas7bdat, self.file_path, encoding),
+            self.encoding_override, bool(self.encoding_override))
+        self.encoding = used
+        self.encoding_info = encoding_info(getattr(header, 'file_encoding', None), used, fallback,
+                                           bool(self.encoding_override))
+        return header
+
+    def _probe_encoding(self) -> None:
+        """Decode the first chunk's character variables, switching to a fallback encoding if they fail
+
+        The chunked engine never reads the whole file at once, so this is
+        what it checks its encoding against; its "fallback_values" count the
+        first chunk only.
+        """
+        import pyreadstat
+        from text_encoding import encoding_kwargs, note_fallback_values, read_with_fallback
+
+        types = self.meta.readstat_variable_types or {}
+        character = [col for col in self.column_names if types.get(col) == 'string']
+        if not character:
+            return
+        (chunk, _), used, fallback = read_with_fallback(
+            lambda encoding: pyreadstat.read_sas7bdat(self.file_path, row_limit=PROGRESSIVE_CHUNK_SIZE,
+                                                      usecols=character, **encoding_kwargs(encoding)),
+            self.encoding, bool(self.encoding_override))
+        if fallback:
+            self.encoding = used
+            self.encoding_info.update(used=used, fallback=True)
+        note_fallback_values(self.encoding_info, chunk)
+
+    def load_header(self):
+        """Load only the file header (column names, labels, row count)"""
+        try:
+            self.meta = self._read_header()
+            self.column_names = list(self.meta.column_names)
+            self.all_columns = list(self.column_names)
+            self.column_labels = self.meta.column_names_to_labels or {}
+            self.column_formats = self.meta.original_variable_types or {}
+            self.detect_temporal()
+            return True
+        except Exception as e:
+            return f"Error loading file: {str(e)}"
+
+    def _column_chunks(self, column: str, mask: Optional[np.ndarray] = None) -> Iterator[pd.Series]:
+        """One column of the file a chunk at a time, limited to the rows in ``mask``"""
+        import pyreadstat
+        from text_encoding import encoding_kwargs
+
+        offset = 0
+        for chunk, _ in pyreadstat.read_file_in_chunks(
+                pyreadstat.read_sas7bdat, self.file_path, chunksize=PROGRESSIVE_CHUNK_SIZE,
+                usecols=[column], disable_datetime_conversion=True, **encoding_kwargs(self.encoding)):
+            series = chunk[column]
+            if mask is not None:
+                series = series[mask[offset:offset + len(chunk)]]
+            offset += len(chunk)
+            yield series
+
+    def _iter_chunks(self, chunk_size: int, where_clause: Optional[str] = None) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """Yield (offset, chunk) pairs covering the whole dataset in row order
+
+        Uses the loaded DataFrame when available, otherwise streams the file
+        so that no more than one chunk is held in memory. With a WHERE clause,
+        chunks that the file's zone map proves cannot match are skipped (see
+        zone_maps.py); a full streamed scan builds and saves that zone map.
+        """
+        from zone_maps import ZoneMap, chunk_runs
+
+        zone_map = ZoneMap.load(self.file_path, chunk_size)
+        candidates = zone_map.candidates(where_clause, self.temporal_formats) if zone_map is not None and where_clause else None
+        if candidates is not None:
+            for first, stop in chunk_runs(candidates):
+                yield from self._read_chunks(chunk_size, first * chunk_size, (stop - first) * chunk_size)
+            return
+
+        builder = ZoneMap(chunk_size) if zone_map is None and self.df is None else None
+        for offset, chunk in self._read_chunks(chunk_size):
+            if builder is not None:
+                builder.add_chunk(chunk)
+            yield offset, chunk
+        if builder is not None:
+            builder.save(self.file_path)
+
+    def _read_chunks(self, chunk_size: int, offset: int = 0, limit: int = 0) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """Yield (offset, chunk) pairs for ``limit`` rows from ``offset`` (all rows if limit is 0)"""
+        if self.df is not None:
+            end = min(offset + limit, len(self.df)) if limit else len(self.df)
+            for start in range(offset, end, chunk_size):
+                yield start, self.df.iloc[start:min(start + chunk_size, end)]
+            return
+
+        import pyreadstat
+        from text_encoding import encoding_kwargs
+
+        for chunk, _ in pyreadstat.read_file_in_chunks(
+                pyreadstat.read_sas7bdat, self.file_path, chunksize=chunk_size, offset=offset,
+                limit=limit, disable_datetime_conversion=True, **encoding_kwargs(self.encoding)):
+            yield offset, chunk
+            offset += len(chunk)
+
+    def get_data_progressive(self, start_row: int = 0, num_rows: int = 100,
+                             selected_vars: List[str] = None, where_clause: str = None,
+                             emit: Callable[[Dict[str, Any]], None] = None,
+                             chunk_size: int = PROGRESSIVE_CHUNK_SIZE) -> Dict[str, Any]:
+        """Get a filtered page as soon as enough matches are found
+
+        The dataset is scanned chunk by chunk. Events are passed to ``emit``:
+
+        - ``page``: the requested page, sent as soon as it is complete, with a
+          lower bound and an estimate of ``filtered_rows`` from the scanned fraction
+        - ``progress``: updated bound/estimate while the scan continues
+        - ``complete``: the exact ``filtered_rows`` once the whole file is scanned
+
+        The ``complete`` event is also returned.
+        """
+        import pandas as pd
+
+        if self.df is None and not self.chunked:
+            return {"error": "File not loaded"}
+
+        if emit is None:
+            emit = lambda event: None
+
+        try:
+            total_rows = self._header_row_count()
+            end_row = start_row + num_rows
+            columns = None
+            if selected_vars:
+                columns = [v for v in selected_vars if v in self.column_names] or None
+
+            matched = 0
+            scanned = 0
+            page_parts = []
+            page_sent = False
+            last_emit = time.monotonic()
+
+            def progress(event: str) -> Dict[str, Any]:
+                estimate = matched
+                if scanned and total_rows:
+                    estimate = max(matched, int(round(matched / scanned * total_rows)))
+                return {
+                    "event": event,
+                    "total_rows": total_rows,
+                    "scanned_rows": scanned,
+                    "filtered_rows_lower_bound": matched,
+                    "estimated_filtered_rows": estimate
+                }
+
+            def send_page() -> None:
+                page_df = pd.concat(page_parts) if page_parts else pd.DataFrame(columns=columns or self.column_names)
+                page_df = page_df.iloc[:num_rows]
+                if columns:
+                    page_df = page_df[columns]
+                data = self._page_records(page_df)
+                event = progress("page")
+                event.update({
+                    "data": data,
+                    "start_row": start_row,
+                    "returned_rows": len(data),
+                    "columns": list(page_df.columns)
+                })
+                formatted = self._formatted_records(page_df)
+                if formatted is not None:
+                    event["formatted"] = formatted
+                emit(event)
+
+            filtering = bool(where_clause and where_clause.strip())
+            for offset, chunk in self._iter_chunks(chunk_size, where_clause if filtering else None):
+                # Chunks skipped by the zone map count as scanned
+                scanned = offset + len(chunk)
+                if where_clause and where_clause.strip():
+                    condition = self.parse_where_condition(where_clause, chunk)
+                    if condition is not None:
+                        chunk = chunk.loc[condition]
+
+                # Keep only the part of this chunk's matches that falls in the page
+                if not page_sent and matched + len(chunk) > start_row:
+                    lo = max(start_row - matched, 0)
+                    hi = min(end_row - matched, len(chunk))
+                    page_parts.append(chunk.iloc[lo:hi])
+
+                matched += len(chunk)
+
+                if not page_sent and matched >= end_row:
+                    send_page()
+                    page_sent = True
+                    last_emit = time.monotonic()
+                elif page_sent and time.monotonic() - last_emit >= PROGRESS_INTERVAL:
+                    emit(progress("progress"))
+                    last_emit = time.monotonic()
+
+            # Headers without a row count (e.g. XPORT) learn it from the scan
+            if total_rows is None:
+                total_rows = scanned
+            scanned = total_rows
+            if not page_sent:
+                send_page()
+
+            result = progress("complete")
+            result["filtered_rows"] = matched
+            emit(result)
+            return result
+
         except Exception as e:
             return {"error": f"Error retrieving data: {str(e)}"}
 
 def main():
     if len(sys.argv) < 2:
-        print(json.dumps({"error": "No command provided"}))
+        print(dumps({"error": "No command provided"}))
+        return
+
+    # Optional flags may appear anywhere after the command
+    compact = '--compact' in sys.argv
+    if compact:
+        sys.argv.remove('--compact')
+    approximate = '--approximate' in sys.argv
+    if approximate:
+        sys.argv.remove('--approximate')
+
+    try:
+        catalog_path = pop_option(sys.argv, '--catalog')
+        engine = pop_option(sys.argv, '--engine') or 'auto'
+        filter_set = pop_option(sys.argv, '--filter-set')
+        top_k = pop_option(sys.argv, '--top-k')
+        top_k = int(top_k) if top_k else None
+        encoding = pop_option(sys.argv, '--encoding')
+    except ValueError as e:
+        print(dumps({"error": str(e)}))
         return
 
     command = sys.argv[1]
@@ -297,22 +1119,22 @@ def main():
     try:
         if command == "load":
             if len(sys.argv) < 3:
-                print(json.dumps({"error": "File path required"}))
+                print(dumps({"error": "File path required"}))
                 return
 
             file_path = sys.argv[2]
-            reader = SASReader(file_path)
-            result = reader.load_file()
+            reader = SASReader(file_path, encoding)
+            result = reader.load_file(compact, catalog_path, None, engine)
 
             if result is True:
                 metadata = reader.get_metadata()
-                print(json.dumps({"success": True, "metadata": metadata}))
+                print(dumps({"success": True, "metadata": metadata}))
             else:
-                print(json.dumps({"error": result}))
+                print(dumps({"error": result}))
 
         elif command == "data":
             if len(sys.argv) < 3:
-                print(json.dumps({"error": "File path required"}))
+                print(dumps({"error": "File path required"}))
                 return
 
             file_path = sys.argv[2]
@@ -320,38 +1142,159 @@ def main():
             num_rows = int(sys.argv[4]) if len(sys.argv) > 4 else 100
             selected_vars = sys.argv[5].split(',') if len(sys.argv) > 5 and sys.argv[5] else None
             where_clause = sys.argv[6] if len(sys.argv) > 6 else None
+            var_offset = int(sys.argv[7]) if len(sys.argv) > 7 and sys.argv[7] else 0
+            var_limit = int(sys.argv[8]) if len(sys.argv) > 8 and sys.argv[8] else None
 
-            reader = SASReader(file_path)
-            load_result = reader.load_file()
+            reader = SASReader(file_path, encoding)
+            columns = None
+            # Saved filter sets may need every variable to be rebuilt
+            if (selected_vars or var_offset or var_limit is not None) and not filter_set:
+                # Read only the visible variables plus those the WHERE clause needs
+                load_result = reader.load_header()
+                if load_result is not True:
+                    print(dumps({"error": load_result}))
+                    return
+                base = [v for v in selected_vars or [] if v in reader.all_columns] or reader.all_columns
+                visible = column_window(base, var_offset, var_limit)
+                columns = list(dict.fromkeys(visible + where_columns(where_clause, reader.all_columns)))
+
+            load_result = reader.load_file(compact, catalog_path, columns, engine)
 
             if load_result is not True:
-                print(json.dumps({"error": load_result}))
+                print(dumps({"error": load_result}))
                 return
 
-            data_result = reader.get_data(start_row, num_rows, selected_vars, where_clause)
-            print(json.dumps(data_result))
+            from filter_sets import resolve_filter_set
+            data_result = reader.get_data(start_row, num_rows, selected_vars, where_clause,
+                                          var_offset, var_limit, resolve_filter_set(reader, filter_set))
+            print(dumps(data_result))
 
         elif command == "metadata":
             if len(sys.argv) < 3:
-                print(json.dumps({"error": "File path required"}))
+                print(dumps({"error": "File path required"}))
+                return
+
+            file_path = sys.argv[2]
+            reader = SASReader(file_path, encoding)
+            # Header-only: answers from the file header without loading rows
+            load_result = reader.load_header()
+
+            if load_result is not True:
+                print(dumps({"error": load_result}))
+                return
+
+            var_offset = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else 0
+            var_limit = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else None
+            metadata = reader.get_header_metadata(var_offset, var_limit)
+            print(dumps(metadata))
+
+        elif command == "count":
+            if len(sys.argv) < 3:
+                print(dumps({"error": "File path required"}))
                 return
 
             file_path = sys.argv[2]
-            reader = SASReader(file_path)
-            load_result = reader.load_file()
+            where_clause = sys.argv[3] if len(sys.argv) > 3 else ''
+
+            reader = SASReader(file_path, encoding)
+            load_result = reader.load_file(compact, catalog_path, None, engine)
+
+            if load_result is not True:
+                print(dumps({"error": load_result}))
+                return
+
+            from filter_sets import resolve_filter_set
+            print(dumps(reader.get_filtered_row_count(where_clause, resolve_filter_set(reader, filter_set))))
+
+        elif command == "sample":
+            if len(sys.argv) < 3:
+                print(dumps({"error": "File path required"}))
+                return
+
+            file_path = sys.argv[2]
+            n = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else 1000
+            method = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] else 'random'
+            seed = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else 42
+            strata = sys.argv[6] if len(sys.argv) > 6 and sys.argv[6] else None
+            selected_vars = sys.argv[7].split(',') if len(sys.argv) > 7 and sys.argv[7] else None
+
+            reader = SASReader(file_path, encoding)
+            # Header only: the sampled rows are read on their own
+            load_result = reader.load_header()
+
+            if load_result is not True:
+                print(dumps({"error": load_result}))
+                return
+
+            print(dumps(reader.sample(n, method, seed, strata, selected_vars)))
+
+        elif command == "check_keys":
+            if len(sys.argv) < 4:
+                print(dumps({"error": "File path and key variables required"}))
+                return
+
+            file_path = sys.argv[2]
+            keys = [k.strip() for k in sys.argv[3].split(',') if k.strip()]
+            start_row = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else 0
+            num_rows = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else 100
+
+            reader = SASReader(file_path, encoding)
+            # Only the key columns are needed for the check, so stream them by default
+            load_result = reader.load_file(compact, catalog_path, None, 'chunked' if engine == 'auto' else engine)
+
+            if load_result is not True:
+                print(dumps({"error": load_result}))
+                return
+
+            print(dumps(reader.check_keys(keys, start_row, num_rows)))
+
+        elif command == "unique":
+            if len(sys.argv) < 4:
+                print(dumps({"error": "File path and column name required"}))
+                return
+
+            file_path = sys.argv[2]
+            column_name = sys.argv[3]
+            include_count = sys.argv[4].lower() == 'true' if len(sys.argv) > 4 else False
+
+            reader = SASReader(file_path, encoding)
+            load_result = reader.load_file(compact, catalog_path, None, engine)
+
+            if load_result is not True:
+                print(dumps({"error": load_result}))
+                return
+
+            from filter_sets import resolve_filter_set
+            print(dumps(reader.get_unique_values(column_name, include_count,
+                                                      resolve_filter_set(reader, filter_set),
+                                                      approximate, top_k)))
+
+        elif command == "search":
+            if len(sys.argv) < 4:
+                print(dumps({"error": "File path and search pattern required"}))
+                return
+
+            file_path = sys.argv[2]
+            pattern = sys.argv[3]
+            columns = sys.argv[4].split(',') if len(sys.argv) > 4 and sys.argv[4] else None
+            regex = sys.argv[5].lower() == 'true' if len(sys.argv) > 5 else False
+            start_row = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+            num_rows = int(sys.argv[7]) if len(sys.argv) > 7 else 100
+
+            reader = SASReader(file_path, encoding)
+            load_result = reader.load_file(compact, catalog_path, None, engine)
 
             if load_result is not True:
-                print(json.dumps({"error": load_result}))
+                print(dumps({"error": load_result}))
                 return
 
-            metadata = reader.get_metadata()
-            print(json.dumps(metadata))
+            print(dumps(reader.search(pattern, columns, regex, start_row, num_rows)))
 
         else:
-            print(json.dumps({"error": f"Unknown command: {command}"}))
+            print(dumps({"error": f"Unknown command: {command}"}))
 
     except Exception as e:
-        print(json.dumps({"error": f"Unexpected error: {str(e)}"}))
+        print(dumps({"error": f"Unexpected error: {str(e)}"}))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""
+Full-text search across character variables
+Shared by the SAS, XPT and R readers
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, Tuple
+
+from compact import is_text_column
+
+# Length of the n-grams kept by an indexed SearchIndex
+NGRAM_SIZE = 3
+
+
+class SearchIndex:
+    """Distinct lowercase values per character column, with optional n-gram postings
+
+    Each column is factorized once into integer codes and its distinct values,
+    so a search tests every distinct string once and maps the result back to
+    rows through the codes. Keep the index around (e.g. on a cached reader) to
+    make repeated searches on the same dataset cheap.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: Optional[List[str]] = None, ngrams: bool = False):
+        if columns is None:
+            columns = [col for col in df.columns if is_text_column(df[col])]
+
+        self.columns = columns
+        self.ngrams = ngrams
+        self.codes = {}
+        self.values = {}
+        self.postings = {}
+
+        for col in columns:
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy()
+                uniques = series.cat.categories
+            else:
+                codes, uniques = pd.factorize(series)
+
+            self.codes[col] = codes
+            self.values[col] = [str(value).lower() for value in uniques]
+
+            if ngrams:
+                self.postings[col] = self._build_postings(self.values[col])
+
+    @staticmethod
+    def _build_postings(values: List[str], first_id: int = 0) -> Dict[str, np.ndarray]:
+        postings = {}
+        for i, value in enumerate(values, first_id):
+            for gram in {value[j:j + NGRAM_SIZE] for j in range(len(value) - NGRAM_SIZE + 1)}:
+                postings.setdefault(gram, []).append(i)
+        return {gram: np.array(ids) for gram, ids in postings.items()}
+
+    def update_rows(self, df: pd.DataFrame, ranges: List[Tuple[int, int]]) -> None:
+        """Re-index the rows of ``df`` in ``ranges`` (start, stop) after they changed
+
+        Codes are resized to the rows of ``df``; other rows keep theirs.
+        Values not seen before get new ids (and postings) after the existing ones.
+        """
+        for col in self.columns:
+            codes = np.full(len(df), -1, dtype=np.intp)
+            kept = min(len(df), len(self.codes[col]))
+            codes[:kept] = self.codes[col][:kept]
+
+            values = self.values[col]
+            ids = {value: i for i, value in reversed(list(enumerate(values)))}
+            added = []
+            for start, stop in ranges:
+                range_codes, uniques = pd.factorize(df[col].iloc[start:stop])
+                lookup = np.empty(len(uniques) + 1, dtype=np.intp)
+                lookup[-1] = -1
+                for i, value in enumerate(str(value).lower() for value in uniques):
+                    if value not in ids:
+                        ids[value] = len(values) + len(added)
+                        added.append(value)
+                    lookup[i] = ids[value]
+                codes[start:stop] = lookup[range_codes]
+
+            if added and self.ngrams:
+                postings = self.postings[col]
+                for gram, new_ids in self._build_postings(added, len(values)).items():
+                    postings[gram] = np.concatenate([postings[gram], new_ids]) if gram in postings else new_ids
+            values.extend(added)
+            self.codes[col] = codes
+
+    def memory_usage(self) -> int:
+        """Bytes held by the row codes, distinct values and n-gram postings"""
+        import sys
+
+        total = sum(codes.nbytes for codes in self.codes.values())
+        total += sum(sys.getsizeof(value) for values in self.values.values() for value in values)
+        for postings in self.postings.values():
+            total += sum(sys.getsizeof(gram) + ids.nbytes for gram, ids in postings.items())
+        return total
+
+    def _value_hits(self, col: str, pattern: str, regex: bool) -> np.ndarray:
+        """Boolean array over the column's distinct values"""
+        values = self.values[col]
+
+        if regex:
+            compiled = re.compile(pattern, re.IGNORECASE)
+            return np.fromiter((compiled.search(value) is not None for value in values),
+                               dtype=bool, count=len(values))
+
+        needle = pattern.lower()
+        if self.ngrams and len(needle) >= NGRAM_SIZE:
+            # Only values containing every n-gram of the needle can match
+            postings = self.postings[col]
+            candidates = None
+            for gram in {needle[j:j + NGRAM_SIZE] for j in range(len(needle) - NGRAM_SIZE + 1)}:
+                ids = postings.get(gram)
+                if ids is None:
+                    return np.zeros(len(values), dtype=bool)
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+
+            hits = np.zeros(len(values), dtype=bool)
+            for i in candidates:
+                hits[i] = needle in values[i]
+            return hits
+
+        return np.fromiter((needle in value for value in values), dtype=bool, count=len(values))
+
+    def column_mask(self, col: str, pattern: str, regex: bool = False) -> np.ndarray:
+        """Boolean row mask for rows whose value in ``col`` matches"""
+        # Code -1 (missing) picks up the trailing False
+        lookup = np.append(self._value_hits(col, pattern, regex), False)
+        return lookup[self.codes[col]]
+
+    def search(self, pattern: str, columns: Optional[List[str]] = None, regex: bool = False,
+               start: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Find rows where any of the columns contains ``pattern`` (case-insensitive)
+
+        Returns a page of matching row positions with the columns that matched.
+        """
+        try:
+            columns = resolve_columns(self.columns, columns)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        any_match = None
+        column_hits = {}
+        try:
+            for col in columns:
+                mask = self.column_mask(col, pattern, regex)
+                column_hits[col] = np.flatnonzero(mask)
+                any_match = mask if any_match is None else any_match | mask
+        except re.error as e:
+            return {"error": f"Invalid regular expression: {str(e)}"}
+
+        rows = np.flatnonzero(any_match) if any_match is not None else np.array([], dtype=np.int64)
+        page = rows[start:start + limit]
+
+        matched_columns = {int(row): [] for row in page}
+        for col in columns:
+            for row in page[np.isin(page, column_hits[col])]:
+                matched_columns[int(row)].append(col)
+
+        return {
+            "matches": [{"row": row, "columns": cols} for row, cols in matched_columns.items()],
+            "total_matches": int(rows.size),
+            "start": start,
+            "returned": int(page.size),
+            "searched_columns": columns
+        }
+
+
+def resolve_columns(available: List[str], requested: Optional[List[str]]) -> List[str]:
+    """Match requested column names case-insensitively; all columns if none requested"""
+    if not requested:
+        return list(available)
+
+    lookup = {col.upper(): col for col in available}
+    missing = [col for col in requested if col.upper() not in lookup]
+    if missing:
+        raise ValueError(f"Not a character column: {', '.join(missing)}")
+    return [lookup[col.upper()] for col in requested]
+
+
+def search_frame(df: pd.DataFrame, pattern: str, columns: Optional[List[str]] = None,
+                 regex: bool = False, start: int = 0, limit: int = 100) -> Dict[str, Any]:
+    """One-off search without keeping an index; only the searched columns are factorized"""
+    text_columns = [col for col in df.columns if is_text_column(df[col])]
+    try:
+        columns = resolve_columns(text_columns, columns)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    return SearchIndex(df, columns).search(pattern, None, regex, start, limit)
@@ -0,0 +1,383 @@
+"""
+Cross-process dataset cache: decoded DataFrames stored as memory-mapped Arrow files
+
+The first process to load a dataset writes its decoded columns to an Arrow
+IPC file in a per-user cache folder (under /dev/shm where available, so the
+pages live in shared memory). Another process opening the same file, by path,
+size and mtime, memory-maps that file instead of decoding the dataset again;
+numeric columns are used in place (read-only) and strings are not re-parsed.
+
+Sharing is opt-in (the reader service turns it on); one-shot commands
+decode privately and leave nothing behind. Each process holding an entry
+keeps a <entry>.<pid>.ref file, and an entry is deleted when its last
+reference is released or its process exits. References of processes that
+are no longer running are dropped whenever the cache is swept, along with
+unreferenced entries whose source file is gone or has changed and, oldest
+first, unreferenced entries beyond the budget, so a crashed process cannot
+leak entries.
+
+The cache folder must be a real directory owned by the user and private to
+them (mode 0700); otherwise the cache is not used. Entry metadata is stored
+as JSON, never unpickled.
+"""
+
+import sys
+import os
+import json
+import stat
+import atexit
+import hashlib
+import datetime
+import tempfile
+import importlib.util
+from collections import Counter
+from typing import Dict, Any, Optional, Tuple, Callable
+
+from json_output import dumps
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+DEFAULT_CACHE_BUDGET = 4 * 1024 ** 3
+
+ENTRY_SUFFIX = '.arrow'
+
+REF_SUFFIX = '.ref'
+
+TEMP_SUFFIX = '.tmp'
+
+# Schema metadata key holding the source file and the reader's metadata (JSON)
+META_KEY = b'dataset_lens.meta'
+
+# Entries this process holds, with how many readers use each
+_held = Counter()
+
+
+def cache_dir() -> Optional[str]:
+    """Per-user cache folder, created private to the user; None if it cannot be trusted"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'user')
+    path = os.path.join(base, f'dataset-lens-{user}')
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        return path if is_private_dir(path) else None
+    except OSError:
+        return None
+
+
+def is_private_dir(path: str) -> bool:
+    """True for a directory (not a symlink) owned by this user and closed to everyone else
+
+    The folder's name is predictable and its parent world-writable, so
+    another user could have created it first.
+    """
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    if not hasattr(os, 'getuid'):
+        # Windows: the temp folder is already per user
+        return True
+    return info.st_uid == os.getuid() and stat.S_IMODE(info.st_mode) == 0o700
+
+
+def encode_meta(value: Any) -> Any:
+    """JSON-ready form of reader metadata (plain values, datetimes and pyreadstat metadata)"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [encode_meta(item) for item in value]
+    if isinstance(value, tuple):
+        return {'__tuple__': [encode_meta(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith('__') for key in value):
+            return {key: encode_meta(item) for key, item in value.items()}
+        return {'__items__': [[encode_meta(key), encode_meta(item)] for key, item in value.items()]}
+    if isinstance(value, datetime.datetime):
+        return {'__datetime__': value.isoformat()}
+    if type(value).__name__ == 'metadata_container':
+        return {'__metadata__': encode_meta(vars(value))}
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    raise TypeError(f'Cannot store metadata of type {type(value).__name__}')
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    if '__tuple__' in obj:
+        return tuple(obj['__tuple__'])
+    if '__items__' in obj:
+        return {key: item for key, item in obj['__items__']}
+    if '__datetime__' in obj:
+        return datetime.datetime.fromisoformat(obj['__datetime__'])
+    if '__metadata__' in obj:
+        try:
+            from pyreadstat.pyclasses import metadata_container
+            meta = metadata_container()
+        except ImportError:
+            from types import SimpleNamespace
+            meta = SimpleNamespace()
+        vars(meta).update(obj['__metadata__'])
+        return meta
+    return obj
+
+
+def decode_meta(text: bytes) -> Any:
+    """Reader metadata stored by encode_meta"""
+    return json.loads(text, object_hook=_decode_object)
+
+
+def entry_key(file_path: str, variant: Any) -> str:
+    """Key of a dataset file as loaded with the given reader options"""
+    stat = os.stat(file_path)
+    identity = json.dumps([os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, variant], default=str)
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+def pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if sys.platform == 'win32':
+        import ctypes
+        # PROCESS_QUERY_LIMITED_INFORMATION; os.kill would terminate the process on Windows
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _ref_path(key: str, pid: Optional[int] = None) -> str:
+    return os.path.join(cache_dir(), f'{key}.{pid or os.getpid()}{REF_SUFFIX}')
+
+
+def acquire(key: str) -> None:
+    if _held[key] == 0:
+        open(_ref_path(key), 'w').close()
+    _held[key] += 1
+
+
+def release(key: str) -> None:
+    """Drop one use of an entry; the reference file goes with the last one, and the entry if no one else holds it"""
+    if _held[key] == 0:
+        return
+    _held[key] -= 1
+    if _held[key] == 0:
+        del _held[key]
+        _remove_ref(key)
+        _remove_if_unreferenced(key)
+
+
+def _remove_ref(key: str) -> None:
+    try:
+        os.remove(_ref_path(key))
+    except OSError:
+        pass
+
+
+def _remove_if_unreferenced(key: str) -> None:
+    folder = cache_dir()
+    if folder is None:
+        return
+    prefix = key + '.'
+    for name in os.listdir(folder):
+        if name.startswith(prefix) and name.endswith(REF_SUFFIX):
+            try:
+                if pid_alive(int(name.rsplit('.', 2)[1])):
+                    return
+            except ValueError:
+                continue
+    try:
+        # On Windows a file mapped by another process cannot be deleted yet
+        os.remove(os.path.join(folder, key + ENTRY_SUFFIX))
+    except OSError:
+        pass
+
+
+@atexit.register
+def release_all() -> None:
+    for key in list(_held):
+        del _held[key]
+        _remove_ref(key)
+        _remove_if_unreferenced(key)
+
+
+def write_entry(key: str, df, meta: Any, file_path: str) -> None:
+    """Store a DataFrame and its metadata as an Arrow IPC file
+
+    Floats are stored with NaN as a value rather than as null, so they
+    come back as plain (zero-copy) numpy arrays. The source file's path,
+    size and mtime are kept so that sweep can drop stale entries.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, col in enumerate(df.columns):
+        if isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind == 'f':
+            table = table.set_column(i, table.schema.field(i), pa.array(df[col].to_numpy(), from_pandas=False))
+    source = os.stat(file_path)
+    stored = {'source': os.path.abspath(file_path), 'size': source.st_size, 'mtime_ns': source.st_mtime_ns,
+              'meta': encode_meta(meta)}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           META_KEY: json.dumps(stored).encode('utf-8')})
+
+    path = os.path.join(cache_dir(), key + ENTRY_SUFFIX)
+    temp_path = f'{path}.{os.getpid()}{TEMP_SUFFIX}'
+    try:
+        with pa.OSFile(temp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def attach_entry(key: str) -> Optional[Tuple[Any, Any]]:
+    """(df, meta) from a stored entry, memory-mapped, or None if there is none"""
+    import pyarrow as pa
+
+    path = os.path.join(cache_dir(), key + ENTRY_SUFFIX)
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        os.utime(path)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    meta = decode_meta(table.schema.metadata[META_KEY])['meta']
+    return table.to_pandas(split_blocks=True), meta
+
+
+def entry_source(path: str) -> Optional[Dict[str, Any]]:
+    """Source file, size and mtime recorded in an entry (read from its schema only)"""
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    stored = json.loads(metadata[META_KEY]) if META_KEY in metadata else None
+    return stored if isinstance(stored, dict) and 'source' in stored else None
+
+
+def is_stale(path: str) -> bool:
+    """True for an entry whose source file is gone or has changed, so it can never be attached again"""
+    try:
+        stored = entry_source(path)
+    except Exception:
+        return True
+    if stored is None:
+        return True
+    try:
+        source = os.stat(stored['source'])
+    except OSError:
+        return True
+    return (source.st_size, source.st_mtime_ns) != (stored['size'], stored['mtime_ns'])
+
+
+def shared_frame(file_path: str, variant: Any, loader: Callable[[], Tuple[Any, Any]],
+                 share: bool = True) -> Tuple[Any, Any, Optional[str]]:
+    """(df, meta, key) for a dataset, attached from the cache or loaded and stored
+
+    ``loader`` decodes the file and returns (df, meta); ``variant`` tells
+    apart loads of the same file with different options. Without ``share``
+    the loader's result is returned as is. Caching is best effort: if the
+    cache cannot be used, the loader's result is returned as is too. The
+    caller releases ``key`` when it drops the DataFrame.
+    """
+    if not share or not HAS_PYARROW or cache_dir() is None:
+        df, meta = loader()
+        return df, meta, None
+
+    key = entry_key(file_path, variant)
+    try:
+        attached = attach_entry(key)
+    except Exception:
+        attached = None
+    if attached is not None:
+        acquire(key)
+        return attached[0], attached[1], key
+
+    df, meta = loader()
+    try:
+        write_entry(key, df, meta, file_path)
+        acquire(key)
+        sweep()
+    except Exception:
+        release(key)
+        return df, meta, None
+    return df, meta, key
+
+
+def sweep(budget: int = DEFAULT_CACHE_BUDGET) -> Dict[str, int]:
+    """Drop references of dead processes, unreferenced stale entries, then unreferenced entries until within budget"""
+    folder = cache_dir()
+    if folder is None:
+        return {'entries': 0, 'bytes': 0, 'removed_entries': 0, 'removed_references': 0}
+    entries = {}
+    referenced = set()
+    removed_refs = 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if name.endswith(ENTRY_SUFFIX):
+                stat = os.stat(path)
+                entries[name[:-len(ENTRY_SUFFIX)]] = (stat.st_mtime, stat.st_size)
+            elif name.endswith(REF_SUFFIX) or name.endswith(TEMP_SUFFIX):
+                # <key>.<pid>.ref, or <key>.arrow.<pid>.tmp left by an interrupted write
+                key, pid = name.rsplit('.', 2)[:2]
+                if pid_alive(int(pid)):
+                    referenced.add(key.split('.')[0])
+                else:
+                    os.remove(path)
+                    removed_refs += 1
+        except (OSError, ValueError):
+            continue
+
+    total = sum(size for _, size in entries.values())
+    removed = 0
+    for key, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+        if key in referenced:
+            continue
+        if total <= budget and not is_stale(os.path.join(folder, key + ENTRY_SUFFIX)):
+            continue
+        try:
+            # On Windows a file mapped by another process cannot be deleted yet
+            os.remove(os.path.join(folder, key + ENTRY_SUFFIX))
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+
+    return {'entries': len(entries) - removed, 'bytes': total,
+            'removed_entries': removed, 'removed_references': removed_refs}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stats', 'sweep', 'clear'):
+        print(dumps({'error': 'Usage: shared_cache.py <stats|sweep|clear>'}))
+        sys.exit(1)
+
+    try:
+        command = sys.argv[1]
+        if command == 'clear':
+            result = sweep(budget=0)
+        elif command == 'sweep':
+            result = sweep()
+        else:
+            result = sweep(budget=sys.maxsize)
+        result['cache_dir'] = cache_dir()
+        if result['cache_dir'] is None:
+            result['error'] = 'Cache folder is not private to this user; the shared cache is disabled'
+        print(dumps(result))
+    except Exception as e:
+        print(dumps({'error': str(e)}))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
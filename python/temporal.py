@@ -0,0 +1,269 @@
+"""
+Vectorized rendering of SAS date, time and datetime values
+
+Datasets are read with pyreadstat's datetime conversion disabled, so temporal
+variables stay as SAS numbers (days or seconds since 1960-01-01, seconds since
+midnight). The kind of each variable is detected once from its SAS format and
+a page column is rendered with NumPy datetime arithmetic in one pass:
+
+- date      -> 'YYYY-MM-DD'
+- datetime  -> 'YYYY-MM-DD HH:MM:SS' (or 'YYYY-MM-DD HH:MM:SS.fff')
+- time      -> 'HH:MM:SS' (or 'HH:MM:SS.fff')
+
+which matches what the readers produced for pyreadstat's converted values.
+Milliseconds are shown for variables whose format has decimals (E8601DT23.3,
+TIME12.2), so a value renders the same on every page; the unit is chosen
+once per variable by temporal_units.
+
+WHERE clauses compare those columns against quoted ISO literals
+('2024-01-01', '2024-01-01 08:30:00', '08:30'), alone or in IN lists, which
+translate_where_literals turns into the matching SAS numbers.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, time
+from functools import lru_cache
+from typing import Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# SAS format names (without width) by temporal kind
+DATE_FORMATS = {
+    'DATE', 'DAY', 'DDMMYY', 'DDMMYYB', 'DDMMYYC', 'DDMMYYD', 'DDMMYYN', 'DDMMYYP', 'DDMMYYS',
+    'DOWNAME', 'E8601DA', 'B8601DA', 'IS8601DA', 'EURDFDE', 'EURDFMY', 'JULDAY', 'JULIAN',
+    'MMDDYY', 'MMDDYYB', 'MMDDYYC', 'MMDDYYD', 'MMDDYYN', 'MMDDYYP', 'MMDDYYS', 'MMYY',
+    'MONNAME', 'MONTH', 'MONYY', 'NENGO', 'QTR', 'QTRR', 'WEEKDATE', 'WEEKDATX', 'WEEKDAY',
+    'WORDDATE', 'WORDDATX', 'YEAR', 'YYMM', 'YYMMDD', 'YYMMDDB', 'YYMMDDC', 'YYMMDDD',
+    'YYMMDDN', 'YYMMDDP', 'YYMMDDS', 'YYMON', 'YYQ', 'YYQR', 'MINGUO',
+}
+DATETIME_FORMATS = {
+    'DATETIME', 'DATEAMPM', 'DTDATE', 'DTMONYY', 'DTWKDATX', 'DTYEAR', 'DTYYQC',
+    'E8601DT', 'E8601DZ', 'B8601DT', 'B8601DZ', 'IS8601DT', 'IS8601DZ', 'MDYAMPM',
+}
+TIME_FORMATS = {
+    'TIME', 'TOD', 'HHMM', 'HOUR', 'MMSS', 'TIMEAMPM',
+    'E8601TM', 'E8601TZ', 'B8601TM', 'B8601TZ', 'IS8601TM', 'IS8601TZ',
+}
+
+# Width/decimals suffix of a format reference: DATE9. -> DATE
+FORMAT_SUFFIX = re.compile(r'\d*\.?\d*$')
+
+SECONDS_PER_DAY = 86400
+
+SAS_EPOCH = datetime(1960, 1, 1)
+
+# Comparison operators accepted in WHERE clauses, symbolic or SAS mnemonics
+_OPERATOR = r'(?:==|!=|<>|>=|<=|=|>|<|\b(?:EQ|NE|GT|LT|GE|LE)\b)'
+# A quoted literal, optionally with SAS's date/datetime/time suffix ('01JAN2024'd)
+_LITERAL = r'([\'"])([^\'"]*)\{}(?:(?:dt|d|t)(?!\w))?'
+_COLUMN_LITERAL = re.compile(r'\b([A-Za-z_]\w*)(\s*' + _OPERATOR + r'\s*)' + _LITERAL.format(3), re.IGNORECASE)
+_LITERAL_COLUMN = re.compile(_LITERAL.format(1) + r'(\s*' + _OPERATOR + r'\s*)([A-Za-z_]\w*)\b', re.IGNORECASE)
+_COLUMN_IN_LIST = re.compile(r'\b([A-Za-z_]\w*)(\s+(?:NOT\s+)?IN\s*)\(([^()]*)\)', re.IGNORECASE)
+_QUOTED = re.compile(_LITERAL.format(1), re.IGNORECASE)
+
+# Decimals of a format reference: E8601DT23.3 -> 3
+FORMAT_DECIMALS = re.compile(r'\.(\d+)$')
+
+
+@lru_cache(maxsize=None)
+def temporal_kind(format_ref: Optional[str]) -> Optional[str]:
+    """'date', 'datetime', 'time' or None for a SAS format such as 'DATE9.'"""
+    name = FORMAT_SUFFIX.sub('', (format_ref or '').strip()).upper()
+    if name in DATE_FORMATS:
+        return 'date'
+    if name in DATETIME_FORMATS:
+        return 'datetime'
+    if name in TIME_FORMATS:
+        return 'time'
+    return None
+
+
+def temporal_columns(formats: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """Temporal kind of every variable whose format is a date/time/datetime format"""
+    kinds = {}
+    for col, format_ref in formats.items():
+        kind = temporal_kind(format_ref)
+        if kind is not None:
+            kinds[col] = kind
+    return kinds
+
+
+@lru_cache(maxsize=None)
+def seconds_unit(format_ref: Optional[str]) -> str:
+    """'ms' for a datetime or time format with decimals (E8601DT23.3), else 's'"""
+    match = FORMAT_DECIMALS.search((format_ref or '').strip())
+    return 'ms' if match and int(match.group(1)) > 0 else 's'
+
+
+def temporal_units(formats: Dict[str, Optional[str]], kinds: Dict[str, str]) -> Dict[str, str]:
+    """Rendered unit ('s' or 'ms') of every datetime and time variable, from its SAS format"""
+    return {col: seconds_unit(formats.get(col)) for col, kind in kinds.items() if kind != 'date'}
+
+
+def _parse_datetime(text: str) -> datetime:
+    """ISO text, or SAS's DATE9./DATETIME form ('01JAN2024', '01JAN2024:08:30:00')"""
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    day, _, clock = text.partition(':')
+    parsed = datetime.strptime(day, '%d%b%Y')
+    if clock:
+        clock_time = time.fromisoformat(clock if len(clock.split(':')[0]) == 2 else '0' + clock)
+        parsed = datetime.combine(parsed.date(), clock_time)
+    return parsed
+
+
+def sas_number(text: str, kind: str) -> Optional[float]:
+    """SAS number for a date, datetime or time literal; None when it does not parse
+
+    Literals are ISO ('2024-01-01', '2024-01-01 08:30:00', '08:30') or in
+    SAS's own form ('01JAN2024', '01JAN2024:08:30:00'). Dates become days
+    since 1960-01-01, datetimes seconds since 1960-01-01 (a bare date
+    meaning midnight) and times seconds since midnight.
+    """
+    text = text.strip()
+    try:
+        if kind == 'date':
+            try:
+                day = date.fromisoformat(text)
+            except ValueError:
+                day = datetime.strptime(text, '%d%b%Y').date()
+            return float((day - SAS_EPOCH.date()).days)
+        if kind == 'datetime':
+            return (_parse_datetime(text) - SAS_EPOCH).total_seconds()
+        if kind == 'time':
+            value = time.fromisoformat(text)
+            return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+    except ValueError:
+        return None
+    return None
+
+
+def translate_where_literals(where_clause: str, kinds: Dict[str, str]) -> str:
+    """Replace quoted ISO literals compared with temporal columns by SAS numbers
+
+    ``kinds`` maps column names (matched case-insensitively) to their temporal
+    kind, so ``ADTM > '2024-01-01'`` on a date column becomes ``ADTM > 23376``,
+    and each literal of ``ADT in ('2024-01-01', '2024-01-02')`` is replaced.
+    Literals that do not parse, and those compared with other columns, are kept.
+    """
+    if not kinds or not where_clause:
+        return where_clause
+    upper_kinds = {col.upper(): kind for col, kind in kinds.items()}
+
+    def number(column: str, literal: str) -> Optional[str]:
+        kind = upper_kinds.get(column.upper())
+        value = sas_number(literal, kind) if kind is not None else None
+        if value is None:
+            return None
+        return str(int(value)) if value.is_integer() else repr(value)
+
+    def column_literal(match: re.Match) -> str:
+        value = number(match.group(1), match.group(4))
+        return match.group(0) if value is None else match.group(1) + match.group(2) + value
+
+    def literal_column(match: re.Match) -> str:
+        value = number(match.group(4), match.group(2))
+        return match.group(0) if value is None else value + match.group(3) + match.group(4)
+
+    def column_in_list(match: re.Match) -> str:
+        def literal(item: re.Match) -> str:
+            value = number(match.group(1), item.group(2))
+            return item.group(0) if value is None else value
+        return match.group(1) + match.group(2) + '(' + _QUOTED.sub(literal, match.group(3)) + ')'
+
+    where_clause = _COLUMN_IN_LIST.sub(column_in_list, where_clause)
+    where_clause = _COLUMN_LITERAL.sub(column_literal, where_clause)
+    return _LITERAL_COLUMN.sub(literal_column, where_clause)
+
+
+def _as_strings(stamps: np.ndarray, unit: str) -> np.ndarray:
+    import numpy as np
+    return np.datetime_as_string(stamps, unit=unit)
+
+
+def render_sas_values(values: np.ndarray, kind: str, unit: str = 's') -> np.ndarray:
+    """Render SAS numbers of one temporal kind; missing values become None
+
+    ``unit`` ('s' or 'ms', see temporal_units) is the precision of datetimes and times.
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), None, dtype=object)
+    present = np.isfinite(values)
+    if not present.any():
+        return out
+    raw = values[present]
+
+    if kind == 'date':
+        days = np.floor(raw).astype('int64').astype('timedelta64[D]')
+        out[present] = _as_strings(np.datetime64('1960-01-01', 'D') + days, 'D')
+        return out
+
+    if kind == 'time':
+        in_day = (raw >= 0) & (raw < SECONDS_PER_DAY)
+        scale = 1000 if unit == 'ms' else 1
+        ticks = np.floor(np.where(in_day, raw, 0) * scale).astype('int64').astype(f'timedelta64[{unit}]')
+        text = _as_strings(np.datetime64('1960-01-01T00:00:00', unit) + ticks, unit)
+        rendered = np.char.partition(text.astype(str), 'T')[:, 2].astype(object)
+        if not in_day.all():
+            # Durations beyond one day (e.g. 25:30:00) keep the hours count
+            for i in np.flatnonzero(~in_day):
+                total = int(raw[i])
+                sign = '-' if total < 0 else ''
+                hours, rest = divmod(abs(total), 3600)
+                rendered[i] = f"{sign}{hours:02d}:{rest // 60:02d}:{rest % 60:02d}"
+        out[present] = rendered
+        return out
+
+    # datetime: seconds since 1960
+    millis = np.round(raw * 1000).astype('int64')
+    stamps = np.datetime64('1960-01-01T00:00:00', 'ms') + millis.astype('timedelta64[ms]')
+    text = _as_strings(stamps, unit)
+    out[present] = np.char.replace(text.astype(str), 'T', ' ').astype(object)
+    return out
+
+
+def render_column(series: pd.Series, kind: Optional[str] = None, unit: str = 's') -> Optional[pd.Series]:
+    """Rendered strings for a page column, or None when it is not temporal
+
+    Numeric columns are rendered using ``kind`` and ``unit`` (from the SAS
+    format); datetime64 columns (e.g. from R files) are rendered directly.
+    """
+    import numpy as np
+    import pandas as pd
+
+    dtype = series.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        values = series.to_numpy(dtype='datetime64[ms]')
+        present = ~np.isnat(values)
+        out = np.full(len(values), None, dtype=object)
+        if present.any():
+            millis = values[present].astype('int64')
+            unit = 'ms' if (millis % 1000 != 0).any() else 's'
+            out[present] = np.char.replace(_as_strings(values[present], unit).astype(str), 'T', ' ').astype(object)
+        return pd.Series(out, index=series.index, name=series.name, dtype=object)
+
+    if kind is None or not pd.api.types.is_numeric_dtype(dtype):
+        return None
+
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    return pd.Series(render_sas_values(values, kind, unit), index=series.index, name=series.name, dtype=object)
+
+
+def render_frame(page_df: pd.DataFrame, kinds: Dict[str, str],
+                 units: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Page with every temporal column replaced by its rendered strings"""
+    units = units or {}
+    rendered = {}
+    for col in page_df.columns:
+        result = render_column(page_df[col], kinds.get(col), units.get(col, 's'))
+        if result is not None:
+            rendered[col] = result
+    return page_df.assign(**rendered) if rendered else page_df
@@ -0,0 +1,149 @@
+"""
+Character encoding of SAS datasets: detection, override and fallback
+
+pyreadstat decodes strings with the encoding recorded in a .sas7bdat header
+(XPORT files record none, so UTF-8 is assumed). Legacy Latin-1/WLATIN1 files
+often hold bytes that are not valid in that encoding and fail to load; an
+explicit ``encoding`` overrides the header, and without one a read that
+fails to decode is retried with the fallback encodings. The chunked engine
+settles its encoding on the header and the first chunk, so bytes that do not
+decode only further into the file still need the override.
+
+pyreadstat decodes a whole read in one encoding, so a fallback cannot mark
+the values it was needed for; after one, the values per column that do not
+decode strictly in the failed encoding are counted under "fallback_values".
+
+Byte strings (e.g. from pandas' XPORT reader when pyreadstat is missing) are
+decoded a column at a time, with undecodable bytes replaced by U+FFFD and
+counted, so mis-encoded data shows up in the metadata instead of vanishing.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Any, Optional, Tuple, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tried in order when the header (or default) encoding cannot decode the file.
+# WINDOWS-1252 is SAS's WLATIN1; ISO-8859-1 maps every byte, so it always succeeds.
+FALLBACK_ENCODINGS = ('WINDOWS-1252', 'ISO-8859-1')
+
+DEFAULT_ENCODING = 'utf-8'
+
+REPLACEMENT_CHARACTER = '\ufffd'
+
+
+def encoding_kwargs(encoding: Optional[str]) -> Dict[str, str]:
+    """pyreadstat keyword arguments for an encoding (none to use the header's)"""
+    return {'encoding': encoding} if encoding else {}
+
+
+def is_encoding_error(error: Exception) -> bool:
+    """True for the errors pyreadstat raises when strings do not decode"""
+    return isinstance(error, UnicodeError) or 'encoding' in str(error).lower()
+
+
+def read_with_fallback(read: Callable[[Optional[str]], Any], encoding: Optional[str] = None,
+                       override: bool = False) -> Tuple[Any, Optional[str], bool]:
+    """(result, encoding used, whether a fallback was needed) of ``read(encoding)``
+
+    With ``override`` errors are raised as they are; otherwise a decoding
+    failure is retried with each of FALLBACK_ENCODINGS in turn.
+    """
+    candidates = [encoding]
+    if not override:
+        candidates += [fallback for fallback in FALLBACK_ENCODINGS if fallback != encoding]
+    for i, candidate in enumerate(candidates):
+        try:
+            return read(candidate), candidate, i > 0
+        except Exception as e:
+            if i == len(candidates) - 1 or not is_encoding_error(e):
+                raise
+
+
+def encoding_info(detected: Optional[str], used: Optional[str], fallback: bool = False,
+                  override: bool = False) -> Dict[str, Any]:
+    """The metadata's "encoding" entry"""
+    return {
+        'detected': detected,
+        'used': used or detected or DEFAULT_ENCODING,
+        'override': override,
+        'fallback': fallback,
+        'fallback_values': {},
+        'replacements': {}
+    }
+
+
+def fallback_values(df: pd.DataFrame, failed: str, used: str) -> Dict[str, int]:
+    """Values per character column of ``df`` (read in ``used``) that do not decode in ``failed``
+
+    Only distinct non-ASCII values are checked, as ASCII decodes the same in
+    every supported encoding.
+    """
+    import codecs
+    from compact import is_text_column
+
+    try:
+        codecs.lookup(failed)
+    except LookupError:
+        return {}
+
+    counts = {}
+    for col in df.columns:
+        series = df[col]
+        if not is_text_column(series):
+            continue
+        failing = []
+        for value in series.dropna().unique():
+            if isinstance(value, str) and not value.isascii():
+                try:
+                    value.encode(used, errors='replace').decode(failed)
+                except UnicodeError:
+                    failing.append(value)
+        if failing:
+            counts[col] = int(series.isin(failing).sum())
+    return counts
+
+
+def note_fallback_values(info: Dict[str, Any], df: pd.DataFrame) -> Dict[str, Any]:
+    """Fill ``info["fallback_values"]`` from ``df`` when its read needed a fallback encoding"""
+    if info['fallback'] and not info['override']:
+        info['fallback_values'] = fallback_values(df, info['detected'] or DEFAULT_ENCODING, info['used'])
+    return info
+
+
+def decode_column(series: pd.Series, encoding: str) -> Tuple[pd.Series, int]:
+    """(decoded series, characters replaced) for a column of byte strings"""
+    decoded = series.str.decode(encoding, errors='replace')
+    return decoded, int(decoded.str.count(REPLACEMENT_CHARACTER).sum())
+
+
+def is_bytes_column(series: pd.Series) -> bool:
+    """True for an object column whose values are byte strings (judged by the first non-missing one)"""
+    if series.dtype != object:
+        return False
+    present = series.notna().to_numpy()
+    return bool(present.any()) and isinstance(series.iloc[int(present.argmax())], bytes)
+
+
+def decode_frame(df: pd.DataFrame, encoding: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, int], str]:
+    """(frame with byte-string columns decoded, characters replaced per column, encoding used)
+
+    Without an ``encoding`` UTF-8 is tried first; if any column does not
+    decode cleanly, all of them are decoded with the first fallback encoding.
+    """
+    columns = [col for col in df.columns if is_bytes_column(df[col])]
+    used = encoding or DEFAULT_ENCODING
+    if not columns:
+        return df, {}, used
+
+    decoded = {col: decode_column(df[col], used) for col in columns}
+    if not encoding and any(replaced for _, replaced in decoded.values()):
+        used = FALLBACK_ENCODINGS[0]
+        decoded = {col: decode_column(df[col], used) for col in columns}
+
+    df = df.copy(deep=False)
+    for col, (values, _) in decoded.items():
+        df[col] = values
+    return df, {col: replaced for col, (_, replaced) in decoded.items() if replaced}, used
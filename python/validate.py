@@ -0,0 +1,258 @@
+"""
+Submission-readiness checks for a folder of .xpt and .sas7bdat datasets
+
+Each file is checked in a worker process with one chunked pass over its
+data. Column checks (value lengths, non-ASCII characters, missing values)
+are vectorised per chunk; name, label, length and size limits come from
+the header. The report lists issues per file with a rule id, a severity
+and the variable concerned.
+"""
+
+import sys
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from json_output import dumps
+
+VALIDATE_EXTENSIONS = ('.xpt', '.sas7bdat')
+
+VALIDATE_CHUNK_SIZE = 100000
+
+# SAS transport (XPORT) version 5 limits
+MAX_NAME_LENGTH = 8
+MAX_LABEL_LENGTH = 40
+MAX_CHARACTER_LENGTH = 200
+
+# Datasets larger than this must be split for submission
+MAX_DATASET_BYTES = 5 * 1024 ** 3
+
+NAME_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+
+NON_ASCII = r'[^\x00-\x7f]'
+
+V5_LIBRARY_HEADER = b'HEADER RECORD*******LIBRARY HEADER RECORD!!!!!!!'
+
+
+def issue(rule: str, severity: str, message: str, variable: Optional[str] = None,
+          count: Optional[int] = None) -> Dict[str, Any]:
+    entry = {'rule': rule, 'severity': severity, 'message': message}
+    if variable is not None:
+        entry['variable'] = variable
+    if count is not None:
+        entry['count'] = count
+    return entry
+
+
+def is_ascii(text: str) -> bool:
+    return not re.search(NON_ASCII, text or '')
+
+
+def header_issues(file_path: str, meta) -> List[Dict[str, Any]]:
+    """Checks on the file, dataset and variable attributes"""
+    issues = []
+    ext = Path(file_path).suffix.lower()
+    size = os.path.getsize(file_path)
+
+    if ext == '.xpt':
+        with open(file_path, 'rb') as f:
+            if not f.read(len(V5_LIBRARY_HEADER)) == V5_LIBRARY_HEADER:
+                issues.append(issue('xpt_version', 'error', 'File is not SAS transport version 5'))
+    else:
+        issues.append(issue('file_format', 'error', 'Submission datasets must be SAS transport (.xpt) files'))
+
+    if size > MAX_DATASET_BYTES:
+        issues.append(issue('dataset_size', 'error',
+                            f'File is {size / 1024 ** 3:.1f} GB; datasets over '
+                            f'{MAX_DATASET_BYTES // 1024 ** 3} GB must be split'))
+
+    name = (getattr(meta, 'table_name', None) or '').strip()
+    stem = Path(file_path).stem
+    if ext == '.xpt' and name and name.lower() != stem.lower():
+        issues.append(issue('dataset_name_mismatch', 'error',
+                            f"Dataset name '{name}' does not match the file name '{stem}'"))
+    if len(stem) > MAX_NAME_LENGTH or not NAME_PATTERN.match(stem):
+        issues.append(issue('dataset_name', 'error',
+                            f"Dataset name '{stem}' must be at most {MAX_NAME_LENGTH} letters, digits "
+                            f"or underscores, starting with a letter"))
+
+    label = getattr(meta, 'file_label', None) or ''
+    if not label.strip():
+        issues.append(issue('dataset_label_missing', 'warning', 'Dataset has no label'))
+    elif len(label) > MAX_LABEL_LENGTH:
+        issues.append(issue('dataset_label_length', 'error',
+                            f'Dataset label is {len(label)} characters (limit {MAX_LABEL_LENGTH})'))
+    if not is_ascii(label):
+        issues.append(issue('dataset_label_ascii', 'error', 'Dataset label contains non-ASCII characters'))
+
+    labels = meta.column_names_to_labels or {}
+    types = meta.readstat_variable_types or {}
+    widths = meta.variable_storage_width or {}
+    for col in meta.column_names:
+        if len(col) > MAX_NAME_LENGTH or not NAME_PATTERN.match(col):
+            issues.append(issue('variable_name', 'error',
+                                f'Name must be at most {MAX_NAME_LENGTH} letters, digits or underscores, '
+                                f'starting with a letter', col))
+        label = labels.get(col) or ''
+        if not label.strip():
+            issues.append(issue('variable_label_missing', 'warning', 'Variable has no label', col))
+        elif len(label) > MAX_LABEL_LENGTH:
+            issues.append(issue('variable_label_length', 'error',
+                                f'Label is {len(label)} characters (limit {MAX_LABEL_LENGTH})', col))
+        if not is_ascii(label):
+            issues.append(issue('variable_label_ascii', 'error', 'Label contains non-ASCII characters', col))
+        if types.get(col) == 'string' and (widths.get(col) or 0) > MAX_CHARACTER_LENGTH:
+            issues.append(issue('variable_length', 'error',
+                                f'Length {widths[col]} exceeds {MAX_CHARACTER_LENGTH}', col))
+    return issues
+
+
+class ColumnStats:
+    """Per-column statistics accumulated over chunks"""
+
+    def __init__(self, columns: List[str], character: List[str]):
+        import numpy as np
+
+        self.columns = columns
+        self.character = character
+        self.present = np.zeros(len(columns), dtype=bool)
+        self.max_bytes = {col: 0 for col in character}
+        self.non_ascii = {col: 0 for col in character}
+
+    def add(self, chunk) -> None:
+        import numpy as np
+
+        present = chunk[self.columns].notna().to_numpy().any(axis=0)
+        for i, col in enumerate(self.columns):
+            if col not in self.max_bytes:
+                continue
+            values = chunk[col]
+            lengths = values.str.len()
+            # Character missing values are read as empty strings
+            present[i] = bool((lengths > 0).any())
+            non_ascii = values.str.contains(NON_ASCII, regex=True, na=False)
+            count = int(non_ascii.sum())
+            if count:
+                self.non_ascii[col] += count
+                # Only non-ASCII values need encoding to count their bytes
+                lengths = lengths.where(~non_ascii, values[non_ascii].str.encode('utf-8').str.len())
+            longest = lengths.max()
+            if longest == longest:
+                self.max_bytes[col] = max(self.max_bytes[col], int(longest))
+        np.logical_or(self.present, present, out=self.present)
+
+
+def data_issues(stats: ColumnStats, meta) -> List[Dict[str, Any]]:
+    """Checks on the values read"""
+    issues = []
+    widths = meta.variable_storage_width or {}
+    for col, present in zip(stats.columns, stats.present):
+        if not present:
+            issues.append(issue('all_missing', 'warning', 'All values are missing', col))
+    for col in stats.character:
+        declared = widths.get(col) or 0
+        longest = stats.max_bytes[col]
+        if declared and longest > declared:
+            issues.append(issue('value_exceeds_length', 'error',
+                                f'Longest value is {longest} bytes; declared length is {declared}', col))
+        elif declared and 0 < longest < declared:
+            issues.append(issue('length_not_minimal', 'warning',
+                                f'Declared length {declared} exceeds the longest value ({longest} bytes)', col))
+        if stats.non_ascii[col]:
+            issues.append(issue('non_ascii_values', 'error', 'Values contain non-ASCII characters', col,
+                                stats.non_ascii[col]))
+    return issues
+
+
+def validate_file(file_path: str) -> Dict[str, Any]:
+    """Report for one dataset; runs in a worker process"""
+    import pyreadstat
+
+    result = {'file_path': file_path, 'size': os.path.getsize(file_path)}
+    read_function = pyreadstat.read_sas7bdat if file_path.lower().endswith('.sas7bdat') else pyreadstat.read_xport
+    try:
+        stats = None
+        rows = 0
+        meta = None
+        for chunk, meta in pyreadstat.read_file_in_chunks(read_function, file_path, chunksize=VALIDATE_CHUNK_SIZE,
+                                                          disable_datetime_conversion=True):
+            if stats is None:
+                types = meta.readstat_variable_types or {}
+                stats = ColumnStats(list(chunk.columns), [col for col in chunk.columns if types.get(col) == 'string'])
+            stats.add(chunk)
+            rows += len(chunk)
+        if meta is None:
+            _, meta = read_function(file_path, metadataonly=True)
+    except Exception as e:
+        result['error'] = f'Failed to read dataset: {str(e)}'
+        result['issues'] = []
+        return result
+
+    issues = header_issues(file_path, meta)
+    if stats is not None:
+        issues += data_issues(stats, meta)
+    result.update({
+        'dataset': (getattr(meta, 'table_name', None) or Path(file_path).stem).strip(),
+        'rows': rows,
+        'variables': len(meta.column_names),
+        'errors': sum(1 for entry in issues if entry['severity'] == 'error'),
+        'warnings': sum(1 for entry in issues if entry['severity'] == 'warning'),
+        'issues': issues
+    })
+    return result
+
+
+def find_files(path: str) -> List[str]:
+    """The dataset itself, or every .xpt/.sas7bdat below a folder"""
+    if os.path.isfile(path):
+        return [path]
+    found = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        found.extend(os.path.join(root, name) for name in files
+                     if Path(name).suffix.lower() in VALIDATE_EXTENSIONS)
+    return sorted(found)
+
+
+def validate(path: str, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Validate one dataset or all datasets in a folder, largest files first"""
+    if not os.path.exists(path):
+        return {'error': f'Path not found: {path}'}
+
+    # Largest first, so one big file does not start last and hold up the pool
+    paths = sorted(find_files(path), key=os.path.getsize, reverse=True)
+    if len(paths) > 1:
+        workers = workers or min(len(paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(validate_file, paths))
+    else:
+        results = [validate_file(p) for p in paths]
+    results.sort(key=lambda entry: entry['file_path'])
+
+    return {
+        'path': path,
+        'files': len(results),
+        'errors': sum(entry.get('errors', 0) for entry in results),
+        'warnings': sum(entry.get('warnings', 0) for entry in results),
+        'unreadable': [entry['file_path'] for entry in results if 'error' in entry],
+        'datasets': results
+    }
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != 'validate':
+        print(dumps({'error': 'Usage: validate.py validate <folder|file> [workers]'}))
+        sys.exit(1)
+
+    try:
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else None
+        print(dumps(validate(sys.argv[2], workers)))
+    except Exception as e:
+        print(dumps({'error': str(e)}))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,92 +3,313 @@ Python script for reading SAS XPT (XPORT) files
 Supports all XPORT versions including V8
 """
 
+import os
 import sys
-import json
+import importlib.util
 from pathlib import Path
-import pandas as pd
 
-try:
+from json_output import dumps
+
+# pyreadstat and pandas (and the helper modules built on it) are imported only
+# by the code paths that need them, so usage errors and metadata start quickly
+HAS_PYREADSTAT = importlib.util.find_spec('pyreadstat') is not None
+
+
+def read_xpt(file_path, columns=None, encoding=None):
+    """Read an XPT file, returning (df, meta, encoding_info); meta is None without pyreadstat
+
+    ``columns`` limits the read to those variables (pyreadstat only).
+    ``encoding`` overrides the default UTF-8; without it strings that do not
+    decode are read with a fallback encoding (see text_encoding).
+    """
+    from text_encoding import (DEFAULT_ENCODING, decode_frame, encoding_info, encoding_kwargs,
+                               note_fallback_values, read_with_fallback)
+
+    if HAS_PYREADSTAT:
+        import pyreadstat
+        kwargs = {'usecols': columns} if columns else {}
+        # Temporal variables stay SAS numbers; pages render them per column
+        (df, meta), used, fallback = read_with_fallback(
+            lambda enc: pyreadstat.read_xport(file_path, disable_datetime_conversion=True,
+                                              **encoding_kwargs(enc), **kwargs),
+            encoding, bool(encoding))
+        return df, meta, note_fallback_values(encoding_info(None, used, fallback, bool(encoding)), df)
+
+    # pandas leaves character values as bytes; decode them a column at a time
+    import pandas as pd
+    df, replacements, used = decode_frame(pd.read_sas(file_path, format='xport'), encoding)
+    info = encoding_info(None, used, used != (encoding or DEFAULT_ENCODING), bool(encoding))
+    info['replacements'] = replacements
+    return df, None, info
+
+
+def read_xpt_engine(file_path, columns=None, engine='auto', encoding=None):
+    """Read an XPT file with the engine chosen from its estimated footprint
+
+    XPORT headers carry no row count, but records are fixed width, so rows
+    are estimated from the file size. Pages are served from memory, so there
+    is no chunked engine: a file too large even for columnar (compact,
+    batch-by-batch) loading is refused unless an engine is requested explicitly.
+    Returns (df, meta, engine_info, memory_report, encoding_info); engine_info
+    and memory_report are None without pyreadstat or for an in-memory load.
+    """
+    if not HAS_PYREADSTAT:
+        df, meta, read_info = read_xpt(file_path, encoding=encoding)
+        return df, meta, None, None, read_info
+
     import pyreadstat
-    HAS_PYREADSTAT = True
-except ImportError:
-    HAS_PYREADSTAT = False
+    from engine import MEMORY_FRACTION, choose_engine, load_columnar
+    from text_encoding import encoding_info, encoding_kwargs, note_fallback_values, read_with_fallback
+
+    (_, header), used, fallback = read_with_fallback(
+        lambda enc: pyreadstat.read_xport(file_path, metadataonly=True, **encoding_kwargs(enc)),
+        encoding, bool(encoding))
+    widths = header.variable_storage_width or {}
+    record_length = sum(widths.get(col) or 8 for col in header.column_names) or 1
+    info = choose_engine(header, os.path.getsize(file_path) // record_length, engine, columns)
+    if info['name'] == 'chunked':
+        if engine == 'chunked':
+            raise ValueError("The chunked engine is not available for XPT files; use memory or columnar")
+        budget = int(info['available_bytes'] * MEMORY_FRACTION)
+        raise ValueError(
+            f"XPT file needs about {info['estimated_bytes']['columnar'] // 1024 ** 2} MB even in compact form, "
+            f"more than its {budget // 1024 ** 2} MB share of available memory. Select fewer variables, "
+            f"or open it with --engine columnar to load it anyway")
+
+    if info['name'] == 'columnar':
+        (df, _, report), used, data_fallback = read_with_fallback(
+            lambda enc: load_columnar(pyreadstat.read_xport, file_path, columns or header.column_names,
+                                      disable_datetime_conversion=True, **encoding_kwargs(enc)),
+            used, bool(encoding))
+        read_info = encoding_info(None, used, fallback or data_fallback, bool(encoding))
+        return df, header, info, report, note_fallback_values(read_info, df)
+
+    df, meta, read_info = read_xpt(file_path, columns, used or encoding)
+    read_info['override'] = bool(encoding)
+    if fallback and not read_info['fallback']:
+        read_info['fallback'] = True
+        note_fallback_values(read_info, df)
+    return df, meta, info, None, read_info
+
+
+def read_xpt_header(file_path, encoding=None):
+    """Read XPT metadata and row count without building a DataFrame
+
+    XPORT headers carry no row count, so a single column is decoded to count
+    rows. Returns (meta, row_count, encoding_info), or None when pyreadstat is
+    missing or too old to skip pandas (output_format was added in 1.3).
+    """
+    if not HAS_PYREADSTAT:
+        return None
 
+    import pyreadstat
+    from text_encoding import encoding_info, encoding_kwargs, read_with_fallback
+
+    def read(enc):
+        _, meta = pyreadstat.read_xport(file_path, metadataonly=True, output_format='dict',
+                                        **encoding_kwargs(enc))
+        if not meta.column_names:
+            return meta, 0
+        first = meta.column_names[0]
+        data, _ = pyreadstat.read_xport(file_path, usecols=[first], output_format='dict',
+                                        **encoding_kwargs(enc))
+        return meta, len(data[first])
 
-def get_metadata(file_path):
-    """Get metadata from XPT file including row count"""
     try:
-        if HAS_PYREADSTAT:
-            # Read the full file to get accurate row count and metadata
-            # XPT files are typically small (FDA submissions), so this is acceptable
-            df, meta = pyreadstat.read_xport(file_path)
-
-            # Get variable information with proper labels
-            variables = []
-
-            # Use column_names from meta if available, otherwise from df
-            column_names = meta.column_names if hasattr(meta, 'column_names') else df.columns.tolist()
-
-            for i, col in enumerate(column_names):
-                # Determine type from metadata or df
-                var_type = 'numeric'  # Default to numeric
-                if hasattr(meta, 'readstat_variable_types') and col in meta.readstat_variable_types:
-                    var_type = 'character' if meta.readstat_variable_types[col] == 'string' else 'numeric'
-                elif hasattr(meta, 'original_variable_types') and col in meta.original_variable_types:
-                    # Some versions use original_variable_types
-                    var_type = meta.original_variable_types[col]
-                elif df is not None and col in df.columns:
-                    dtype = str(df[col].dtype)
-                    var_type = 'character' if dtype == 'object' else 'numeric'
-
-                # Get label from metadata if available
-                label = meta.column_labels[i] if meta.column_labels and i < len(meta.column_labels) else col
-
-                variables.append({
-                    'name': col,
-                    'type': var_type,
-                    'label': label,
-                    'format': '',
-                    'length': 8 if var_type == 'numeric' else 200,
-                    'dtype': 'object' if var_type == 'character' else 'float64'
-                })
-
-            # Get actual row count from the loaded dataframe
-            row_count = len(df) if df is not None else 0
+        (meta, row_count), used, fallback = read_with_fallback(read, encoding, bool(encoding))
+    except TypeError:
+        return None
+
+    return meta, row_count, encoding_info(None, used, fallback, bool(encoding))
+
+
+def temporal_formats(meta):
+    """Temporal kind of each date/time/datetime variable, from its SAS format"""
+    from temporal import temporal_columns
+    return temporal_columns(getattr(meta, 'original_variable_types', None) or {})
+
+
+def temporal_units(meta, kinds):
+    """Rendered unit of each datetime/time variable in ``kinds``, from its SAS format"""
+    from temporal import temporal_units as units_from_formats
+    return units_from_formats(getattr(meta, 'original_variable_types', None) or {}, kinds)
 
-            metadata = {
-                'total_rows': row_count,
-                'total_variables': len(variables),
-                'variables': variables,
-                'file_path': file_path,
-                'dataset_label': meta.table_name if hasattr(meta, 'table_name') and meta.table_name else Path(file_path).stem
-            }
-        else:
-            # Fallback: pandas doesn't have metadata-only mode, so we have to read the file
-            # But we can at least read it just once
-            df = pd.read_sas(file_path, format='xport')
 
-            variables = []
-            for col in df.columns:
+def build_metadata(file_path, df, meta, row_count=None, var_offset=0, var_limit=None):
+    """Build the metadata response for an XPT file that has been read
+
+    ``df`` may be None when ``meta`` and ``row_count`` come from read_xpt_header.
+    ``var_offset``/``var_limit`` return a window of the variable list only.
+    """
+    from reader_common import column_window, text_dtype, window_info
+
+    windowed = bool(var_offset) or var_limit is not None
+
+    if meta is not None:
+        # Get variable information with proper labels
+        variables = []
+
+        # Use column_names from meta if available, otherwise from df
+        column_names = meta.column_names if hasattr(meta, 'column_names') else df.columns.tolist()
+        formats = getattr(meta, 'original_variable_types', None) or {}
+        widths = getattr(meta, 'variable_storage_width', None) or {}
+        visible = set(column_window(list(column_names), var_offset, var_limit))
+
+        for i, col in enumerate(column_names):
+            if col not in visible:
+                continue
+            # Determine type from metadata or df
+            var_type = 'numeric'  # Default to numeric
+            if hasattr(meta, 'readstat_variable_types') and col in meta.readstat_variable_types:
+                var_type = 'character' if meta.readstat_variable_types[col] == 'string' else 'numeric'
+            elif hasattr(meta, 'original_variable_types') and col in meta.original_variable_types:
+                # Some versions use original_variable_types
+                var_type = meta.original_variable_types[col]
+            elif df is not None and col in df.columns:
                 dtype = str(df[col].dtype)
                 var_type = 'character' if dtype == 'object' else 'numeric'
 
-                variables.append({
-                    'name': col,
-                    'type': var_type,
-                    'label': col,
-                    'format': '',
-                    'length': 8 if var_type == 'numeric' else 200,
-                    'dtype': dtype
-                })
-
-            metadata = {
-                'total_rows': len(df),
-                'total_variables': len(df.columns),
-                'variables': variables,
-                'file_path': file_path,
-                'dataset_label': Path(file_path).stem
-            }
+            # Get label from metadata if available
+            label = meta.column_labels[i] if meta.column_labels and i < len(meta.column_labels) else col
+
+            variables.append({
+                'name': col,
+                'type': var_type,
+                'label': label,
+                'format': formats.get(col) or '',
+                'length': widths.get(col) or (8 if var_type == 'numeric' else 200),
+                'dtype': text_dtype() if var_type == 'character' else 'float64'
+            })
+
+        # Get actual row count from the loaded dataframe
+        if row_count is None:
+            row_count = len(df) if df is not None else 0
+
+        metadata = {
+            'total_rows': row_count,
+            'total_variables': len(column_names),
+            'variables': variables,
+            'file_path': file_path,
+            'dataset_label': meta.table_name if hasattr(meta, 'table_name') and meta.table_name else Path(file_path).stem
+        }
+        if windowed:
+            metadata.update(window_info(len(column_names), var_offset, len(variables)))
+        return metadata
+
+    # Fallback: pandas doesn't have metadata-only mode, so we have to read the file
+    # But we can at least read it just once
+    variables = []
+    for col in column_window(list(df.columns), var_offset, var_limit):
+        dtype = str(df[col].dtype)
+        var_type = 'character' if dtype == 'object' else 'numeric'
+
+        variables.append({
+            'name': col,
+            'type': var_type,
+            'label': col,
+            'format': '',
+            'length': 8 if var_type == 'numeric' else 200,
+            'dtype': dtype
+        })
+
+    metadata = {
+        'total_rows': len(df),
+        'total_variables': len(df.columns),
+        'variables': variables,
+        'file_path': file_path,
+        'dataset_label': Path(file_path).stem
+    }
+    if windowed:
+        metadata.update(window_info(len(df.columns), var_offset, len(variables)))
+    return metadata
+
+
+def build_page(df, start_row, num_rows, var_list=None, where_clause='', temporal=None,
+               var_offset=0, var_limit=None, all_columns=None, mask=None, units=None):
+    """Filter, select and paginate an XPT DataFrame that has been read
+
+    ``temporal`` maps date/time/datetime variables to their kind (see
+    temporal_formats) and ``units`` to their rendered unit (see temporal_units).
+    ``var_offset``/``var_limit`` select a window over the selected (or all)
+    variables; ``all_columns`` is the file's full variable list when ``df``
+    holds only some of them. ``mask`` is a boolean row mask (e.g. from a
+    filter set) applied before the WHERE clause.
+    """
+    from json_output import frame_records
+    from reader_common import column_window, window_info
+    from temporal import render_frame
+
+    if mask is not None:
+        df = df[mask]
+
+    # Apply WHERE clause filter if provided
+    if where_clause:
+        try:
+            # Simple WHERE clause parsing
+            df = apply_where_clause(df, where_clause, temporal)
+        except Exception as e:
+            print(f"Warning: WHERE clause filtering failed: {e}", file=sys.stderr)
+
+    filtered_rows = len(df)
+
+    all_columns = all_columns or list(df.columns)
+    windowed = bool(var_offset) or var_limit is not None
+    if windowed:
+        base = [v for v in var_list or [] if v in all_columns] or all_columns
+        window = column_window(base, var_offset, var_limit)
+        df = df[[v for v in window if v in df.columns]]
+
+    # Apply variable selection if provided
+    elif var_list:
+        # Only keep variables that exist
+        var_list = [v for v in var_list if v in df.columns]
+        if var_list:
+            df = df[var_list]
+
+    # Apply pagination
+    df_page = render_frame(df.iloc[start_row:start_row + num_rows], temporal or {}, units)
+
+    # Convert to records a column at a time
+    records = frame_records(df_page)
+
+    page = {
+        'data': records,
+        'total_rows': filtered_rows,
+        'filtered_rows': filtered_rows,
+        'start_row': start_row,
+        'returned_rows': len(records),
+        'columns': list(df.columns)
+    }
+    if windowed:
+        page.update(window_info(len(base), var_offset, len(df.columns)))
+    return page
+
+
+def get_metadata(file_path, compact=False, var_offset=0, var_limit=None, encoding=None):
+    """Get metadata from XPT file including row count
+
+    With ``compact`` the per-column memory saved by compact dtypes is reported.
+    """
+    try:
+        if not compact:
+            # Fast path: header plus one column, no pandas import
+            header = read_xpt_header(file_path, encoding)
+            if header is not None:
+                meta, row_count, encoding_info = header
+                metadata = build_metadata(file_path, None, meta, row_count, var_offset, var_limit)
+                metadata['encoding'] = encoding_info
+                return {'metadata': metadata}
+
+        # Read the full file to get accurate row count and metadata
+        # XPT files are typically small (FDA submissions), so this is acceptable
+        df, meta, encoding_info = read_xpt(file_path, encoding=encoding)
+        metadata = build_metadata(file_path, df, meta, None, var_offset, var_limit)
+        metadata['encoding'] = encoding_info
+
+        if compact:
+            from compact import compact_dataframe, memory_summary
+            _, memory_report = compact_dataframe(df)
+            metadata['memory'] = memory_summary(memory_report)
 
         return {'metadata': metadata}
 
@@ -96,67 +317,302 @@ def get_metadata(file_path):
         return {'error': f'Failed to read metadata: {str(e)}'}
 
 
-def get_data(file_path, start_row, num_rows, selected_vars='', where_clause=''):
-    """Get data from XPT file with optional filtering"""
+def get_data(file_path, start_row, num_rows, selected_vars='', where_clause='', compact=False,
+             var_offset=0, var_limit=None, engine='auto', encoding=None):
+    """Get data from XPT file with optional filtering
+
+    With selected variables or a column window only the visible variables
+    (plus any the WHERE clause uses) are read from the file.
+    """
     try:
-        # Read XPT file
-        if HAS_PYREADSTAT:
-            df, meta = pyreadstat.read_xport(file_path)
-        else:
-            df = pd.read_sas(file_path, format='xport')
+        var_list = [v.strip() for v in selected_vars.split(',') if v.strip()] if selected_vars else None
+        all_columns = None
+        columns = None
+        if HAS_PYREADSTAT and (var_list or var_offset or var_limit is not None):
+            import pyreadstat
+            from reader_common import column_window, read_header, where_columns
+            _, header = read_header(pyreadstat.read_xport, file_path, encoding)
+            all_columns = list(header.column_names)
+            base = [v for v in var_list or [] if v in all_columns] or all_columns
+            visible = column_window(base, var_offset, var_limit)
+            columns = list(dict.fromkeys(visible + where_columns(where_clause, all_columns)))
+
+        df, meta, engine_info, memory_report, _ = read_xpt_engine(file_path, columns, engine, encoding)
+
+        if compact and memory_report is None:
+            # Filters on categorical columns then compare codes, not strings
+            from compact import compact_dataframe
+            df, _ = compact_dataframe(df)
+
+        temporal = temporal_formats(meta)
+        page = build_page(df, start_row, num_rows, var_list, where_clause, temporal,
+                          var_offset, var_limit, all_columns, units=temporal_units(meta, temporal))
+        if engine_info is not None:
+            page['engine'] = engine_info['name']
+        return page
 
-        # Apply WHERE clause filter if provided
-        if where_clause:
-            try:
-                # Simple WHERE clause parsing
-                df = apply_where_clause(df, where_clause)
-            except Exception as e:
-                print(f"Warning: WHERE clause filtering failed: {e}", file=sys.stderr)
-
-        filtered_rows = len(df)
-
-        # Apply variable selection if provided
-        if selected_vars:
-            var_list = [v.strip() for v in selected_vars.split(',') if v.strip()]
-            if var_list:
-                # Only keep variables that exist
-                var_list = [v for v in var_list if v in df.columns]
-                if var_list:
-                    df = df[var_list]
-
-        # Apply pagination
-        df_page = df.iloc[start_row:start_row + num_rows]
-
-        # Convert to records
-        records = df_page.to_dict('records')
-
-        # Handle NaN values
-        for record in records:
-            for key, value in record.items():
-                if pd.isna(value):
-                    record[key] = None
+    except Exception as e:
+        return {'error': f'Failed to read data: {str(e)}'}
 
+
+def sample(file_path, n=1000, method='random', seed=42, strata=None, selected_vars=None, df=None,
+           encoding=None):
+    """Sample rows (head, tail, systematic, random), optionally stratified
+
+    Only the sampled rows are read from the file (see sampling.sample_dataset),
+    or they are taken from ``df`` when the file is already loaded.
+    """
+    from dataset_source import DatasetSource
+    from sampling import sample_dataset
+    from temporal import temporal_columns, temporal_units
+
+    try:
+        source = DatasetSource(file_path, frame=df, encoding=encoding)
+        variables = source.variables() if HAS_PYREADSTAT else {}
+        columns = [v for v in selected_vars if v in source.columns] or None if selected_vars else None
+        frame, info = sample_dataset(source, n, method, seed, strata, columns)
+
+        formats = {name: attrs['format'] for name, attrs in variables.items()}
+        temporal = temporal_columns(formats)
+        page = build_page(frame, 0, len(frame), None, '', temporal, units=temporal_units(formats, temporal))
         result = {
-            'data': records,
-            'total_rows': filtered_rows,
-            'filtered_rows': filtered_rows,
-            'start_row': start_row,
-            'returned_rows': len(records),
-            'columns': list(df.columns)
+            'data': page['data'],
+            'total_rows': info.pop('total_rows'),
+            'returned_rows': page['returned_rows'],
+            'columns': page['columns']
         }
-
+        result.update(info)
         return result
 
     except Exception as e:
-        return {'error': f'Failed to read data: {str(e)}'}
-
+        return {'error': f'Failed to sample data: {str(e)}'}
+
+
+class XPTReader:
+    """Keeps an XPT file loaded between requests (used by the reader service)"""
+
+    def __init__(self, file_path: str, encoding=None):
+        self.file_path = file_path
+        self.encoding_override = encoding
+        self.encoding_info = None
+        self.df = None
+        self.meta = None
+        self.memory_report = None
+        self.search_index = None
+        self.temporal_formats = {}
+        self.temporal_units = {}
+        self.engine = None
+        self.shared_key = None
+        self.snapshot = None
+
+    def load_file(self, compact: bool = False, engine: str = 'auto', track_changes: bool = False,
+                  share: bool = False):
+        """Load XPT file and metadata (see read_xpt_engine for ``engine``)
+
+        With ``share`` the decoded frame is shared with other processes (see shared_cache).
+        With ``track_changes`` a snapshot of the file is kept so that refresh
+        can patch the frame when the file is rewritten.
+        """
+        try:
+            from shared_cache import shared_frame
+
+            stat = os.stat(self.file_path)
+
+            def load():
+                df, meta, engine_info, report, encoding_info = read_xpt_engine(
+                    self.file_path, None, engine, self.encoding_override)
+                return df, (meta, engine_info, report, encoding_info)
+
+            self.df, (self.meta, self.engine, self.memory_report, self.encoding_info), self.shared_key = \
+                shared_frame(self.file_path, ('xpt', engine, self.encoding_override), load, share)
+            self.temporal_formats = temporal_formats(self.meta)
+            self.temporal_units = temporal_units(self.meta, self.temporal_formats)
+            if compact and self.memory_report is None:
+                from compact import compact_dataframe
+                self.df, self.memory_report = compact_dataframe(self.df)
+            if track_changes:
+                from refresh import FileSnapshot
+                self.snapshot = FileSnapshot.take(self.file_path, self.meta, len(self.df),
+                                                  (stat.st_size, stat.st_mtime_ns))
+            return True
+        except Exception as e:
+            return f"Error loading file: {str(e)}"
+
+    def refresh(self):
+        """Patch the loaded frame after the file was rewritten, decoding only the rows that changed
+
+        Returns {"action": ...} (see refresh.refresh_reader); on "reload"
+        the file must be loaded again.
+        """
+        if self.df is None or self.snapshot is None:
+            return {'action': 'reload'}
+
+        import pyreadstat
+        from refresh import decode_xpt_rows, refresh_reader
+        from text_encoding import encoding_kwargs
+
+        encoding = self.encoding_info['used']
+        layout = self.snapshot.layout
+        try:
+            _, meta = pyreadstat.read_xport(self.file_path, metadataonly=True, **encoding_kwargs(encoding))
+            return refresh_reader(self, meta, lambda start, stop: decode_xpt_rows(
+                self.file_path, meta, layout, start, stop, encoding))
+        except Exception:
+            return {'action': 'reload'}
+
+    def get_metadata(self, var_offset=0, var_limit=None):
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        metadata = build_metadata(self.file_path, self.df, self.meta, None, var_offset, var_limit)
+        if self.memory_report is not None:
+            from compact import memory_summary
+            metadata['memory'] = memory_summary(self.memory_report)
+        if self.engine is not None:
+            metadata['engine'] = self.engine
+        if self.encoding_info is not None:
+            metadata['encoding'] = self.encoding_info
+        return metadata
+
+    def row_count(self):
+        return len(self.df)
+
+    def filter_mask(self, where_clause):
+        """Boolean mask over all rows for a WHERE clause (all rows without one)"""
+        import numpy as np
+
+        if not where_clause or not where_clause.strip():
+            return np.ones(len(self.df), dtype=bool)
+        return self.df.index.isin(apply_where_clause(self.df, where_clause, self.temporal_formats).index)
+
+    def get_data(self, start_row=0, num_rows=100, selected_vars=None, where_clause=None,
+                 var_offset=0, var_limit=None, mask=None):
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        try:
+            page = build_page(self.df, start_row, num_rows, selected_vars, where_clause,
+                              self.temporal_formats, var_offset, var_limit, None, mask, self.temporal_units)
+            if self.engine is not None:
+                page['engine'] = self.engine['name']
+            return page
+        except Exception as e:
+            return {'error': f'Failed to read data: {str(e)}'}
+
+    def get_filtered_row_count(self, where_clause, mask=None):
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        try:
+            if mask is not None:
+                return {"count": int((mask & self.filter_mask(where_clause)).sum())}
+            if not where_clause or not where_clause.strip():
+                return {"count": len(self.df)}
+            return {"count": len(apply_where_clause(self.df, where_clause, self.temporal_formats))}
+        except Exception as e:
+            return {"error": f"Error counting rows: {str(e)}"}
+
+    def get_unique_values(self, column_name, include_count=False, mask=None, approximate=False, top_k=None):
+        """Unique values of a column; ``approximate`` returns the top_k from a sketch (see sketches)"""
+        import pandas as pd
+        from compact import categorical_value_counts
+
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        actual_col = next((c for c in self.df.columns if c.upper() == column_name.upper()), None)
+        if actual_col is None:
+            return {"error": f"Column '{column_name}' not found"}
+
+        series = self.df[actual_col] if mask is None else self.df[actual_col][mask]
+        summary = None
+        if approximate:
+            from sketches import approximate_counts, series_chunks, DEFAULT_TOP_K
+            pairs, summary = approximate_counts(series_chunks(series), top_k or DEFAULT_TOP_K)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            pairs = categorical_value_counts(series)
+        else:
+            pairs = [(None if pd.isna(val) else val, int(count))
+                     for val, count in series.value_counts(dropna=False).items()]
+
+        values = []
+        for val, count in pairs:
+            if hasattr(val, 'item'):  # numpy types
+                val = val.item()
+            values.append({"value": val, "count": count} if include_count else val)
+
+        if actual_col in self.temporal_formats:
+            from temporal import render_sas_values
+            rendered = render_sas_values([val for val, _ in pairs], self.temporal_formats[actual_col],
+                                         self.temporal_units.get(actual_col, 's'))
+            if include_count:
+                for entry, text in zip(values, rendered):
+                    entry["value"] = text
+            else:
+                values = list(rendered)
+
+        if summary is not None:
+            return {"values": values, "approximate": summary}
+        return {"values": values}
+
+    def check_keys(self, keys, start_row=0, num_rows=100):
+        """Whether ``keys`` identify every row, with a page of the duplicate rows (see key_check)"""
+        from dataset_source import DatasetSource
+        from key_check import check_keys, resolve_keys, KEY_CHUNK_SIZE
+        from sampling import read_positions
+
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        try:
+            keys = resolve_keys(keys, list(self.df.columns))
+            source = DatasetSource(self.file_path, frame=self.df)
+            result, page = check_keys(source.iter_chunks(KEY_CHUNK_SIZE, keys),
+                                      lambda positions, columns: read_positions(source, positions, columns),
+                                      keys, start_row, num_rows)
+            page = build_page(page, 0, len(page), temporal=self.temporal_formats, units=self.temporal_units)
+            result["data"] = page["data"]
+            result["columns"] = page["columns"]
+            return result
+        except Exception as e:
+            return {"error": f"Error checking keys: {str(e)}"}
+
+    def sample(self, n=1000, method='random', seed=42, strata=None, selected_vars=None):
+        if self.df is None:
+            return {"error": "File not loaded"}
+        return sample(self.file_path, n, method, seed, strata, selected_vars, self.df)
+
+    def search(self, pattern, columns=None, regex=False, start_row=0, num_rows=100, indexed=False):
+        """Find rows where character variables contain a substring or regex (case-insensitive)"""
+        from search import SearchIndex, search_frame
+
+        if self.df is None:
+            return {"error": "File not loaded"}
+
+        if not pattern:
+            return {"error": "Search pattern required"}
+
+        if not indexed:
+            return search_frame(self.df, pattern, columns, regex, start_row, num_rows)
+
+        if self.search_index is None:
+            self.search_index = SearchIndex(self.df, ngrams=True)
+        return self.search_index.search(pattern, columns, regex, start_row, num_rows)
+
+
+def apply_where_clause(df, where_clause, temporal=None):
+    """Apply a simple WHERE clause to the dataframe
+
+    ``temporal`` maps date/time/datetime variables to their kind, so quoted ISO
+    literals compared with them are translated to SAS numbers.
+    """
+    from temporal import translate_where_literals
 
-def apply_where_clause(df, where_clause):
-    """Apply a simple WHERE clause to the dataframe"""
     # Remove WHERE keyword if present
     clause = where_clause.strip()
     if clause.upper().startswith('WHERE '):
         clause = clause[6:].strip()
+    clause = translate_where_literals(clause, temporal or {})
 
     # Simple parsing for basic conditions
     # This is a basic implementation - can be enhanced
@@ -173,23 +629,44 @@ def apply_where_clause(df, where_clause):
 
 def main():
     if len(sys.argv) < 2:
-        print(json.dumps({'error': 'Usage: xpt_reader.py <command> <file_path> [args...]'}))
+        print(dumps({'error': 'Usage: xpt_reader.py <command> <file_path> [args...]'}))
+        sys.exit(1)
+
+    # Optional flags may appear anywhere after the command
+    compact = '--compact' in sys.argv
+    if compact:
+        sys.argv.remove('--compact')
+    approximate = '--approximate' in sys.argv
+    if approximate:
+        sys.argv.remove('--approximate')
+
+    from reader_common import pop_option
+    try:
+        engine = pop_option(sys.argv, '--engine') or 'auto'
+        filter_set = pop_option(sys.argv, '--filter-set')
+        encoding = pop_option(sys.argv, '--encoding')
+        top_k = pop_option(sys.argv, '--top-k')
+        top_k = int(top_k) if top_k else None
+    except ValueError as e:
+        print(dumps({'error': str(e)}))
         sys.exit(1)
 
     command = sys.argv[1]
 
     if command == 'metadata':
         if len(sys.argv) < 3:
-            print(json.dumps({'error': 'File path required'}))
+            print(dumps({'error': 'File path required'}))
             sys.exit(1)
 
         file_path = sys.argv[2]
-        result = get_metadata(file_path)
-        print(json.dumps(result))
+        var_offset = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else 0
+        var_limit = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else None
+        result = get_metadata(file_path, compact, var_offset, var_limit, encoding)
+        print(dumps(result))
 
     elif command == 'data':
         if len(sys.argv) < 6:
-            print(json.dumps({'error': 'Usage: xpt_reader.py data <file> <start> <num> <vars> [where]'}))
+            print(dumps({'error': 'Usage: xpt_reader.py data <file> <start> <num> <vars> [where] [var_offset] [var_limit]'}))
             sys.exit(1)
 
         file_path = sys.argv[2]
@@ -197,12 +674,116 @@ def main():
         num_rows = int(sys.argv[4])
         selected_vars = sys.argv[5] if len(sys.argv) > 5 else ''
         where_clause = sys.argv[6] if len(sys.argv) > 6 else ''
+        var_offset = int(sys.argv[7]) if len(sys.argv) > 7 and sys.argv[7] else 0
+        var_limit = int(sys.argv[8]) if len(sys.argv) > 8 and sys.argv[8] else None
+
+        if filter_set:
+            # Filter sets are resolved against the whole loaded dataset
+            from filter_sets import resolve_filter_set
+            reader = XPTReader(file_path, encoding)
+            load_result = reader.load_file(compact, engine)
+            if load_result is not True:
+                print(dumps({'error': load_result}))
+                sys.exit(1)
+            var_list = [v for v in selected_vars.split(',') if v] if selected_vars else None
+            try:
+                mask = resolve_filter_set(reader, filter_set)
+            except ValueError as e:
+                print(dumps({'error': str(e)}))
+                sys.exit(1)
+            result = reader.get_data(start_row, num_rows, var_list, where_clause, var_offset, var_limit, mask)
+        else:
+            result = get_data(file_path, start_row, num_rows, selected_vars, where_clause, compact,
+                              var_offset, var_limit, engine, encoding)
+        print(dumps(result))
+
+    elif command == 'sample':
+        if len(sys.argv) < 3:
+            print(dumps({'error': 'Usage: xpt_reader.py sample <file> [n] [method] [seed] [strata] [vars]'}))
+            sys.exit(1)
+
+        file_path = sys.argv[2]
+        n = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else 1000
+        method = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] else 'random'
+        seed = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else 42
+        strata = sys.argv[6] if len(sys.argv) > 6 and sys.argv[6] else None
+        selected_vars = [v for v in sys.argv[7].split(',') if v] if len(sys.argv) > 7 else None
+
+        result = sample(file_path, n, method, seed, strata, selected_vars or None, encoding=encoding)
+        print(dumps(result))
+        if 'error' in result:
+            sys.exit(1)
+
+    elif command == 'check_keys':
+        if len(sys.argv) < 4:
+            print(dumps({'error': 'Usage: xpt_reader.py check_keys <file> <keys> [start] [num]'}))
+            sys.exit(1)
+
+        file_path = sys.argv[2]
+        keys = [k.strip() for k in sys.argv[3].split(',') if k.strip()]
+        start_row = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else 0
+        num_rows = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] else 100
+
+        reader = XPTReader(file_path, encoding)
+        load_result = reader.load_file(compact, engine)
+        if load_result is not True:
+            print(dumps({'error': load_result}))
+            sys.exit(1)
 
-        result = get_data(file_path, start_row, num_rows, selected_vars, where_clause)
-        print(json.dumps(result))
+        result = reader.check_keys(keys, start_row, num_rows)
+        print(dumps(result))
+        if 'error' in result:
+            sys.exit(1)
+
+    elif command == 'search':
+        if len(sys.argv) < 4:
+            print(dumps({'error': 'Usage: xpt_reader.py search <file> <pattern> [columns] [regex] [start] [num]'}))
+            sys.exit(1)
+
+        file_path = sys.argv[2]
+        pattern = sys.argv[3]
+        columns = [c for c in sys.argv[4].split(',') if c] if len(sys.argv) > 4 else None
+        regex = sys.argv[5].lower() == 'true' if len(sys.argv) > 5 else False
+        start_row = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+        num_rows = int(sys.argv[7]) if len(sys.argv) > 7 else 100
+
+        reader = XPTReader(file_path, encoding)
+        load_result = reader.load_file(compact, engine)
+        if load_result is not True:
+            print(dumps({'error': load_result}))
+            sys.exit(1)
+
+        result = reader.search(pattern, columns or None, regex, start_row, num_rows)
+        print(dumps(result))
+
+    elif command == 'unique':
+        if len(sys.argv) < 4:
+            print(dumps({'error': 'Usage: xpt_reader.py unique <file> <column> [include_count]'}))
+            sys.exit(1)
+
+        file_path = sys.argv[2]
+        column_name = sys.argv[3]
+        include_count = sys.argv[4].lower() == 'true' if len(sys.argv) > 4 else False
+
+        reader = XPTReader(file_path, encoding)
+        load_result = reader.load_file(compact, engine)
+        if load_result is not True:
+            print(dumps({'error': load_result}))
+            sys.exit(1)
+
+        from filter_sets import resolve_filter_set
+        try:
+            mask = resolve_filter_set(reader, filter_set)
+        except ValueError as e:
+            print(dumps({'error': str(e)}))
+            sys.exit(1)
+        result = reader.get_unique_values(column_name, include_count, mask, approximate, top_k)
+        print(dumps(result))
+        if 'error' in result:
+            sys.exit(1)
 
     else:
-        print(json.dumps({'error': f'Unknown command: {command}'}))
+        print(dumps({'error': f'Unknown command: {command}'}))
         sys.exit(1)
 
 
@@ -0,0 +1,265 @@
+"""
+Chunk-level zone maps: per-chunk min/max and small distinct-value sets per column
+
+Built during the first full chunked scan of a file and saved in a sidecar
+next to it (with the file's size and mtime as fingerprint). A filtered scan
+then reads only the chunks whose zone map allows a match. Only top-level AND
+terms of the WHERE clause of the form COL op literal or COL IN (...) are used
+to skip chunks; any other term is assumed to match anything. Quoted ISO
+literals compared with date, time and datetime columns are tested as the
+SAS numbers those columns hold (see temporal.py).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import json
+from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
+
+from reader_common import fingerprint
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ZONE_MAP_VERSION = 1
+
+SIDECAR_SUFFIX = '.zonemap.json'
+
+# Columns with more distinct values per chunk keep only min/max
+DISTINCT_LIMIT = 32
+
+OPERATORS = {
+    '=': '==', '==': '==', 'EQ': '==',
+    '!=': '!=', '<>': '!=', '^=': '!=', 'NE': '!=',
+    '>': '>', 'GT': '>', '<': '<', 'LT': '<',
+    '>=': '>=', 'GE': '>=', '<=': '<=', 'LE': '<='
+}
+
+LITERAL = r"""'[^']*'|"[^"]*"|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"""
+
+COMPARISON = re.compile(
+    r'^(\w+)\s*(==|!=|<>|\^=|>=|<=|=|>|<|\bEQ\b|\bNE\b|\bGT\b|\bLT\b|\bGE\b|\bLE\b)\s*(' + LITERAL + r')$',
+    re.IGNORECASE)
+
+IN_LIST = re.compile(r'^(\w+)\s+IN\s*[(\[](.*)[)\]]$', re.IGNORECASE)
+
+LIST_ITEM = re.compile(LITERAL)
+
+# Quoted strings, parentheses and the AND/OR connectives of a WHERE clause
+CLAUSE_TOKEN = re.compile(r"""'[^']*'|"[^"]*"|[()]|\bAND\b|\bOR\b|&|\|""", re.IGNORECASE)
+
+
+def sidecar_path(file_path: str) -> str:
+    return file_path + SIDECAR_SUFFIX
+
+
+def literal_value(text: str):
+    if text[0] in '\'"':
+        return text[1:-1]
+    return float(text)
+
+
+def split_conjuncts(where_clause: str) -> Optional[List[str]]:
+    """Top-level AND terms of a WHERE clause, or None if it has a top-level OR"""
+    clause = where_clause.strip()
+    if clause.upper().startswith('WHERE '):
+        clause = clause[6:]
+
+    terms = []
+    depth = 0
+    start = 0
+    for match in CLAUSE_TOKEN.finditer(clause):
+        token = match.group().upper()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and token in ('OR', '|'):
+            return None
+        elif depth == 0 and token in ('AND', '&'):
+            terms.append(clause[start:match.start()])
+            start = match.end()
+    terms.append(clause[start:])
+
+    conjuncts = []
+    for term in terms:
+        term = term.strip()
+        while term.startswith('(') and term.endswith(')'):
+            inner = split_conjuncts(term[1:-1])
+            if inner is None:
+                break
+            if len(inner) > 1:
+                conjuncts.extend(inner)
+                term = ''
+                break
+            term = inner[0].strip() if inner else ''
+        if term:
+            conjuncts.append(term)
+    return conjuncts
+
+
+def parse_predicates(where_clause: str, column_names: List[str],
+                     temporal: Optional[Dict[str, str]] = None) -> List[Tuple[str, str, list]]:
+    """(column, operator, values) for the WHERE terms a zone map can test
+
+    ``temporal`` maps date/time/datetime columns to their kind; their quoted
+    ISO literals become SAS numbers, as in the readers' WHERE evaluation.
+    """
+    from temporal import sas_number
+
+    conjuncts = split_conjuncts(where_clause) if where_clause else None
+    if not conjuncts:
+        return []
+
+    lookup = {col.upper(): col for col in column_names}
+    temporal = temporal or {}
+
+    def values_of(col: str, literals: List[str]) -> list:
+        values = [literal_value(literal) for literal in literals]
+        if col not in temporal:
+            return values
+        numbers = [sas_number(value, temporal[col]) if isinstance(value, str) else value for value in values]
+        return [number if number is not None else value for number, value in zip(numbers, values)]
+
+    predicates = []
+    for term in conjuncts:
+        match = COMPARISON.match(term)
+        if match and match.group(1).upper() in lookup:
+            col = lookup[match.group(1).upper()]
+            predicates.append((col, OPERATORS[match.group(2).upper()], values_of(col, [match.group(3)])))
+            continue
+        match = IN_LIST.match(term)
+        if match and match.group(1).upper() in lookup:
+            col = lookup[match.group(1).upper()]
+            values = values_of(col, LIST_ITEM.findall(match.group(2)))
+            if values:
+                predicates.append((col, 'in', values))
+    return predicates
+
+
+def column_stats(series: pd.Series) -> List[Any]:
+    """[min, max, missing count, distinct values or None] of one chunk of a column"""
+    import pandas as pd
+
+    present = series.dropna()
+    missing = len(series) - len(present)
+    if present.empty:
+        return [None, None, missing, []]
+
+    uniques = pd.unique(present)
+    if pd.api.types.is_numeric_dtype(present.dtype) and not pd.api.types.is_bool_dtype(present.dtype):
+        low, high = present.min().item(), present.max().item()
+        values = uniques
+    else:
+        values = [value.item() if hasattr(value, 'item') else value for value in uniques]
+        if not all(isinstance(value, str) for value in values):
+            return [None, None, missing, None]
+        low, high = min(values), max(values)
+
+    distinct = None
+    if len(uniques) <= DISTINCT_LIMIT:
+        distinct = sorted(value.item() if hasattr(value, 'item') else value for value in values)
+    return [low, high, missing, distinct]
+
+
+def may_match(stats: List[Any], op: str, values: list) -> bool:
+    """False only if no row of the chunk can satisfy column <op> value(s)"""
+    low, high, missing, distinct = stats
+    if low is None:
+        # All missing (nothing matches a comparison), or values that were not summarised
+        return distinct is None or op == '!='
+    try:
+        if op == '==' or op == 'in':
+            if distinct is not None:
+                return any(value in distinct for value in values)
+            return any(low <= value <= high for value in values)
+        if op == '!=':
+            return bool(missing) or distinct is None or distinct != [values[0]]
+        value = values[0]
+        if op == '>':
+            return high > value
+        if op == '>=':
+            return high >= value
+        if op == '<':
+            return low < value
+        return low <= value
+    except TypeError:
+        # Literal of another type than the column (e.g. a string against numbers)
+        return True
+
+
+class ZoneMap:
+    """Zone maps of a file's consecutive chunks of chunk_size rows"""
+
+    def __init__(self, chunk_size: int, columns: Optional[List[str]] = None):
+        self.chunk_size = chunk_size
+        self.columns = columns or []
+        self.chunks = []
+
+    def add_chunk(self, chunk: pd.DataFrame) -> None:
+        if not self.columns:
+            self.columns = list(chunk.columns)
+        self.chunks.append({'rows': len(chunk),
+                            'stats': {col: column_stats(chunk[col]) for col in self.columns}})
+
+    @property
+    def row_count(self) -> int:
+        return sum(chunk['rows'] for chunk in self.chunks)
+
+    def candidates(self, where_clause: str, temporal: Optional[Dict[str, str]] = None) -> Optional[List[int]]:
+        """Indices of the chunks that may hold matches, or None if no chunk can be ruled out
+
+        ``temporal`` is the reader's temporal_formats (see parse_predicates).
+        """
+        predicates = parse_predicates(where_clause, self.columns, temporal)
+        if not predicates:
+            return None
+        return [i for i, chunk in enumerate(self.chunks)
+                if all(may_match(chunk['stats'][col], op, values) for col, op, values in predicates)]
+
+    @classmethod
+    def load(cls, file_path: str, chunk_size: int) -> Optional[ZoneMap]:
+        """The saved zone map for file_path, if it is current and uses chunk_size"""
+        try:
+            with open(sidecar_path(file_path), 'r', encoding='utf-8') as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if (document.get('version') != ZONE_MAP_VERSION or document.get('chunk_size') != chunk_size
+                or document.get('fingerprint') != fingerprint(file_path)):
+            return None
+
+        zone_map = cls(chunk_size, document['columns'])
+        zone_map.chunks = document['chunks']
+        return zone_map
+
+    def save(self, file_path: str) -> bool:
+        """Write the sidecar; False if the folder is not writable"""
+        document = {
+            'version': ZONE_MAP_VERSION,
+            'fingerprint': fingerprint(file_path),
+            'chunk_size': self.chunk_size,
+            'columns': self.columns,
+            'chunks': self.chunks
+        }
+        tmp_path = sidecar_path(file_path) + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(document, f)
+            os.replace(tmp_path, sidecar_path(file_path))
+            return True
+        except (OSError, ValueError):
+            return False
+
+
+def chunk_runs(candidates: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted chunk indices into (first, stop) runs of consecutive chunks"""
+    runs = []
+    for index in candidates:
+        if runs and runs[-1][1] == index:
+            runs[-1] = (runs[-1][0], index + 1)
+        else:
+            runs.append((index, index + 1))
+    return runs
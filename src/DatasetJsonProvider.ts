@@ -1,29 +1,10 @@
 import * as vscode from 'vscode';
-import * as fs from 'fs';
 import * as path from 'path';
+import { spawn } from 'child_process';
 import { SASWebviewPanel } from './WebviewPanel';
-import { SASMetadata, SASDataResponse, SASDataRequest, SASVariable, IDatasetDocument } from './types';
+import { SASMetadata, SASDataResponse, SASDataRequest, IDatasetDocument } from './types';
 import { Logger } from './utils/logger';
 
-/**
- * Parsed structure of a CDISC Dataset-JSON file
- */
-interface DatasetJsonData {
-    columns: DatasetJsonItem[];
-    rows: any[][];
-    datasetName: string;
-    datasetLabel: string;
-    records: number;
-}
-
-interface DatasetJsonItem {
-    OID: string;
-    name: string;
-    label: string;
-    type: string;
-    length?: number;
-}
-
 /**
  * VS Code custom editor provider for CDISC Dataset-JSON files
  */
@@ -59,10 +40,11 @@ export class DatasetJsonProvider implements vscode.CustomReadonlyEditorProvider<
 
 /**
  * Represents a CDISC Dataset-JSON document with metadata and data access
+ * Uses the streaming Python reader (dataset_json_reader.py), so the file is
+ * never parsed or held in memory as a whole
  */
 export class DatasetJsonDocument implements IDatasetDocument {
     private readonly logger = Logger.createScoped('DatasetJsonDocument');
-    private parsedData: DatasetJsonData | null = null;
 
     private constructor(
         public readonly uri: vscode.Uri,
@@ -80,38 +62,28 @@ export class DatasetJsonDocument implements IDatasetDocument {
     }
 
     /**
-     * Loads and parses the Dataset-JSON file, extracting metadata and data
+     * Loads the Dataset-JSON metadata through the Python reader
+     * Rows are read page by page on request
      */
     private async loadAndParse(): Promise<void> {
         try {
             this.logger.info(`Loading Dataset-JSON file: ${this.uri.fsPath}`);
             const startTime = Date.now();
 
-            const content = await fs.promises.readFile(this.uri.fsPath, 'utf-8');
-            const json = JSON.parse(content);
-
-            this.parsedData = this.parseDatasetJson(json);
+            const result = await this.executePythonCommand('metadata', this.uri.fsPath);
 
-            // Convert to SASMetadata for compatibility
             this.metadata = {
-                total_rows: this.parsedData.records,
-                total_variables: this.parsedData.columns.length,
-                variables: this.parsedData.columns.map(col => ({
-                    name: col.name,
-                    type: (col.type === 'string' ? 'character' : 'numeric') as 'character' | 'numeric',
-                    label: col.label || '',
-                    format: '',
-                    length: col.length
-                })),
-                file_path: this.uri.fsPath,
-                dataset_label: this.parsedData.datasetLabel || this.parsedData.datasetName
+                total_rows: result.total_rows,
+                total_variables: result.total_variables,
+                variables: result.variables,
+                file_path: result.file_path || this.uri.fsPath,
+                dataset_label: result.dataset_label || path.basename(this.uri.fsPath, path.extname(this.uri.fsPath))
             };
 
             const elapsed = Date.now() - startTime;
-            this.logger.info(`Dataset-JSON loaded in ${elapsed}ms`, {
-                dataset: this.parsedData.datasetName,
-                rows: this.parsedData.records,
-                columns: this.parsedData.columns.length
+            this.logger.info(`Dataset-JSON metadata loaded in ${elapsed}ms`, {
+                rows: this.metadata.total_rows,
+                columns: this.metadata.total_variables
             });
 
         } catch (error) {
@@ -121,340 +93,166 @@ export class DatasetJsonDocument implements IDatasetDocument {
     }
 
     /**
-     * Parses a CDISC Dataset-JSON object.
-     * Supports both v1.0 and v1.1 formats, as well as clinicalData and referenceData.
-     */
-    private parseDatasetJson(json: any): DatasetJsonData {
-        // Dataset-JSON v1.1 structure: clinicalData or referenceData at top level
-        // Dataset-JSON v1.0 structure: clinicalData.itemGroupData or referenceData.itemGroupData
-        const dataRoot = json.clinicalData || json.referenceData;
-        if (!dataRoot || !dataRoot.itemGroupData) {
-            throw new Error('Invalid CDISC Dataset-JSON: missing clinicalData/referenceData or itemGroupData');
-        }
-
-        const itemGroupData = dataRoot.itemGroupData;
-
-        // itemGroupData can be an object with dataset name keys, or in v1.1 a single dataset
-        let datasetName: string;
-        let datasetObj: any;
-
-        if (typeof itemGroupData === 'object' && !Array.isArray(itemGroupData)) {
-            // Could be { "DM": { ... } } or directly { records: ..., name: ..., columns/items: ..., rows/itemData: ... }
-            if (itemGroupData.records !== undefined && (itemGroupData.items || itemGroupData.columns)) {
-                // v1.1 direct format
-                datasetName = itemGroupData.name || path.basename(this.uri.fsPath, '.json');
-                datasetObj = itemGroupData;
-            } else {
-                // v1.0 format: { "DATASETNAME": { ... } }
-                const keys = Object.keys(itemGroupData);
-                if (keys.length === 0) {
-                    throw new Error('Invalid CDISC Dataset-JSON: itemGroupData is empty');
-                }
-                datasetName = keys[0];
-                datasetObj = itemGroupData[datasetName];
-            }
-        } else {
-            throw new Error('Invalid CDISC Dataset-JSON: unexpected itemGroupData format');
-        }
-
-        const items: DatasetJsonItem[] = (datasetObj.items || datasetObj.columns || []).map((item: any) => ({
-            OID: item.OID || item.oid || item.itemOID || '',
-            name: item.name || '',
-            label: item.label || '',
-            type: item.type || item.dataType || 'string',
-            length: item.length
-        }));
-
-        // itemData (v1.0) or rows (v1.1) — array of arrays
-        const rows: any[][] = datasetObj.itemData || datasetObj.rows || [];
-        const records = datasetObj.records ?? rows.length;
-
-        return {
-            columns: items,
-            rows,
-            datasetName: datasetObj.name || datasetName,
-            datasetLabel: datasetObj.label || '',
-            records
-        };
-    }
-
-    /**
-     * Retrieves data from the parsed Dataset-JSON
+     * Retrieves a page of data from the Dataset-JSON file
      */
     public async getData(request: SASDataRequest): Promise<SASDataResponse> {
-        if (!this.parsedData || !this.metadata) {
-            throw new Error('Dataset-JSON not loaded');
-        }
-
-        const startTime = Date.now();
-        const allColumns = this.parsedData.columns.map(c => c.name);
-        const selectedVars = request.selectedVars || allColumns;
-
-        // Get column indices for selected variables
-        const colIndices = selectedVars.map(v => {
-            const idx = allColumns.findIndex(c => c.toLowerCase() === v.toLowerCase());
-            return idx;
-        }).filter(i => i >= 0);
-
-        // Apply WHERE clause filter if present
-        let filteredRows = this.parsedData.rows;
-        if (request.whereClause) {
-            filteredRows = this.applyWhereClause(filteredRows, allColumns, request.whereClause);
-        }
-
-        const totalFiltered = filteredRows.length;
-
-        // Apply pagination
-        const startRow = request.startRow || 0;
-        const numRows = request.numRows || 50;
-        const pageRows = filteredRows.slice(startRow, startRow + numRows);
-
-        // Convert to row objects
-        const data = pageRows.map(row => {
-            const obj: Record<string, any> = {};
-            for (const idx of colIndices) {
-                obj[allColumns[idx]] = row[idx];
-            }
-            return obj;
+        this.logger.debug('Getting data from Dataset-JSON file', {
+            startRow: request.startRow,
+            numRows: request.numRows,
+            selectedVarsCount: request.selectedVars?.length || 0,
+            hasWhereClause: !!request.whereClause
         });
 
-        const elapsed = Date.now() - startTime;
-        this.logger.debug(`getData completed in ${elapsed}ms`, {
-            returned: data.length,
-            filtered: totalFiltered
-        });
+        try {
+            const result = await this.executePythonCommand(
+                'data',
+                this.uri.fsPath,
+                request.startRow.toString(),
+                request.numRows.toString(),
+                request.selectedVars ? request.selectedVars.join(',') : '',
+                request.whereClause || ''
+            );
+
+            return {
+                data: result.data || [],
+                total_rows: result.total_rows || this.metadata?.total_rows || 0,
+                filtered_rows: result.filtered_rows ?? result.total_rows ?? 0,
+                start_row: result.start_row ?? request.startRow,
+                returned_rows: result.returned_rows ?? result.data?.length ?? 0,
+                columns: result.columns || request.selectedVars || this.metadata?.variables.map(v => v.name) || []
+            };
 
-        return {
-            data,
-            total_rows: this.parsedData.records,
-            filtered_rows: totalFiltered,
-            start_row: startRow,
-            returned_rows: data.length,
-            columns: selectedVars
-        };
+        } catch (error) {
+            this.logger.error('Failed to get data from Dataset-JSON file', error);
+            throw error;
+        }
     }
 
     /**
      * Gets count of rows matching a WHERE clause
      */
     public async getFilteredRowCount(whereClause: string): Promise<number> {
-        if (!this.parsedData) return 0;
-        const allColumns = this.parsedData.columns.map(c => c.name);
-        const filtered = this.applyWhereClause(this.parsedData.rows, allColumns, whereClause);
-        return filtered.length;
+        try {
+            const result = await this.executePythonCommand('count', this.uri.fsPath, whereClause || '');
+
+            if (result.count !== undefined) {
+                return result.count;
+            }
+
+            return this.metadata?.total_rows || 0;
+
+        } catch (error) {
+            this.logger.warn('Failed to get filtered row count', error);
+            return this.metadata?.total_rows || 0;
+        }
     }
 
     /**
      * Gets unique values for a column
      */
     public async getUniqueValues(columnName: string, includeCount: boolean = false): Promise<any[]> {
-        if (!this.parsedData) return [];
-
-        const allColumns = this.parsedData.columns.map(c => c.name);
-        const colIdx = allColumns.findIndex(c => c.toLowerCase() === columnName.toLowerCase());
-        if (colIdx < 0) return [];
+        try {
+            const result = await this.executePythonCommand(
+                'unique',
+                this.uri.fsPath,
+                columnName,
+                includeCount.toString()
+            );
 
-        const counts = new Map<any, number>();
-        for (const row of this.parsedData.rows) {
-            const val = row[colIdx];
-            counts.set(val, (counts.get(val) || 0) + 1);
-        }
+            return result.values || [];
 
-        if (includeCount) {
-            return Array.from(counts.entries()).map(([value, count]) => ({ value, count }));
+        } catch (error) {
+            this.logger.warn('Failed to get unique values', error);
+            return [];
         }
-
-        return Array.from(counts.keys());
     }
 
     /**
      * Gets unique combinations for multiple columns
+     * Reads the selected columns of all rows, like the SAS Python fallback
      */
     public async getUniqueCombinations(columnNames: string[], includeCount: boolean = false): Promise<any[]> {
-        if (!this.parsedData) return [];
-
-        const allColumns = this.parsedData.columns.map(c => c.name);
-        const colIndices = columnNames.map(name =>
-            allColumns.findIndex(c => c.toLowerCase() === name.toLowerCase())
-        ).filter(i => i >= 0);
+        const allData = await this.getData({
+            filePath: this.uri.fsPath,
+            startRow: 0,
+            numRows: this.metadata?.total_rows || 10000,
+            selectedVars: columnNames
+        });
 
-        if (colIndices.length === 0) return [];
+        const uniqueMap = new Map<string, any>();
 
-        const counts = new Map<string, { values: Record<string, any>; count: number }>();
+        for (const row of allData.data) {
+            const key = JSON.stringify(columnNames.map(col => row[col]));
 
-        for (const row of this.parsedData.rows) {
-            const values: Record<string, any> = {};
-            for (const idx of colIndices) {
-                values[allColumns[idx]] = row[idx];
-            }
-            const key = JSON.stringify(values);
-            const existing = counts.get(key);
-            if (existing) {
-                existing.count++;
-            } else {
-                counts.set(key, { values, count: 1 });
+            if (!uniqueMap.has(key)) {
+                uniqueMap.set(key, includeCount ? { ...row, _count: 1 } : row);
+            } else if (includeCount) {
+                uniqueMap.get(key)._count++;
             }
         }
 
-        if (includeCount) {
-            return Array.from(counts.values()).map(entry => ({
-                ...entry.values,
-                _count: entry.count
-            }));
-        }
-
-        return Array.from(counts.values()).map(entry => entry.values);
+        return Array.from(uniqueMap.values());
     }
 
     /**
-     * Applies a SAS-style WHERE clause filter to row data
+     * Executes a Python command for Dataset-JSON file operations
      */
-    private applyWhereClause(rows: any[][], columns: string[], whereClause: string): any[][] {
-        if (!whereClause.trim()) return rows;
+    private async executePythonCommand(command: string, ...args: string[]): Promise<any> {
+        return new Promise((resolve, reject) => {
+            const pythonScript = path.join(this.context.extensionPath, 'python', 'dataset_json_reader.py');
+            const fullArgs = [pythonScript, command, ...args];
 
-        try {
-            const filter = this.parseWhereClause(whereClause, columns);
-            return rows.filter(row => filter(row));
-        } catch (error) {
-            this.logger.warn('Failed to apply WHERE clause', error);
-            return rows;
-        }
-    }
+            this.logger.debug(`Executing Python for Dataset-JSON: py ${fullArgs.join(' ')}`);
 
-    /**
-     * Parses a WHERE clause into a filter function
-     */
-    private parseWhereClause(whereClause: string, columns: string[]): (row: any[]) => boolean {
-        // Split on AND/OR while preserving operator
-        const orParts = whereClause.split(/\b(OR)\b/i);
-        const orConditions: Array<(row: any[]) => boolean> = [];
-
-        let currentAndConditions: Array<(row: any[]) => boolean> = [];
-
-        for (const part of orParts) {
-            const trimmed = part.trim();
-            if (trimmed.toUpperCase() === 'OR') {
-                if (currentAndConditions.length > 0) {
-                    const andConds = [...currentAndConditions];
-                    orConditions.push((row) => andConds.every(fn => fn(row)));
-                    currentAndConditions = [];
-                }
-                continue;
-            }
+            const pythonProcess = spawn('py', fullArgs, {
+                cwd: this.context.extensionPath
+            });
 
-            // Split on AND
-            const andParts = trimmed.split(/\b(AND)\b/i);
-            for (const andPart of andParts) {
-                const t = andPart.trim();
-                if (t.toUpperCase() === 'AND' || t === '') continue;
-                const condition = this.parseSingleCondition(t, columns);
-                if (condition) {
-                    currentAndConditions.push(condition);
-                }
-            }
-        }
+            let stdout = '';
+            let stderr = '';
 
-        if (currentAndConditions.length > 0) {
-            const andConds = [...currentAndConditions];
-            orConditions.push((row) => andConds.every(fn => fn(row)));
-        }
+            pythonProcess.stdout.on('data', (data) => {
+                stdout += data.toString();
+            });
 
-        if (orConditions.length === 0) {
-            return () => true;
-        }
+            pythonProcess.stderr.on('data', (data) => {
+                stderr += data.toString();
+            });
 
-        return (row) => orConditions.some(fn => fn(row));
-    }
+            pythonProcess.on('close', (code) => {
+                this.logger.debug(`Python process exited with code ${code}`);
 
-    /**
-     * Parses a single condition like "AGE > 30" or "COUNTRY = 'USA'"
-     */
-    private parseSingleCondition(condition: string, columns: string[]): ((row: any[]) => boolean) | null {
-        // Match: COLUMN OPERATOR VALUE
-        const match = condition.match(/^\s*(\w+)\s*(>=|<=|!=|<>|=|>|<|EQ|NE|GT|LT|GE|LE|IN)\s*(.+)\s*$/i);
-        if (!match) return null;
-
-        const colName = match[1];
-        let operator = match[2].toUpperCase();
-        let valueStr = match[3].trim();
-
-        const colIdx = columns.findIndex(c => c.toLowerCase() === colName.toLowerCase());
-        if (colIdx < 0) return null;
-
-        // Normalize operators
-        const opMap: Record<string, string> = {
-            'EQ': '=', 'NE': '!=', 'GT': '>', 'LT': '<', 'GE': '>=', 'LE': '<=', '<>': '!='
-        };
-        operator = opMap[operator] || operator;
-
-        // Handle IN operator
-        if (operator === 'IN') {
-            const inMatch = valueStr.match(/^\((.+)\)$/);
-            if (!inMatch) return null;
-            const inValues = inMatch[1].split(',').map(v => {
-                v = v.trim();
-                if ((v.startsWith("'") && v.endsWith("'")) || (v.startsWith('"') && v.endsWith('"'))) {
-                    return v.slice(1, -1).toLowerCase();
+                if (code !== 0) {
+                    this.logger.error('Python process failed', { code, stderr });
+                    reject(new Error(`Python process exited with code ${code}: ${stderr}`));
+                    return;
                 }
-                return parseFloat(v);
-            });
 
-            return (row: any[]) => {
-                const cellVal = row[colIdx];
-                if (typeof cellVal === 'string') {
-                    return inValues.includes(cellVal.toLowerCase());
+                try {
+                    const result = JSON.parse(stdout);
+                    if (result.error) {
+                        this.logger.error('Python script returned error', result.error);
+                        reject(new Error(result.error));
+                    } else {
+                        resolve(result.metadata || result);
+                    }
+                } catch (parseError) {
+                    this.logger.error('Failed to parse Python output', {
+                        parseError: parseError instanceof Error ? parseError.message : parseError,
+                        stdout: stdout.substring(0, 500)
+                    });
+                    reject(new Error(`Failed to parse Python output: ${parseError}. Output was: ${stdout}`));
                 }
-                return inValues.includes(cellVal);
-            };
-        }
-
-        // Parse value (string or numeric)
-        let compareValue: string | number;
-        let isString = false;
-        if ((valueStr.startsWith("'") && valueStr.endsWith("'")) || (valueStr.startsWith('"') && valueStr.endsWith('"'))) {
-            compareValue = valueStr.slice(1, -1);
-            isString = true;
-        } else {
-            compareValue = parseFloat(valueStr);
-            if (isNaN(compareValue)) {
-                compareValue = valueStr;
-                isString = true;
-            }
-        }
+            });
 
-        return (row: any[]) => {
-            let cellVal = row[colIdx];
-
-            if (isString) {
-                const cellStr = (cellVal ?? '').toString().toLowerCase();
-                const cmpStr = (compareValue as string).toLowerCase();
-                switch (operator) {
-                    case '=': return cellStr === cmpStr;
-                    case '!=': return cellStr !== cmpStr;
-                    case '>': return cellStr > cmpStr;
-                    case '<': return cellStr < cmpStr;
-                    case '>=': return cellStr >= cmpStr;
-                    case '<=': return cellStr <= cmpStr;
-                    default: return false;
-                }
-            } else {
-                const numVal = typeof cellVal === 'number' ? cellVal : parseFloat(cellVal);
-                const numCmp = compareValue as number;
-                switch (operator) {
-                    case '=': return numVal === numCmp;
-                    case '!=': return numVal !== numCmp;
-                    case '>': return numVal > numCmp;
-                    case '<': return numVal < numCmp;
-                    case '>=': return numVal >= numCmp;
-                    case '<=': return numVal <= numCmp;
-                    default: return false;
-                }
-            }
-        };
+            pythonProcess.on('error', (error) => {
+                this.logger.error('Failed to spawn Python process', error);
+                reject(new Error(`Failed to spawn Python process: ${error.message}`));
+            });
+        });
     }
 
     dispose(): void {
         this.logger.debug(`Disposing Dataset-JSON document: ${this.uri.fsPath}`);
-        this.parsedData = null;
     }
 }
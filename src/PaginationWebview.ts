@@ -1348,6 +1348,23 @@ export function getPaginationHTML(metadata: any): string {
                         loadPage(1);
                         break;
 
+                    case 'filterProgress':
+                        // Count of a filter whose first page came before the scan finished
+                        if (message.whereClause !== currentWhereClause) {
+                            break;
+                        }
+                        filteredRows = message.filteredRows;
+                        totalPages = Math.max(1, Math.ceil(filteredRows / pageSize));
+                        const progressTotalRows = document.getElementById('dataset-total-rows');
+                        if (progressTotalRows) {
+                            progressTotalRows.textContent = (message.complete ? '' : '~') + filteredRows.toLocaleString();
+                        }
+                        filterInfo.textContent = 'Filter: ' + currentWhereClause + ' (' +
+                            (message.complete ? filteredRows.toLocaleString() + ' rows match)'
+                                              : 'at least ' + message.lowerBound.toLocaleString() + ', ~' + filteredRows.toLocaleString() + ' rows match, scanning...)');
+                        updatePaginationInfo();
+                        break;
+
                     case 'error':
                         console.error('Error:', message.message);
                         showToast(message.message, 'error');
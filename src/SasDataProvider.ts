@@ -2,7 +2,7 @@ import * as vscode from 'vscode';
 import * as path from 'path';
 import { spawn } from 'child_process';
 import { SASWebviewPanel } from './WebviewPanel';
-import { SASMetadata, SASDataResponse, SASDataRequest, IDatasetDocument } from './types';
+import { SASMetadata, SASDataResponse, SASDataRequest, SASDataProgress, IDatasetDocument } from './types';
 import { Logger } from './utils/logger';
 import { EnhancedSASReader, DatasetMetadata, DataRow } from './readers/EnhancedSASReader';
 
@@ -51,6 +51,7 @@ export class SASDatasetProvider implements vscode.CustomReadonlyEditorProvider<S
  * Represents a SAS dataset document with metadata and data access capabilities
  */
 export class SASDatasetDocument implements IDatasetDocument {
+    private static nextRequestId = 0;
     private readonly logger = Logger.createScoped('SASDatasetDocument');
     private reader: EnhancedSASReader | null = null;
     private usePythonFallback = false;
@@ -151,8 +152,10 @@ export class SASDatasetDocument implements IDatasetDocument {
     /**
      * Get the count of rows matching a filter without loading data
      * Much faster than loading data just for counting
+     * With onProgress, the Python fallback resolves with an estimate as soon as
+     * a first match is found and reports the exact count once the scan completes
      */
-    public async getFilteredRowCount(whereClause: string): Promise<number> {
+    public async getFilteredRowCount(whereClause: string, onProgress?: (progress: SASDataProgress) => void): Promise<number> {
         if (!this.usePythonFallback && this.reader) {
             try {
                 return await this.reader.getFilteredRowCount(whereClause);
@@ -168,15 +171,17 @@ export class SASDatasetDocument implements IDatasetDocument {
             numRows: 1,
             selectedVars: this.metadata?.variables.map(v => v.name) || [],
             whereClause: whereClause
-        });
+        }, onProgress);
         
         return result.filtered_rows || 0;
     }
 
     /**
      * Retrieves data from the SAS dataset based on the request parameters
+     * With onProgress, a filtered Python request resolves as soon as its page is
+     * found (filtered_rows is then an estimate) and reports the rest of the scan
      */
-    public async getData(request: SASDataRequest): Promise<SASDataResponse> {
+    public async getData(request: SASDataRequest, onProgress?: (progress: SASDataProgress) => void): Promise<SASDataResponse> {
         this.logger.debug('Getting data', {
             startRow: request.startRow,
             numRows: request.numRows,
@@ -239,6 +244,10 @@ export class SASDatasetDocument implements IDatasetDocument {
         }
 
         // Use Python fallback
+        if (request.whereClause && onProgress) {
+            return await this.executeProgressiveRequest(request, onProgress);
+        }
+
         const args = [
             'data',
             request.filePath,
@@ -370,6 +379,115 @@ export class SASDatasetDocument implements IDatasetDocument {
         });
     }
 
+    /**
+     * Runs a filtered data request through the Python reader service, which streams
+     * one JSON line per event: "page" (resolves the promise), then "progress" and
+     * "complete" (passed to onProgress)
+     */
+    private async executeProgressiveRequest(
+        request: SASDataRequest,
+        onProgress: (progress: SASDataProgress) => void
+    ): Promise<SASDataResponse> {
+        return new Promise((resolve, reject) => {
+            const serviceScript = path.join(this.context.extensionPath, 'python', 'reader_service.py');
+            const requestId = ++SASDatasetDocument.nextRequestId;
+
+            this.logger.debug(`Executing progressive Python request ${requestId}: py ${serviceScript}`);
+
+            const pythonProcess = spawn('py', [serviceScript], {
+                cwd: this.context.extensionPath
+            });
+
+            let buffer = '';
+            let stderr = '';
+            let pageReceived = false;
+
+            const handleLine = (line: string) => {
+                const message = JSON.parse(line);
+                if (message.id !== requestId) {
+                    return;
+                }
+
+                if (message.error) {
+                    this.logger.error('Python reader service returned error', message.error);
+                    if (!pageReceived) {
+                        pageReceived = true;
+                        reject(new Error(message.error));
+                    }
+                    return;
+                }
+
+                if (message.event === 'page') {
+                    pageReceived = true;
+                    resolve({
+                        data: message.data,
+                        total_rows: message.total_rows ?? this.metadata?.total_rows ?? 0,
+                        filtered_rows: message.estimated_filtered_rows,
+                        filtered_rows_lower_bound: message.filtered_rows_lower_bound,
+                        estimated_filtered_rows: message.estimated_filtered_rows,
+                        start_row: message.start_row,
+                        returned_rows: message.returned_rows,
+                        columns: message.columns
+                    });
+                } else {
+                    onProgress(message as SASDataProgress);
+                }
+            };
+
+            pythonProcess.stdout.setEncoding('utf8');
+            pythonProcess.stdout.on('data', (data: string) => {
+                buffer += data;
+                let newline: number;
+                while ((newline = buffer.indexOf('\n')) >= 0) {
+                    const line = buffer.slice(0, newline).trim();
+                    buffer = buffer.slice(newline + 1);
+                    if (!line) {
+                        continue;
+                    }
+                    try {
+                        handleLine(line);
+                    } catch (parseError) {
+                        this.logger.error('Failed to parse Python reader service output', {
+                            parseError: parseError instanceof Error ? parseError.message : parseError,
+                            line: line.substring(0, 500)
+                        });
+                    }
+                }
+            });
+
+            pythonProcess.stderr.on('data', (data) => {
+                stderr += data.toString();
+            });
+
+            pythonProcess.on('close', (code) => {
+                this.logger.debug(`Python reader service exited with code ${code}`);
+                if (!pageReceived) {
+                    reject(new Error(`Python reader service exited with code ${code} before sending a page: ${stderr}`));
+                }
+            });
+
+            pythonProcess.on('error', (error) => {
+                this.logger.error('Failed to spawn Python reader service', error);
+                if (!pageReceived) {
+                    pageReceived = true;
+                    reject(new Error(`Failed to spawn Python process: ${error.message}`));
+                }
+            });
+
+            // One request, then end of input so the service exits once it is answered
+            pythonProcess.stdin.write(JSON.stringify({
+                id: requestId,
+                command: 'data_progressive',
+                file_path: request.filePath,
+                start_row: request.startRow,
+                num_rows: request.numRows,
+                selected_vars: request.selectedVars && request.selectedVars.length > 0 ? request.selectedVars : null,
+                where_clause: request.whereClause
+            }) + '\n');
+            pythonProcess.stdin.end();
+        });
+    }
+
     /**
      * Disposes of the document and cleans up resources
      */
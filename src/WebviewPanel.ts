@@ -1,6 +1,6 @@
 import * as vscode from 'vscode';
 import { SASDatasetDocument } from './SasDataProvider';
-import { WebviewMessage, FilterState, SASDataRequest, IDatasetDocument } from './types';
+import { WebviewMessage, FilterState, SASDataRequest, SASDataProgress, IDatasetDocument } from './types';
 import { getPaginationHTML } from './PaginationWebview';
 import { Logger } from './utils/logger';
 
@@ -191,7 +191,10 @@ export class SASWebviewPanel {
         });
 
         try {
-            const result = await this.document.getData(request);
+            // A filtered page may arrive before the scan ends; later counts follow as filterProgress
+            const whereClause = request.whereClause || '';
+            const result = await this.document.getData(request,
+                progress => this.postFilterProgress(whereClause, progress));
 
             // Send chunk back to webview for virtual scrolling
             const response = {
@@ -292,7 +295,8 @@ export class SASWebviewPanel {
 
                 // Use the optimized getFilteredRowCount method
                 // This is much faster as it doesn't load any actual data
-                filteredRowCount = await this.document.getFilteredRowCount(whereClause);
+                filteredRowCount = await this.document.getFilteredRowCount(whereClause,
+                    progress => this.postFilterProgress(whereClause, progress));
                 this.logger.info(`Filter applied: ${filteredRowCount} rows match the filter`);
             }
 
@@ -387,6 +391,19 @@ export class SASWebviewPanel {
         }
     }
 
+    /**
+     * Sends the updated match count of a filtered scan that is still running (or just completed)
+     */
+    private postFilterProgress(whereClause: string, progress: SASDataProgress): void {
+        this.panel.webview.postMessage({
+            type: 'filterProgress',
+            whereClause: whereClause,
+            filteredRows: progress.filtered_rows ?? progress.estimated_filtered_rows,
+            lowerBound: progress.filtered_rows_lower_bound,
+            complete: progress.event === 'complete'
+        }).then(undefined, error => this.logger.debug('Could not post filter progress', error));
+    }
+
     private async postMessage(message: WebviewMessage): Promise<void> {
         await this.panel.webview.postMessage(message);
     }
@@ -29,11 +29,25 @@ export interface SASDataResponse {
     data: Array<Record<string, any>>;
     total_rows: number;
     filtered_rows?: number;
+    filtered_rows_lower_bound?: number;
+    estimated_filtered_rows?: number;
     start_row: number;
     returned_rows: number;
     columns: string[];
 }
 
+/**
+ * Progress of a filtered scan that continues after its first page was returned
+ */
+export interface SASDataProgress {
+    event: 'progress' | 'complete';
+    total_rows: number | null;
+    scanned_rows: number;
+    filtered_rows_lower_bound: number;
+    estimated_filtered_rows: number;
+    filtered_rows?: number;
+}
+
 /**
  * Request parameters for SAS data retrieval
  */
@@ -67,8 +81,8 @@ export interface FilterState {
  */
 export interface IDatasetDocument extends vscode.CustomDocument {
     metadata: SASMetadata | null;
-    getData(request: SASDataRequest): Promise<SASDataResponse>;
-    getFilteredRowCount(whereClause: string): Promise<number>;
+    getData(request: SASDataRequest, onProgress?: (progress: SASDataProgress) => void): Promise<SASDataResponse>;
+    getFilteredRowCount(whereClause: string, onProgress?: (progress: SASDataProgress) => void): Promise<number>;
     getUniqueValues(columnName: string, includeCount?: boolean): Promise<any[]>;
     getUniqueCombinations(columnNames: string[], includeCount?: boolean): Promise<any[]>;
 }
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Benchmark of page encoding: per-cell conversion + json.dumps vs json_output
+
+Builds a wide page (numeric, character and categorical columns with missing
+values) and times:
+- the previous path: to_dict('records'), a per-cell NaN/NumPy loop, json.dumps
+- frame_records + dumps with the stdlib encoder
+- frame_records + dumps with orjson (when installed)
+
+and checks that every path decodes to the same JSON.
+
+Run with: python testing/benchmark_json_output.py [rows] [columns]
+"""
+
+import os
+import sys
+import json
+import time
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+import pandas as pd
+
+import json_output
+from json_output import dumps, frame_records
+
+REPEATS = 5
+
+
+def wide_page(rows, columns):
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(columns):
+        kind = i % 3
+        if kind == 0:
+            values = rng.normal(50, 10, rows)
+            values[rng.random(rows) < 0.1] = np.nan
+            data[f'NUM{i}'] = values
+        elif kind == 1:
+            data[f'CHR{i}'] = rng.choice(['SUBJECT-001', 'PLACEBO', 'Grade 2', None], rows)
+        else:
+            data[f'CAT{i}'] = pd.Categorical(rng.choice(['Y', 'N', None], rows))
+    return pd.DataFrame(data)
+
+
+def previous_path(page):
+    data = page.to_dict('records')
+    for row in data:
+        for col, value in row.items():
+            if pd.isna(value):
+                row[col] = None
+            elif isinstance(value, (pd.Timestamp, pd.Period)):
+                row[col] = str(value)
+            elif hasattr(value, 'isoformat'):
+                row[col] = value.isoformat()
+            elif hasattr(value, 'item'):
+                row[col] = value.item()
+    return json.dumps({'data': data})
+
+
+def encoder_path(name):
+    def encode(page):
+        os.environ[json_output.ENCODER_ENV] = name
+        return dumps({'data': frame_records(page)})
+    return encode
+
+
+def best_time(encode, page):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        text = encode(page)
+        times.append(time.perf_counter() - start)
+    return min(times), text
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    page = wide_page(rows, columns)
+
+    paths = [('per-cell + json.dumps', previous_path), ('frame_records + json', encoder_path('json'))]
+    if json_output.HAS_ORJSON:
+        paths.append(('frame_records + orjson', encoder_path('orjson')))
+
+    print(f'Page: {rows} rows x {columns} columns')
+    baseline = None
+    expected = None
+    for label, encode in paths:
+        elapsed, text = best_time(encode, page)
+        decoded = json.loads(text)
+        if expected is None:
+            baseline, expected = elapsed, decoded
+        assert decoded == expected, f'{label} output differs'
+        assert text.isascii(), f'{label} output is not ASCII'
+        print(f'  {label:<24} {elapsed * 1000:8.1f} ms  {baseline / elapsed:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark of re-opening an appended XPT dataset: full reload vs incremental refresh
+
+Writes an XPT file, loads it through the reader service cache, appends rows
+(rewriting the file) and times:
+- a full reload of the rewritten file
+- the cache's refresh, which decodes only the rows of changed blocks
+
+and checks that the refreshed frame equals a fresh read of the file.
+
+Run with: python testing/benchmark_refresh.py [rows] [appended rows]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+from reader_service import DatasetCache, open_reader
+
+
+def dataset(rows, first_id=0, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(50, 10, rows)
+    values[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        'ID': np.arange(first_id, first_id + rows, dtype=float),
+        'SUBJID': [f'SUBJ-{i:08d}' for i in range(first_id, first_id + rows)],
+        'ARM': rng.choice(['PLACEBO', 'DRUG A', 'DRUG B'], rows),
+        'AVAL': values
+    })
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    appended = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'bench.xpt')
+        base = dataset(rows)
+        pyreadstat.write_xport(base, path)
+        cache = DatasetCache()
+        cache.get(path)
+
+        pyreadstat.write_xport(pd.concat([base, dataset(appended, rows, 1)], ignore_index=True), path)
+
+        start = time.perf_counter()
+        open_reader(path)
+        reload_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reader = cache.get(path)
+        refresh_time = time.perf_counter() - start
+
+        assert cache.refreshes == 1, 'the cache reloaded instead of refreshing'
+        expected, _ = pyreadstat.read_xport(path, disable_datetime_conversion=True)
+        assert reader.df.equals(expected), 'refreshed frame differs from a fresh read'
+
+    print(f'{rows} rows + {appended} appended')
+    print(f'  full reload  {reload_time * 1000:8.1f} ms')
+    print(f'  refresh      {refresh_time * 1000:8.1f} ms  {reload_time / refresh_time:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Create test_simple.sas7bdat, a small .sas7bdat fixture for the reader tests
+
+pyreadstat reads .sas7bdat but has no writer for it; the ReadStat library
+bundled in its writer extension does (readstat_begin_writing_sas7bdat), so
+it is driven directly through ctypes. The rows are those of test_simple.xpt
+plus a DATE9. formatted visit date.
+
+Run with: python testing/create-test-sas7bdat.py
+"""
+
+import ctypes
+import os
+
+import pandas as pd
+import pyreadstat
+from pyreadstat import _readstat_writer
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT = os.path.join(TESTING_DIR, 'test_simple.sas7bdat')
+
+READSTAT_TYPE_STRING = 0
+READSTAT_TYPE_DOUBLE = 5
+
+DataWriter = ctypes.CFUNCTYPE(ctypes.c_ssize_t, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p)
+
+
+def load_readstat():
+    lib = ctypes.CDLL(_readstat_writer.__file__)
+    lib.readstat_writer_init.restype = ctypes.c_void_p
+    lib.readstat_set_data_writer.argtypes = [ctypes.c_void_p, DataWriter]
+    lib.readstat_writer_set_file_label.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+    lib.readstat_add_variable.restype = ctypes.c_void_p
+    lib.readstat_add_variable.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_size_t]
+    lib.readstat_variable_set_label.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+    lib.readstat_variable_set_format.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+    lib.readstat_begin_writing_sas7bdat.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_long]
+    lib.readstat_begin_row.argtypes = [ctypes.c_void_p]
+    lib.readstat_insert_double_value.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_double]
+    lib.readstat_insert_string_value.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_char_p]
+    lib.readstat_insert_missing_value.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+    lib.readstat_end_row.argtypes = [ctypes.c_void_p]
+    lib.readstat_end_writing.argtypes = [ctypes.c_void_p]
+    lib.readstat_writer_free.argtypes = [ctypes.c_void_p]
+    return lib
+
+
+def check(status):
+    if status != 0:
+        raise RuntimeError(f'ReadStat error {status}')
+
+
+def main():
+    df, meta = pyreadstat.read_xport(os.path.join(TESTING_DIR, 'test_simple.xpt'))
+    labels = dict(meta.column_names_to_labels)
+    df['VISITDT'] = [23011.0, 23042.0, None, 23101.0, 23132.0]
+    labels['VISITDT'] = 'Visit Date'
+    formats = {'VISITDT': 'DATE9'}
+
+    lib = load_readstat()
+    with open(OUTPUT, 'wb') as f:
+        write = DataWriter(lambda data, length, ctx: f.write(ctypes.string_at(data, length)))
+        writer = lib.readstat_writer_init()
+        check(lib.readstat_set_data_writer(writer, write))
+        check(lib.readstat_writer_set_file_label(writer, b'Simple test dataset'))
+
+        variables = []
+        for col in df.columns:
+            text = pd.api.types.is_string_dtype(df[col])
+            width = max(8, int(df[col].str.len().max())) if text else 8
+            variable = lib.readstat_add_variable(writer, col.encode(),
+                                                 READSTAT_TYPE_STRING if text else READSTAT_TYPE_DOUBLE, width)
+            lib.readstat_variable_set_label(variable, labels[col].encode())
+            if col in formats:
+                lib.readstat_variable_set_format(variable, formats[col].encode())
+            variables.append((variable, text))
+
+        check(lib.readstat_begin_writing_sas7bdat(writer, None, len(df)))
+        for row in df.itertuples(index=False):
+            check(lib.readstat_begin_row(writer))
+            for (variable, text), value in zip(variables, row):
+                if value is None or value != value:
+                    check(lib.readstat_insert_missing_value(writer, variable))
+                elif text:
+                    check(lib.readstat_insert_string_value(writer, variable, value.encode()))
+                else:
+                    check(lib.readstat_insert_double_value(writer, variable, float(value)))
+            check(lib.readstat_end_row(writer))
+        check(lib.readstat_end_writing(writer))
+        lib.readstat_writer_free(writer)
+
+    written, written_meta = pyreadstat.read_sas7bdat(OUTPUT)
+    print(f'Wrote {OUTPUT}: {written_meta.number_rows} rows, {len(written_meta.column_names)} variables')
+    print(written)
+
+
+if __name__ == '__main__':
+    main()
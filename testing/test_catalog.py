@@ -0,0 +1,34 @@
+"""
+Incremental refresh of the folder catalog in catalog.py
+
+Unchanged files are reused by size and mtime; files whose metadata read
+failed are read again on the next refresh.
+
+Run with: python -m pytest testing/test_catalog.py
+"""
+
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import pandas as pd
+import pyreadstat
+
+import catalog
+
+
+def test_failed_reads_are_retried(tmp_path, monkeypatch):
+    pyreadstat.write_xport(pd.DataFrame({'AGE': [30.0, 40.0]}), str(tmp_path / 'dm.xpt'))
+    read_file_metadata = catalog.read_file_metadata
+
+    monkeypatch.setattr(catalog, 'read_file_metadata', lambda path: {'error': 'file is locked'})
+    assert catalog.build_catalog(str(tmp_path))['errors'] == ['dm.xpt']
+
+    monkeypatch.setattr(catalog, 'read_file_metadata', read_file_metadata)
+    summary = catalog.build_catalog(str(tmp_path))
+    assert (summary['refreshed'], summary['errors']) == (1, [])
+
+    assert catalog.build_catalog(str(tmp_path))['reused'] == 1
+    assert catalog.find_variable(str(tmp_path), 'AGE', 'exact', 'name')['total_matches'] == 1
@@ -0,0 +1,48 @@
+"""
+Chunked Parquet conversion in convert.py
+
+The Arrow schema comes from the first chunk; a date, datetime or time
+variable that is missing throughout that chunk must still be typed from its
+SAS format so the chunks with values fit the schema.
+
+Run with: python -m pytest testing/test_convert.py
+"""
+
+import datetime
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+import convert
+
+
+def test_temporal_columns_missing_in_first_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(convert, 'CONVERT_CHUNK_SIZE', 1000)
+    rows = 5000
+    late = np.arange(rows) >= 3000
+    source = str(tmp_path / 'adae.xpt')
+    pyreadstat.write_xport(pd.DataFrame({
+        'ID': np.arange(rows, dtype=float),
+        'ADT': np.where(late, 23200.0, np.nan),
+        'ADTM': np.where(late, 23200 * 86400.0 + 30.5, np.nan),
+        'ATM': np.where(late, 3600.0, np.nan),
+        'AVAL': np.where(late, 1.5, np.nan),
+    }), source, variable_format={'ADT': 'DATE9.', 'ADTM': 'DATETIME20.', 'ATM': 'TIME8.'})
+
+    output = str(tmp_path / 'adae.parquet')
+    result = convert.convert_file(source, output, 'parquet', force=True)
+    assert result['status'] == 'converted', result
+
+    frame = pd.read_parquet(output)
+    assert len(frame) == rows
+    assert frame['ADT'].iloc[0] is None
+    assert frame['ADT'].iloc[-1] == datetime.date(2023, 7, 9)
+    assert frame['ADTM'].iloc[-1] == pd.Timestamp('2023-07-09 00:00:30.5')
+    assert frame['ATM'].iloc[-1] == datetime.time(1, 0)
+    assert frame['AVAL'].iloc[-1] == 1.5
@@ -0,0 +1,156 @@
+"""
+Streaming Dataset-JSON reader: pages, counts and layouts
+
+Writes the same rows as Dataset-JSON v1.1, v1.0 (with the metadata after
+itemData) and NDJSON, and reads them back with a READ_BLOCK_SIZE small
+enough that rows and multi-byte characters are split across blocks, and a
+ROW_INDEX_STRIDE small enough that pages seek through the row index.
+
+Run with: python -m pytest testing/test_dataset_json_reader.py
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import dataset_json_reader
+from dataset_json_reader import DatasetJsonReader
+
+ROWS = 1200
+
+COLUMNS = [
+    {'itemOID': 'IT.USUBJID', 'name': 'USUBJID', 'label': 'Subject', 'dataType': 'string', 'length': 12},
+    {'itemOID': 'IT.AGE', 'name': 'AGE', 'label': 'Age', 'dataType': 'integer'},
+    {'itemOID': 'IT.SITE', 'name': 'SITE', 'label': 'Site, "rows": [x]', 'dataType': 'string'},
+    {'itemOID': 'IT.WT', 'name': 'WT', 'label': 'Weight', 'dataType': 'decimal'},
+]
+
+SITES = ['Zürich', 'Tokyo 東京', 'NYC', 'São Paulo']
+
+
+def rows():
+    return [[f'S{i:06d}', None if i % 17 == 0 else 20 + i % 50, SITES[i % len(SITES)],
+             f'{50 + (i % 300) / 10:.1f}'] for i in range(ROWS)]
+
+
+def write_v11(path):
+    document = {'datasetJSONVersion': '1.1.0', 'name': 'DM', 'label': 'Demographics',
+                'records': ROWS, 'columns': COLUMNS, 'rows': rows()}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False)
+
+
+def write_v10_metadata_last(path):
+    items = [{'OID': col['itemOID'], 'name': col['name'], 'label': col['label'],
+              'type': col['dataType'], 'length': col.get('length')} for col in COLUMNS]
+    # itemData comes before the items, so the metadata is only complete after the rows
+    group = {'itemData': [[i + 1] + row for i, row in enumerate(rows())],
+             'records': ROWS, 'name': 'DM', 'label': 'Demographics',
+             'items': [{'OID': 'ITEMGROUPDATASEQ', 'name': 'ITEMGROUPDATASEQ', 'label': 'Record',
+                        'type': 'integer'}] + items}
+    document = {'clinicalData': {'studyOID': 'S', 'itemGroupData': {'IG.DM': group}},
+                'creationDateTime': '2024-01-01T00:00:00'}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False)
+
+
+def write_ndjson(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'datasetJSONVersion': '1.1.0', 'name': 'DM', 'label': 'Demographics',
+                            'records': ROWS, 'columns': COLUMNS}, ensure_ascii=False) + '\n')
+        for row in rows():
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+LAYOUTS = {'v11.json': write_v11, 'v10.json': write_v10_metadata_last, 'dm.ndjson': write_ndjson}
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(dataset_json_reader, 'READ_BLOCK_SIZE', 61)
+    monkeypatch.setattr(dataset_json_reader, 'ROW_INDEX_STRIDE', 100)
+
+
+@pytest.fixture(params=sorted(LAYOUTS))
+def reader(request, tmp_path):
+    path = str(tmp_path / request.param)
+    LAYOUTS[request.param](path)
+    reader = DatasetJsonReader(path)
+    assert reader.load_file() is True
+    return reader
+
+
+def expected(start, stop):
+    return [{'USUBJID': row[0], 'AGE': row[1], 'SITE': row[2], 'WT': float(row[3])}
+            for row in rows()[start:stop]]
+
+
+def page(reader, *args, **kwargs):
+    result = reader.get_data(*args, **kwargs)
+    assert 'error' not in result, result.get('error')
+    return [{col: record[col] for col in ('USUBJID', 'AGE', 'SITE', 'WT')} for record in result['data']]
+
+
+def test_metadata(reader):
+    metadata = reader.get_metadata()
+    assert metadata['total_rows'] == ROWS
+    assert [v['name'] for v in metadata['variables']][-4:] == ['USUBJID', 'AGE', 'SITE', 'WT']
+    assert metadata['variables'][-2]['label'] == 'Site, "rows": [x]'
+
+
+def test_pages_across_blocks(reader):
+    assert page(reader, 0, 5) == expected(0, 5)
+    # Later pages seek through the row index; earlier ones after that reuse it
+    assert page(reader, 1150, 100) == expected(1150, ROWS)
+    assert page(reader, 333, 50) == expected(333, 383)
+    assert page(reader, 0, ROWS) == expected(0, ROWS)
+
+
+def test_filtered_count_and_page(reader):
+    matching = [row for row in expected(0, ROWS) if row['SITE'] == 'Tokyo 東京' and (row['AGE'] or 0) > 60]
+    where = "SITE = 'Tokyo 東京' and AGE > 60"
+    assert reader.get_filtered_row_count(where)['count'] == len(matching)
+    assert page(reader, 3, 4, None, where) == matching[3:7]
+    # The second count is answered with the zone map saved by the first scan
+    assert reader.get_filtered_row_count(where)['count'] == len(matching)
+
+
+def test_unique_values(reader):
+    result = reader.get_unique_values('SITE', include_count=True)
+    counts = {entry['value']: entry['count'] for entry in result['values']}
+    assert counts == {site: ROWS // len(SITES) for site in SITES}
+
+
+def test_new_reader_seeks_from_saved_zone_map(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_json_reader, 'SCAN_CHUNK_SIZE', 300)
+    path = str(tmp_path / 'no_records.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'datasetJSONVersion': '1.1.0', 'name': 'DM', 'columns': COLUMNS, 'rows': rows()},
+                  f, ensure_ascii=False)
+
+    # Without "records", the first count scans the file and saves the zone map
+    first = DatasetJsonReader(path)
+    assert first.load_file() is True
+    assert first.row_count() == ROWS
+
+    decoded = []
+    raw_decode = dataset_json_reader._DECODER.raw_decode
+
+    class CountingDecoder:
+        def raw_decode(self, text, pos):
+            result = raw_decode(text, pos)
+            decoded.append(pos)
+            return result
+
+    monkeypatch.setattr(dataset_json_reader, '_DECODER', CountingDecoder())
+    second = DatasetJsonReader(path)
+    assert second.load_file() is True
+    assert page(second, 1150, 20) == expected(1150, 1170)
+    # From the chunk at row 900 on, and no scan for the row count
+    assert len(decoded) <= 1170 - 900 + 1
+    assert second.row_count() == ROWS
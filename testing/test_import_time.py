@@ -0,0 +1,119 @@
+"""
+Import-time budget for the one-shot Python reader CLIs
+
+Runs each reader with `python -X importtime` and checks that:
+- usage errors import neither pandas nor pyreadstat
+- XPT and .sas7bdat metadata are answered from the header without importing pandas
+- the total import time stays within IMPORT_BUDGET_MS
+
+and that the header-only .sas7bdat metadata agrees with a full load
+(test_simple.sas7bdat is made by create-test-sas7bdat.py).
+
+Run with: python testing/test_import_time.py   (or via pytest)
+"""
+
+import os
+import re
+import json
+import subprocess
+import sys
+from importlib import metadata
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+PYTHON_DIR = os.path.join(os.path.dirname(TESTING_DIR), 'python')
+
+# Generous enough for a cold cache on a laptop; pandas alone costs ~300ms
+IMPORT_BUDGET_MS = 250
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$')
+
+
+def measure(script, *args):
+    """Run a reader script and return ({top-level module: cumulative us}, all module names)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(PYTHON_DIR, script), *args],
+        cwd=TESTING_DIR, capture_output=True, text=True
+    )
+
+    top_level = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        modules.add(name)
+        if indent == 1:
+            top_level[name] = cumulative
+    return top_level, modules
+
+
+def run(script, *args):
+    """Run a reader script and return its parsed JSON output"""
+    result = subprocess.run(
+        [sys.executable, os.path.join(PYTHON_DIR, script), *args],
+        cwd=TESTING_DIR, capture_output=True, text=True
+    )
+    return json.loads(result.stdout)
+
+
+def check(script, *args, forbidden=('pandas',)):
+    top_level, modules = measure(script, *args)
+    total_ms = sum(top_level.values()) / 1000
+
+    loaded = [name for name in forbidden if name in modules]
+    assert not loaded, f"{script} {' '.join(args)} imported {', '.join(loaded)}"
+    assert total_ms <= IMPORT_BUDGET_MS, \
+        f"{script} {' '.join(args)} spent {total_ms:.0f}ms importing (budget {IMPORT_BUDGET_MS}ms)"
+    return total_ms
+
+
+def test_usage_errors_skip_heavy_imports():
+    for script in ('sas_reader.py', 'xpt_reader.py', 'r_reader.py'):
+        check(script, forbidden=('pandas', 'pyreadstat', 'pyreadr'))
+
+
+def pyreadstat_skips_pandas():
+    """pyreadstat >= 1.3 can read without building a DataFrame (output_format='dict')"""
+    try:
+        version = metadata.version('pyreadstat')
+    except metadata.PackageNotFoundError:
+        return False
+    return tuple(int(part) for part in version.split('.')[:2]) >= (1, 3)
+
+
+def test_xpt_metadata_skips_pandas():
+    if pyreadstat_skips_pandas():
+        check('xpt_reader.py', 'metadata', 'test_simple.xpt')
+
+
+
+def test_sas_metadata_skips_pandas():
+    if pyreadstat_skips_pandas():
+        check('sas_reader.py', 'metadata', 'test_simple.sas7bdat')
+
+
+def test_sas_header_metadata_matches_load():
+    header = run('sas_reader.py', 'metadata', 'test_simple.sas7bdat')
+    loaded = run('sas_reader.py', 'load', 'test_simple.sas7bdat')['metadata']
+
+    for key in ('total_rows', 'total_variables', 'file_path', 'dataset_label', 'encoding'):
+        assert header[key] == loaded[key], key
+    assert len(header['variables']) == len(loaded['variables'])
+    for from_header, from_load in zip(header['variables'], loaded['variables']):
+        for key in ('name', 'type', 'label', 'format', 'dtype'):
+            assert from_header[key] == from_load[key], (from_header['name'], key)
+        # Declared widths: at least the longest value
+        if from_header['type'] == 'character':
+            assert from_header['length'] >= from_load['length']
+
+
+if __name__ == '__main__':
+    for script, args, forbidden in [
+        ('sas_reader.py', (), ('pandas', 'pyreadstat')),
+        ('xpt_reader.py', (), ('pandas', 'pyreadstat')),
+        ('r_reader.py', (), ('pandas', 'pyreadr')),
+    ] + ([('xpt_reader.py', ('metadata', 'test_simple.xpt'), ('pandas',)),
+          ('sas_reader.py', ('metadata', 'test_simple.sas7bdat'), ('pandas',))] if pyreadstat_skips_pandas() else []):
+        elapsed = check(script, *args, forbidden=forbidden)
+        print(f"[OK] {script} {' '.join(args)}: {elapsed:.0f}ms")
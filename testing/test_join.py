@@ -0,0 +1,60 @@
+"""
+Pages of a keyed join in join.py must match pandas.merge and read few rows
+
+When the smaller dataset is on the left, the right-hand rows of one page are
+scattered over the larger dataset; only runs of nearby rows should be read.
+
+Run with: python -m pytest testing/test_join.py
+"""
+
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+import dataset_source
+from join import JoinReader
+
+SUBJECTS = 1000
+PARAMS = 40
+
+
+def write_datasets(folder):
+    subjects = [f'S{i:04d}' for i in range(SUBJECTS)]
+    adsl = pd.DataFrame({'USUBJID': subjects, 'AGE': np.arange(SUBJECTS, dtype=float)})
+    # Sorted by parameter, so one subject's rows are SUBJECTS apart
+    adlb = pd.DataFrame({
+        'PARAMCD': np.repeat([f'P{i:02d}' for i in range(PARAMS)], SUBJECTS),
+        'USUBJID': np.tile(subjects, PARAMS),
+        'AVAL': np.arange(SUBJECTS * PARAMS, dtype=float),
+    })
+    pyreadstat.write_xport(adsl, os.path.join(folder, 'adsl.xpt'))
+    pyreadstat.write_xport(adlb, os.path.join(folder, 'adlb.xpt'))
+    return adsl, adlb
+
+
+def test_left_join_page_reads_only_its_rows(tmp_path, monkeypatch):
+    adsl, adlb = write_datasets(str(tmp_path))
+    reader = JoinReader(str(tmp_path / 'adsl.xpt'), str(tmp_path / 'adlb.xpt'), ['USUBJID'], 'left')
+    assert reader.load_file() is True
+
+    read = dataset_source.DatasetSource.read
+    rows_read = []
+
+    def counting(self, columns=None, row_offset=0, row_limit=0):
+        frame = read(self, columns, row_offset, row_limit)
+        if self.file_path.endswith('adlb.xpt'):
+            rows_read.append(len(frame))
+        return frame
+
+    monkeypatch.setattr(dataset_source.DatasetSource, 'read', counting)
+    page = reader.get_data(5 * PARAMS, 2 * PARAMS)
+
+    expected = adsl.merge(adlb, on='USUBJID', how='left').iloc[5 * PARAMS:7 * PARAMS]
+    pd.testing.assert_frame_equal(pd.DataFrame(page['data']), expected.reset_index(drop=True))
+    assert sum(rows_read) == 2 * PARAMS
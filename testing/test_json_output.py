@@ -0,0 +1,59 @@
+"""
+Page encoding in json_output.py
+
+The orjson encoder writes frame_records from the page's columns; its bytes
+must be those of encoding the boxed row dicts, and the stdlib encoder must
+give the same JSON.
+
+Run with: python -m pytest testing/test_json_output.py
+"""
+
+import datetime
+import json
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import json_output
+from json_output import frame_records
+
+ROWS = 200
+
+
+def page():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'AVAL': np.where(rng.random(ROWS) < 0.1, np.nan, rng.normal(0, 1e6, ROWS)),
+        'CHG': rng.normal(0, 1, ROWS).astype(np.float32),
+        'AVISITN': rng.integers(-5, 5, ROWS),
+        'ANL01FL': rng.random(ROWS) < 0.5,
+        'PARAM': rng.choice(['Weight', 'Größe', 'a,"b"', None], ROWS),
+        'SEX': pd.Categorical(rng.choice(['F', 'M', None], ROWS)),
+        'ADTM': pd.to_datetime(rng.integers(0, 10**9, ROWS), unit='s').where(rng.random(ROWS) < 0.9),
+        'MIXED': np.array([datetime.date(2023, 1, 1), None, 1, 'z'] * (ROWS // 4), dtype=object),
+        'EMPTY': [None] * ROWS,
+    })
+
+
+@pytest.mark.skipif(not json_output.HAS_ORJSON, reason='orjson not installed')
+def test_orjson_columns_match_boxed_rows():
+    df = page()
+    records = frame_records(df)
+    boxed = json_output._boxed_records(df)
+    assert json_output._orjson_dumps({'data': records}) == json_output._orjson_dumps({'data': boxed})
+    assert json_output._orjson_dumps({'data': frame_records(df.iloc[:0])}) == '{"data":[]}'
+
+
+def test_records_behave_as_rows():
+    df = page()
+    records = frame_records(df)
+    boxed = json_output._boxed_records(df)
+    assert len(records) == ROWS and records == boxed and records[3] == boxed[3]
+    assert json.loads(json_output._stdlib_dumps({'data': records})) == json.loads(
+        json_output._stdlib_dumps({'data': boxed}))
@@ -0,0 +1,75 @@
+"""
+Duplicate-key grouping of key_check.duplicate_positions
+
+Checks positions and group ids against pandas' duplicated() on the key
+columns, with real 64-bit hashes and with forced hash collisions (which
+must never be reported as duplicates).
+
+Run with: python -m pytest testing/test_key_check.py
+"""
+
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+import pandas as pd
+
+from key_check import duplicate_positions, key_hashes
+
+
+def frame():
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        'USUBJID': rng.choice(['S1', 'S2', 'S3', 'S4', 'S5'], 400),
+        'VISITNUM': rng.integers(1, 30, 400).astype(float),
+        'AVAL': rng.normal(size=400)
+    })
+
+
+def read_rows(df):
+    return lambda positions, keys: df.iloc[positions][keys]
+
+
+def expected_groups(df, keys):
+    """{first row: rows} of every group of rows sharing a key"""
+    duplicated = df[df.duplicated(keys, keep=False)]
+    groups = {}
+    for _, rows in duplicated.groupby(keys, sort=False).groups.items():
+        rows = sorted(df.index.get_indexer(rows))
+        groups[rows[0]] = rows
+    return [groups[first] for first in sorted(groups)]
+
+
+def actual_groups(positions, groups):
+    assert list(groups) == sorted(groups), 'positions are not ordered by group'
+    result = [list(positions[groups == group]) for group in range(int(groups.max()) + 1 if len(groups) else 0)]
+    for rows in result:
+        assert rows == sorted(rows), 'rows of a group are not in row order'
+    return result
+
+
+def test_matches_pandas_duplicated():
+    df = frame()
+    keys = ['USUBJID', 'VISITNUM']
+    hashes = key_hashes([(0, df)], keys)
+    positions, groups = duplicate_positions(hashes, read_rows(df), keys)
+    assert actual_groups(positions, groups) == expected_groups(df, keys)
+
+
+def test_unique_keys_have_no_duplicates():
+    df = frame().drop_duplicates(['USUBJID', 'VISITNUM']).reset_index(drop=True)
+    keys = ['USUBJID', 'VISITNUM']
+    positions, groups = duplicate_positions(key_hashes([(0, df)], keys), read_rows(df), keys)
+    assert len(positions) == 0 and len(groups) == 0
+
+
+def test_hash_collisions_are_not_duplicates():
+    df = frame()
+    keys = ['USUBJID', 'VISITNUM']
+    # Every row collides: only rows with equal key values may be grouped
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    positions, groups = duplicate_positions(hashes, read_rows(df), keys)
+    assert actual_groups(positions, groups) == expected_groups(df, keys)
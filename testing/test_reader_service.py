@@ -0,0 +1,79 @@
+"""
+Streamed filtered pages from reader_service.py (data_progressive)
+
+The page line must be written as soon as the page's matches are found,
+before the scan of the rest of the file, and be followed by a complete line
+with the exact count, all tagged with the request id.
+
+Run with: python -m pytest testing/test_reader_service.py
+"""
+
+import io
+import json
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import dataset_json_reader
+from reader_service import DatasetCache, ReaderService
+from sas_reader import PROGRESSIVE_CHUNK_SIZE
+
+CHUNKS = 3
+ROWS = PROGRESSIVE_CHUNK_SIZE * CHUNKS
+
+
+class RecordingOutput(io.StringIO):
+    """stdout that notes how many chunks had been read when each line was written"""
+
+    def __init__(self, chunks_read):
+        super().__init__()
+        self.chunks_read = chunks_read
+        self.lines = []
+
+    def write(self, text):
+        self.lines.append((json.loads(text), len(self.chunks_read)))
+        return len(text)
+
+
+def write_dataset(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'datasetJSONVersion': '1.1.0', 'name': 'LB', 'records': ROWS,
+                   'columns': [{'itemOID': 'IT.SEQ', 'name': 'LBSEQ', 'dataType': 'integer'},
+                               {'itemOID': 'IT.FL', 'name': 'ANLFL', 'dataType': 'string'}],
+                   'rows': [[i, 'Y' if i % 2 else 'N'] for i in range(ROWS)]}, f)
+
+
+def test_first_page_before_scan_finishes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'lb.json')
+    write_dataset(path)
+
+    chunks_read = []
+    read_chunks = dataset_json_reader.DatasetJsonReader._read_chunks
+
+    def counting(self, *args, **kwargs):
+        for offset, chunk in read_chunks(self, *args, **kwargs):
+            chunks_read.append(offset)
+            yield offset, chunk
+
+    monkeypatch.setattr(dataset_json_reader.DatasetJsonReader, '_read_chunks', counting)
+    output = RecordingOutput(chunks_read)
+    request = {'id': 7, 'command': 'data_progressive', 'file_path': path,
+               'start_row': 10, 'num_rows': 5, 'where_clause': "ANLFL = 'Y'"}
+    ReaderService(DatasetCache()).serve(io.StringIO(json.dumps(request) + '\n'), output)
+
+    events = [line['event'] for line, _ in output.lines]
+    assert events[0] == 'page' and events[-1] == 'complete'
+    assert set(events[1:-1]) <= {'progress'}
+    assert all(line['id'] == 7 for line, _ in output.lines)
+
+    page, chunks_at_page = output.lines[0]
+    assert chunks_at_page == 1
+    assert [row['LBSEQ'] for row in page['data']] == [21, 23, 25, 27, 29]
+    assert page['filtered_rows_lower_bound'] == PROGRESSIVE_CHUNK_SIZE // 2
+    assert page['estimated_filtered_rows'] == ROWS // 2
+
+    complete, chunks_at_complete = output.lines[-1]
+    assert chunks_at_complete == CHUNKS
+    assert complete['filtered_rows'] == ROWS // 2
@@ -0,0 +1,112 @@
+"""
+XPORT rows decoded by refresh.py must equal pyreadstat.read_xport
+
+decode_xpt_rows reads records straight from the file (IBM floats through
+_ibm_to_ieee, fixed-width strings through _xpt_strings) when a cached
+dataset is patched; any difference from pyreadstat would show up as a
+refreshed frame that differs from a fresh read.
+
+Run with: python -m pytest testing/test_refresh.py
+"""
+
+import os
+import re
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+from refresh import FileSnapshot, XPT_BLOCK_SIZE, decode_xpt_rows, _ibm_to_ieee
+
+
+def dataset(rows=3000):
+    rng = np.random.default_rng(11)
+    values = rng.normal(0, 1e3, rows) * rng.choice([1e-60, 1e-8, 1.0, 1e8, 1e60], rows)
+    values[rng.random(rows) < 0.1] = np.nan
+    values[:6] = [0.0, -0.0, 1.0, -1.0, 0.1, 2.0 ** -20]
+    return pd.DataFrame({
+        'ID': np.arange(rows, dtype=float),
+        'AVAL': values,
+        'SMALL': rng.integers(-1000, 1000, rows).astype(float),
+        'TEXT': rng.choice(['', 'A', 'padded  ', 'x' * 40, 'mixed Case 1'], rows),
+    })
+
+
+def read(path):
+    df, meta = pyreadstat.read_xport(path, disable_datetime_conversion=True)
+    return df, meta
+
+
+def test_decoded_rows_match_pyreadstat(tmp_path):
+    path = str(tmp_path / 'decode.xpt')
+    pyreadstat.write_xport(dataset(), path)
+    expected, meta = read(path)
+
+    layout = FileSnapshot.take(path, meta).layout
+    for start, stop in [(0, len(expected)), (0, 1), (1234, 1300), (len(expected) - 7, len(expected))]:
+        decoded = decode_xpt_rows(path, meta, layout, start, stop, 'utf-8')
+        pd.testing.assert_frame_equal(decoded, expected.iloc[start:stop].reset_index(drop=True),
+                                      check_dtype=False)
+
+
+def test_header_timestamps_keep_rows(tmp_path):
+    path = str(tmp_path / 'stamped.xpt')
+    pyreadstat.write_xport(dataset(), path)
+    _, meta = read(path)
+    before = FileSnapshot.take(path, meta)
+
+    # Same records under a header written at another time
+    with open(path, 'rb') as f:
+        content = f.read()
+    data_start = before.layout[1]
+    header = re.sub(rb'\d\d[A-Z]{3}\d\d:\d\d:\d\d:\d\d', b'01JAN70:00:00:00', content[:data_start])
+    assert header != content[:data_start]
+    with open(path, 'wb') as f:
+        f.write(header + content[data_start:])
+
+    after = FileSnapshot.take(path, meta)
+    assert after.pages[0] != before.pages[0]
+    assert before.changed_rows(after) == []
+
+
+def test_appended_rows_only(tmp_path):
+    path = str(tmp_path / 'appended.xpt')
+    rows = 40000
+    pyreadstat.write_xport(dataset(rows), path)
+    _, meta = read(path)
+    before = FileSnapshot.take(path, meta)
+
+    pyreadstat.write_xport(pd.concat([dataset(rows), dataset(100)], ignore_index=True), path)
+    after = FileSnapshot.take(path, read(path)[1])
+
+    ranges = before.changed_rows(after)
+    record_length = after.layout[2]
+    assert ranges == [((rows * record_length // XPT_BLOCK_SIZE) * XPT_BLOCK_SIZE // record_length, rows + 100)]
+
+
+def test_ibm_special_values():
+    def ibm(*rows):
+        return np.array([list(row) for row in rows], dtype=np.uint8)
+
+    values = _ibm_to_ieee(ibm(
+        (0x00, 0, 0, 0, 0, 0, 0, 0),                  # zero
+        (0x41, 0x10, 0, 0, 0, 0, 0, 0),               # 1.0
+        (0xC1, 0x10, 0, 0, 0, 0, 0, 0),               # -1.0
+        (0x42, 0x64, 0, 0, 0, 0, 0, 0),               # 100.0
+        (0x2E, 0, 0, 0, 0, 0, 0, 0),                  # missing '.'
+        (0x5F, 0, 0, 0, 0, 0, 0, 0),                  # missing '._'
+        (0x7F, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF),
+    ))
+    assert values[:4].tolist() == [0.0, 1.0, -1.0, 100.0]
+    assert np.isnan(values[4]) and np.isnan(values[5])
+    assert values[6] == np.inf
+
+
+def test_short_numeric_widths():
+    # 3-byte numerics: the missing bytes are zero, as readstat pads them
+    field = np.array([[0x41, 0x10, 0x00], [0x42, 0x64, 0x00], [0xC2, 0x19, 0x80]], dtype=np.uint8)
+    assert _ibm_to_ieee(field).tolist() == [1.0, 100.0, -25.5]
@@ -0,0 +1,44 @@
+"""
+Stratified allocation in sampling.py must add up to the requested sample size
+
+allocate gives every non-empty stratum at least one row; with many small
+strata that must not push the sample past n.
+
+Run with: python -m pytest testing/test_sampling.py
+"""
+
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+
+from sampling import allocate
+
+
+def test_proportional():
+    assert allocate(np.array([10, 20, 30]), 6).tolist() == [1, 2, 3]
+    assert allocate(np.array([10, 20, 30]), 100).tolist() == [10, 20, 30]
+
+
+def test_more_strata_than_rows():
+    sizes = allocate(np.array([5, 50, 1, 20, 0]), 2)
+    assert sizes.tolist() == [0, 1, 0, 1, 0]
+
+
+def test_small_strata_stay_within_n():
+    sizes = allocate(np.array([1000, 1, 1, 1, 1, 1]), 8)
+    assert sizes.sum() == 8
+    assert sizes.tolist() == [3, 1, 1, 1, 1, 1]
+
+
+def test_total_is_n():
+    rng = np.random.default_rng(3)
+    for _ in range(500):
+        counts = rng.integers(0, 200, rng.integers(1, 30))
+        n = int(rng.integers(1, 300))
+        sizes = allocate(counts, n)
+        assert sizes.sum() == min(n, counts.sum())
+        assert ((sizes >= 0) & (sizes <= counts)).all()
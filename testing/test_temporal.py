@@ -0,0 +1,71 @@
+"""
+Rendering of SAS temporal values and translation of WHERE literals in temporal.py
+
+A datetime renders with the precision of its variable's format, whichever
+page it is on, and quoted literals compared with temporal columns (alone or
+in IN lists, ISO or SAS form) become the SAS numbers those columns hold.
+
+Run with: python -m pytest testing/test_temporal.py
+"""
+
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import pandas as pd
+import pyreadstat
+
+from temporal import render_sas_values, temporal_columns, temporal_units, translate_where_literals
+from xpt_reader import XPTReader
+
+KINDS = {'ADT': 'date', 'ADTM': 'datetime', 'ATM': 'time'}
+
+
+def test_units_from_formats():
+    formats = {'ADT': 'DATE9', 'ADTM': 'E8601DT23.3', 'TRTSDTM': 'DATETIME20', 'ATM': 'TIME12.2'}
+    assert temporal_units(formats, temporal_columns(formats)) == {'ADTM': 'ms', 'TRTSDTM': 's', 'ATM': 'ms'}
+
+
+def test_datetime_precision_does_not_depend_on_page():
+    # 2023-01-01 00:00:00 and the same plus a quarter second
+    whole, fractional = 1988150400.0, 1988150400.25
+    assert render_sas_values([whole], 'datetime', 'ms').tolist() == ['2023-01-01 00:00:00.000']
+    assert render_sas_values([whole, fractional], 'datetime', 'ms')[0] == '2023-01-01 00:00:00.000'
+    assert render_sas_values([whole, fractional], 'datetime').tolist() == ['2023-01-01 00:00:00'] * 2
+    assert render_sas_values([30600.5], 'time', 'ms').tolist() == ['08:30:00.500']
+
+
+def test_reader_pages_render_alike(tmp_path):
+    path = str(tmp_path / 'adtm.xpt')
+    pyreadstat.write_xport(pd.DataFrame({'ADTM': [1988150400.25, 1988150401.0]}), path,
+                           variable_format={'ADTM': 'E8601DT23.3'})
+    reader = XPTReader(path)
+    assert reader.load_file() is True
+    assert reader.get_data(1, 1)['data'] == [{'ADTM': '2023-01-01 00:00:01.000'}]
+    assert reader.get_data(0, 2)['data'][1] == {'ADTM': '2023-01-01 00:00:01.000'}
+
+
+def test_literals_translate():
+    assert translate_where_literals("ADT > '2023-01-01'", KINDS) == 'ADT > 23011'
+    assert translate_where_literals("'01JAN2023'd <= ADT", KINDS) == '23011 <= ADT'
+    assert translate_where_literals("ADTM >= '01JAN2023:08:30:00'dt", KINDS) == 'ADTM >= 1988181000'
+    assert translate_where_literals("ATM = '08:30't", KINDS) == 'ATM = 30600'
+    assert translate_where_literals("ADT = '2023-02-30'", KINDS) == "ADT = '2023-02-30'"
+
+
+def test_in_lists_translate():
+    assert translate_where_literals("ADT in ('01JAN2023'd, '2023-01-03')", KINDS) == 'ADT in (23011, 23013)'
+    assert translate_where_literals("adt NOT IN ('2023-01-01')", KINDS) == 'adt NOT IN (23011)'
+    assert translate_where_literals("ARM in ('2023-01-01', 'B')", KINDS) == "ARM in ('2023-01-01', 'B')"
+
+
+def test_in_list_filters_rows(tmp_path):
+    path = str(tmp_path / 'adt.xpt')
+    pyreadstat.write_xport(pd.DataFrame({'ADT': [23011.0, 23012.0, 23013.0]}), path,
+                           variable_format={'ADT': 'DATE9.'})
+    reader = XPTReader(path)
+    assert reader.load_file() is True
+    page = reader.get_data(0, 10, None, "ADT in ('01JAN2023'd, '2023-01-03')")
+    assert page['data'] == [{'ADT': '2023-01-01'}, {'ADT': '2023-01-03'}]
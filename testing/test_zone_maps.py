@@ -0,0 +1,112 @@
+"""
+Chunk pruning with zone maps: a pruned scan must count the same rows as a full scan
+
+Builds a ZoneMap over a DataFrame in chunks and, for each WHERE clause,
+compares the rows matched in the candidate chunks with the rows matched
+in all chunks. Also checks how split_conjuncts splits clauses.
+
+Run with: python -m pytest testing/test_zone_maps.py
+"""
+
+import os
+import sys
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTING_DIR), 'python'))
+
+import numpy as np
+import pandas as pd
+
+from temporal import translate_where_literals
+from zone_maps import ZoneMap, may_match, column_stats, split_conjuncts
+
+CHUNK_SIZE = 100
+
+TEMPORAL = {'ADT': 'date'}
+
+# Clauses in a syntax both the zone map and DataFrame.query understand
+CLAUSES = [
+    "AVAL > 90",
+    "AVAL <= 3.5",
+    "ID >= 250 and ID < 420",
+    "(ID > 100) & (ARM == 'DRUG B')",
+    "ARM == 'PLACEBO' and AVAL > 50",
+    "SITE in ['S01', 'S05']",
+    "SITE != 'S01'",
+    "ARM == 'NONE'",
+    "AVAL > 10 or ID < 5",
+    "ADT >= '2024-03-01'",
+    "ADT < '2023-02-01' and ARM != 'PLACEBO'",
+]
+
+
+def dataset(rows=1000):
+    rng = np.random.default_rng(3)
+    aval = rng.uniform(0, 100, rows)
+    aval[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        'ID': np.arange(rows, dtype=float),
+        'AVAL': aval,
+        'ARM': np.where(np.arange(rows) < rows // 2, 'PLACEBO', rng.choice(['DRUG A', 'DRUG B'], rows)),
+        'SITE': [f'S{i // 100:02d}' for i in range(rows)],
+        # SAS dates (days since 1960) from 2023-01-01, increasing by row
+        'ADT': 23011.0 + np.arange(rows)
+    })
+
+
+def build(df):
+    zone_map = ZoneMap(CHUNK_SIZE)
+    for start in range(0, len(df), CHUNK_SIZE):
+        zone_map.add_chunk(df.iloc[start:start + CHUNK_SIZE])
+    return zone_map
+
+
+def count(df, clause):
+    return len(df.query(translate_where_literals(clause, TEMPORAL)))
+
+
+def test_pruned_counts_equal_full_counts():
+    df = dataset()
+    zone_map = build(df)
+    chunks = [df.iloc[start:start + CHUNK_SIZE] for start in range(0, len(df), CHUNK_SIZE)]
+
+    for clause in CLAUSES:
+        candidates = zone_map.candidates(clause, TEMPORAL)
+        kept = chunks if candidates is None else [chunks[i] for i in candidates]
+        pruned = sum(count(chunk, clause) for chunk in kept)
+        assert pruned == count(df, clause), clause
+
+
+def test_pruning_skips_chunks():
+    zone_map = build(dataset())
+    assert zone_map.candidates("ID >= 250 and ID < 420", TEMPORAL) == [2, 3, 4]
+    assert zone_map.candidates("SITE in ['S01', 'S05']", TEMPORAL) == [1, 5]
+    assert zone_map.candidates("ADT >= '2024-03-01'", TEMPORAL) == [4, 5, 6, 7, 8, 9]
+    assert zone_map.candidates("ARM == 'NONE'", TEMPORAL) == []
+    # A top-level OR cannot rule out any chunk
+    assert zone_map.candidates("AVAL > 10 or ID < 5", TEMPORAL) is None
+
+
+def test_may_match():
+    stats = column_stats(pd.Series([1.0, 5.0, np.nan, 3.0]))
+    assert may_match(stats, '>', [4.0]) and not may_match(stats, '>', [5.0])
+    assert may_match(stats, '<=', [1.0]) and not may_match(stats, '<', [1.0])
+    assert may_match(stats, 'in', [2.0, 3.0]) and not may_match(stats, 'in', [2.0, 4.0])
+    # The missing value satisfies !=
+    assert may_match(column_stats(pd.Series([2.0, 2.0, np.nan])), '!=', [2.0])
+    assert not may_match(column_stats(pd.Series([2.0, 2.0])), '!=', [2.0])
+    # An ordering against a literal of another type cannot rule the chunk out
+    assert may_match(stats, '>', ['x'])
+    # An all-missing chunk only matches !=
+    missing = column_stats(pd.Series([np.nan, np.nan]))
+    assert not may_match(missing, '==', [1.0]) and may_match(missing, '!=', [1.0])
+
+
+def test_split_conjuncts():
+    assert split_conjuncts("A = 1 and B > 2") == ['A = 1', 'B > 2']
+    assert split_conjuncts("WHERE (A = 1) & (B > 2 AND C < 3)") == ['A = 1', 'B > 2', 'C < 3']
+    assert split_conjuncts("A = 'x and y' and B = 1") == ["A = 'x and y'", 'B = 1']
+    assert split_conjuncts("A = 'x or y'") == ["A = 'x or y'"]
+    assert split_conjuncts("A = 1 or B = 2") is None
+    assert split_conjuncts("A = 1 | B = 2") is None
+    assert split_conjuncts("(A = 1 or B = 2) and C = 3") == ['(A = 1 or B = 2)', 'C = 3']